@@ -0,0 +1,85 @@
+"""
+Cold starts with the packed sprite atlas against loading every png on its own (user-015).
+
+Every run is a fresh process, so nothing is cached between them. A run opens a headless
+window, gets the textures ready one of three ways, and then loads the world and its first
+room, which is where the lazy path decodes the pngs the tiles use.
+
+    atlas: load_atlas cuts every sprite out of the one packed image, and they are all uploaded.
+    per_png: every png is decoded with load_png and uploaded, as the preloader does without an atlas.
+    lazy: nothing is loaded up front, each png is decoded when the world first asks for it.
+
+The atlas is packed first if it is missing or stale.
+
+    python -m benchmarks.atlas_startup [runs]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+import json
+import statistics
+import subprocess
+from time import perf_counter
+
+START = perf_counter()
+
+MODES = ('atlas', 'per_png', 'lazy')
+
+
+def run(mode: str):
+    import io
+    from contextlib import redirect_stdout
+
+    from critter.core.application import Window
+    from critter.core.context import context, Persistent, Active
+    from critter.core.world import World
+    from resources import load_atlas, load_png, list_atlas_sources, register_png, load_level
+
+    window = Window()
+    context.window = window
+    context.persistent = Persistent()
+    context.active = Active()
+    context.active.world_data = load_level(context.WORLD_NAME, lazy=True)
+    opened = perf_counter()
+
+    if mode != 'lazy':
+        textures = load_atlas() if mode == 'atlas' else {name: load_png(name) for name in list_atlas_sources()}
+        atlas = window.ctx.default_atlas
+        for name, texture in textures.items():
+            register_png(name, texture)
+            atlas.add(texture)
+    ready = perf_counter()
+
+    with redirect_stdout(io.StringIO()):
+        world = World(window.ctx)
+        world.load_world()
+        world.load_room(next(iter(world.rooms)))
+    done = perf_counter()
+
+    print(json.dumps({'startup': opened - START, 'textures': ready - opened, 'first_room': done - ready, 'total': done - START}))
+
+
+def main():
+    from resources import load_atlas, dump_atlas
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    if load_atlas() is None:
+        dump_atlas()
+
+    results = {mode: [] for mode in MODES}
+    for _ in range(runs):
+        # Interleaved so a slow patch of the machine hits every mode alike
+        for mode in MODES:
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.atlas_startup', '--mode', mode], capture_output=True, text=True, check=True).stdout
+            results[mode].append(json.loads(output.strip().splitlines()[-1]))
+
+    for mode, timings in results.items():
+        medians = {key: 1e3 * statistics.median(timing[key] for timing in timings) for key in timings[0]}
+        print(f"{mode}: import and window {medians['startup']:.0f}ms, textures {medians['textures']:.1f}ms, world and first room {medians['first_room']:.1f}ms, total {medians['total']:.0f}ms (median of {len(timings)})")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--mode']:
+        run(sys.argv[2])
+    else:
+        main()
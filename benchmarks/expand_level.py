@@ -0,0 +1,31 @@
+"""
+Expanding a large synthetic level in bulk against one tile at a time (user-004).
+
+    python -m benchmarks.expand_level [size] [repeats]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+from time import perf_counter
+
+from critter.core.world import expand_level
+from critter.core.testing import SYNTHETIC_TYPES, synthetic_level, expand_level_per_tile
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    level = synthetic_level(size, size, 99)
+
+    for name, expand in (('per tile', lambda: expand_level_per_tile(level, SYNTHETIC_TYPES, {})), ('bulk', lambda: expand_level(level, SYNTHETIC_TYPES, {}))):
+        best = float('inf')
+        for _ in range(repeats):
+            start = perf_counter()
+            expand()
+            best = min(best, perf_counter() - start)
+        print(f'{name}: {1e3 * best:.1f}ms for a {size}x{size} level')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Ground queries against a room's HeightField, and the tile scan they replace (user-025).
+
+The field is built from the first room of the jam level, and is queried at random points
+in and around it.
+
+    python -m benchmarks.ground_queries [query count]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+import random
+from time import perf_counter
+
+from critter.core.world import read_tile_types, expand_level, order_room
+from critter.core.physics import HeightField
+from resources import load_level
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    data = load_level('dungeon')
+    tile_types = {}
+    for tileset in data.defs.tilesets:
+        tile_types.update(read_tile_types(tileset))
+    room = order_room(expand_level(data.levels[0], tile_types, {}))
+
+    start = perf_counter()
+    field = HeightField.from_tiles(room.x, room.y, room.z)
+    build = perf_counter() - start
+    print(f'{room.size} tiles -> {field.width}x{field.height} field ({len(field.levels)} bytes) in {build * 1e3:.2f}ms')
+
+    rnd = random.Random(0)
+    bounds = field.bounds
+    xs = [rnd.uniform(bounds.left - 1, bounds.right + 1) for _ in range(count)]
+    ys = [rnd.uniform(bounds.bottom - 1, bounds.top + 1) for _ in range(count)]
+
+    def scan(px, py):
+        # The top tile under the point, from the room's own columns
+        top = None
+        for tx, ty, tz in zip(room.x, room.y, room.z):
+            if abs(tx - px) <= 0.5 and abs(ty - py) <= 0.5 and (top is None or tz > top):
+                top = tz
+        return top
+
+    scanned = min(count, 1000)
+    start = perf_counter()
+    list(map(scan, xs[:scanned], ys[:scanned]))
+    scan_time = perf_counter() - start
+
+    start = perf_counter()
+    single = list(map(field.height_at, xs, ys))
+    single_time = perf_counter() - start
+
+    start = perf_counter()
+    batch = field.heights_at(xs, ys)
+    batch_time = perf_counter() - start
+    assert single == batch
+
+    print(f'scanning tiles {scan_time / scanned * 1e6:.0f}us, height_at {single_time / count * 1e6:.2f}us, heights_at {batch_time / count * 1e6:.2f}us per point')
+
+    walks = list(zip(xs, ys, reversed(xs), reversed(ys)))
+    start = perf_counter()
+    walkable = sum(field.can_walk(*walk, 1.0) for walk in walks)
+    walk_time = perf_counter() - start
+    print(f'can_walk {walk_time / count * 1e6:.2f}us per walk, {walkable} of {count} walkable')
+
+    start = perf_counter()
+    field.ledges(1.0)
+    field.walls(1.0)
+    sides = perf_counter() - start
+    print(f'ledges and walls of the whole room {sides * 1e3:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Parsing a world eagerly against lazily (user-001).
+
+For each mode this reports the time to parse the world, the time until the first room's
+layers are ready, and the peak memory traced along the way.
+
+    python -m benchmarks.lazy_ldtk [world name] [repeats]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+import tracemalloc
+from time import perf_counter
+
+from resources import load_level
+
+
+def measure(world: str, lazy: bool) -> tuple[float, float, int]:
+    tracemalloc.start()
+    start = perf_counter()
+    root = load_level(world, lazy=lazy)
+    parsed = perf_counter()
+    root.levels[0].layer_instances
+    first = perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return parsed - start, first - start, peak
+
+
+def main():
+    world = sys.argv[1] if len(sys.argv) > 1 else 'dungeon'
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for lazy in (False, True):
+        runs = [measure(world, lazy) for _ in range(repeats)]
+        parse = min(run[0] for run in runs)
+        first = min(run[1] for run in runs)
+        peak = min(run[2] for run in runs)
+        print(f'{"lazy " if lazy else "eager"}: parse {1e3 * parse:.1f}ms, first room {1e3 * first:.1f}ms, peak {peak / 1e6:.2f}MB')
+
+
+if __name__ == '__main__':
+    main()
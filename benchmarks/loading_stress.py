@@ -0,0 +1,74 @@
+"""
+How much time the render thread spends on hundreds of loading tasks each frame (user-019).
+
+Every task is a ThreadedTask of a few jobs in one TaskGraph, run with `Task.wait`. Each
+frame the complete and fraction of every task is read (as a loading screen would) and
+then the graph is updated, timing both.
+
+    python -m benchmarks.loading_stress [tasks] [jobs per task]
+"""
+import sys
+from time import perf_counter
+
+from critter.lib.loading import TaskGraph, ThreadedTask
+
+
+def burn() -> int:
+    # A little pure python work, so the workers hold the GIL like decoding does
+    total = 0
+    for i in range(2000):
+        total += i
+    return total
+
+
+class PolledGraph(TaskGraph):
+    """
+    A TaskGraph which polls every task before each update, timing the poll and the update.
+    """
+
+    def __init__(self):
+        TaskGraph.__init__(self)
+        self.polls: list[float] = []
+        self.updates: list[float] = []
+
+    def update(self):
+        start = perf_counter()
+        for task in self._tasks:
+            task.complete
+            task.fraction
+        self.fraction
+        polled = perf_counter()
+        TaskGraph.update(self)
+        self.polls.append(polled - start)
+        self.updates.append(perf_counter() - polled)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    graph = PolledGraph()
+    for _ in range(count):
+        task = ThreadedTask()
+        for _ in range(jobs):
+            task.add(burn)
+        graph.add(task)
+
+    start = perf_counter()
+    assert graph.wait(timeout=120.0)
+    total = perf_counter() - start
+
+    print(
+        f'{count} tasks x {jobs} jobs: {total:.2f}s over {len(graph.polls)} frames, '
+        f'poll median {1e3 * percentile(graph.polls, 0.5):.2f}ms p99 {1e3 * percentile(graph.polls, 0.99):.2f}ms, '
+        f'update median {1e3 * percentile(graph.updates, 0.5):.2f}ms p99 {1e3 * percentile(graph.updates, 0.99):.2f}ms'
+    )
+
+
+if __name__ == '__main__':
+    main()
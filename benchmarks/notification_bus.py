@@ -0,0 +1,74 @@
+"""
+Push latency and memory of the NotificationBus against the Notifier (user-021).
+
+Pushes are made in frames of 1000 with a `push_cache` after each frame, and every listener
+takes the payload. The memory held by 1000 queued pushes, and the extra memory used at the
+peak of dispatching them, are traced afterwards.
+
+    python -m benchmarks.notification_bus [pushes]
+"""
+import sys
+import tracemalloc
+from collections.abc import Callable
+from time import perf_counter
+
+from critter.lib.notification import Notification, NotificationBus, Notifier
+
+
+class Moved(Notification):
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x: float, y: float):
+        self.x: float = x
+        self.y: float = y
+
+
+def make_notifier(listeners: int) -> tuple[Callable[[], None], Callable[[], None]]:
+    notifier = Notifier()
+    notifier.create_notification('moved', x=0.0, y=0.0)
+    for _ in range(listeners):
+        notifier.add_listener('moved', lambda x, y: None)
+    return lambda: notifier.push_notification('moved', x=1.0, y=2.0), notifier.push_cache
+
+
+def make_bus(listeners: int) -> tuple[Callable[[], None], Callable[[], None]]:
+    bus = NotificationBus()
+    for _ in range(listeners):
+        bus.add_listener(Moved, lambda moved: None)
+    return lambda: bus.push(Moved(1.0, 2.0)), bus.push_cache
+
+
+def measure(push: Callable[[], None], drain: Callable[[], None], pushes: int) -> tuple[float, float, int]:
+    def frame():
+        for _ in range(1000):
+            push()
+        drain()
+
+    frame()
+    start = perf_counter()
+    for _ in range(pushes // 1000):
+        frame()
+    latency = (perf_counter() - start) / pushes
+
+    tracemalloc.start()
+    for _ in range(1000):
+        push()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    drain()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return latency, held / 1000, peak
+
+
+def main():
+    pushes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for listeners in (1, 10):
+        for name, make in (('Notifier', make_notifier), ('NotificationBus', make_bus)):
+            latency, held, peak = measure(*make(listeners), pushes)
+            print(f'{name} with {listeners} listeners: {1e6 * latency:.2f}us per push, {held:.0f}B held per queued push, {peak}B peak dispatching 1000')
+
+
+if __name__ == '__main__':
+    main()
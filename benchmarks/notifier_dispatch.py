@@ -0,0 +1,52 @@
+"""
+The cost of a Notifier push with its dispatch, with and without caller capture (user-020).
+
+Pushes are made in frames of 1000 with a `push_cache` after each frame. Half of the listeners
+take (x, y) and half (x, y, caller=None).
+
+Every listener count makes the same number of pushes, a million unless one is given, so the
+100 listener run takes a while. Pass fewer pushes for a quick run.
+
+    python -m benchmarks.notifier_dispatch [pushes] [listener counts...]
+
+The Notifier from before dispatch plans always captured the caller and has no
+`capture_caller` argument. To compare against it, run this with that version checked out:
+only the first column is measured.
+"""
+import sys
+from time import perf_counter
+
+from critter.lib.notification import Notifier
+
+
+def per_push(listeners: int, pushes: int, capture_caller: bool) -> float:
+    notifier = Notifier(capture_caller=True) if capture_caller else Notifier()
+    notifier.create_notification('moved', x=0.0, y=0.0)
+    for i in range(listeners):
+        notifier.add_listener('moved', (lambda x, y: None) if i % 2 else (lambda x, y, caller=None: None))
+
+    push, drain = notifier.push_notification, notifier.push_cache
+    start = perf_counter()
+    for _ in range(pushes // 1000):
+        for _ in range(1000):
+            push('moved', x=1.0, y=2.0)
+        drain()
+    return (perf_counter() - start) / pushes
+
+
+def main():
+    pushes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    counts = [int(count) for count in sys.argv[2:]] or [1, 10, 100]
+    if pushes < 1000:
+        raise ValueError('Pushes are made in frames of 1000, so at least 1000 are needed')
+    for listeners in counts:
+        plain = per_push(listeners, pushes, False)
+        try:
+            captured = f'{1e6 * per_push(listeners, pushes, True):.2f}us'
+        except TypeError:
+            captured = 'n/a'
+        print(f'{listeners} listeners, {pushes} pushes: {1e6 * plain:.2f}us per push, {captured} with capture_caller')
+
+
+if __name__ == '__main__':
+    main()
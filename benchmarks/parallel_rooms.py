@@ -0,0 +1,88 @@
+"""
+Building a large world's rooms in the main process against across a process pool (user-017).
+
+The world is the jam level's rooms copied side by side, written to a temporary .ldtk. It is
+loaded with each number of worker processes, checking every load gives the same rooms.
+A headless window is opened as the world needs a gl context.
+
+    python -m benchmarks.parallel_rooms [copies] [process counts...]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import io
+import sys
+import copy
+import json
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from time import perf_counter, process_time
+
+from critter.core.application import Window
+from critter.core.context import context, Persistent, Active
+from critter.core.world import World
+from resources import get_level_path
+from resources.LDtk import parse_LDtk_file
+
+
+def write_world(path: Path, copies: int) -> int:
+    with open(get_level_path('dungeon')) as fp:
+        data = json.load(fp)
+
+    levels = []
+    for k in range(copies):
+        iids = {level['iid']: f'{level["iid"]}-{k}' for level in data['levels']}
+        for level in data['levels']:
+            level = copy.deepcopy(level)
+            level['identifier'] = f'{level["identifier"]}_{k}'
+            level['iid'] = iids[level['iid']]
+            level['worldX'] += 512 * k
+            for neighbour in level['__neighbours']:
+                neighbour['levelIid'] = iids.get(neighbour['levelIid'], neighbour['levelIid'])
+            levels.append(level)
+    data['levels'] = levels
+
+    with open(path, 'w') as fp:
+        json.dump(data, fp)
+    return len(levels)
+
+
+def signature(world: World) -> tuple:
+    return tuple(world.texture_ids), [
+        (name, room.x.tobytes(), room.y.tobytes(), room.z.tobytes(), room.texture.tobytes(), room.transparent.tobytes(), [(chunk.start, chunk.end) for chunk in room.chunks])
+        for name, room in world.rooms.items()
+    ]
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    counts = [int(count) for count in sys.argv[2:]] or [0, 1, 2, 4]
+
+    window = Window()
+    context.persistent = Persistent()
+    context.active = Active()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'big.ldtk'
+        levels = write_world(path, copies)
+
+        expected = None
+        for processes in counts:
+            context.active.world_data = parse_LDtk_file(str(path), lazy=True)
+            context.active.world_cache = None
+            world = World(window.ctx, processes=processes)
+
+            wall, cpu = perf_counter(), process_time()
+            with redirect_stdout(io.StringIO()):
+                world.load_world()
+            wall, cpu = perf_counter() - wall, process_time() - cpu
+
+            found = signature(world)
+            expected = expected or found
+            assert found == expected, f'processes={processes} built different rooms'
+            print(f'{levels} levels, processes={processes}: {wall:.2f}s wall, {cpu:.2f}s main process cpu')
+
+
+if __name__ == '__main__':
+    main()
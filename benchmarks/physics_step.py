@@ -0,0 +1,45 @@
+"""
+The cost of one headless PhysicsEngine step as the number of colliders grows (user-024).
+
+About one collider per four ground cells, each a little smaller than a broadphase cell,
+a tenth of them static and the rest wandering over a height field of low steps and walls.
+
+    python -m benchmarks.physics_step [collider counts...]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+import random
+from time import perf_counter
+
+from critter.core.physics import PhysicsEngine, HeightField
+
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or [100, 1000, 2000, 5000]
+    rnd = random.Random(1)
+    for count in counts:
+        side = int((count * 4) ** 0.5) + 1
+        heights = bytes(4 if rnd.random() < 0.05 else rnd.choice((1, 1, 2)) for _ in range(side * side))
+        engine = PhysicsEngine(cell_size=1.0)
+        engine.add_heightfield(HeightField(0.0, 0.0, side, side, heights))
+        for _ in range(count):
+            collider = engine.add_collider(rnd.uniform(0, side), rnd.uniform(0, side), 0.3, 0.3, static=rnd.random() < 0.1)
+            if not collider.static:
+                collider.velocity = (rnd.uniform(-2, 2), rnd.uniform(-2, 2))
+        for _ in range(5):
+            engine.step()
+
+        steps = 0
+        start = perf_counter()
+        while perf_counter() - start < 2.0:
+            engine.step()
+            steps += 1
+        per = (perf_counter() - start) / steps
+        budget = 'within' if per <= engine.timestep else 'over'
+        print(f'{count} colliders: {per * 1e3:.2f}ms per step ({budget} the {engine.timestep * 1e3:.1f}ms timestep), {len(engine.contacts)} contacts')
+
+
+if __name__ == '__main__':
+    main()
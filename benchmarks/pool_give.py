@@ -0,0 +1,45 @@
+"""
+Giving items back to a Pool against an IndexedPool, in a random order (user-005).
+
+    python -m benchmarks.pool_give [sizes...]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+import random
+from time import perf_counter
+
+from critter.lib.pool import Pool, IndexedPool
+
+
+def per_give(pool: Pool, items: list) -> float:
+    start = perf_counter()
+    for item in items:
+        pool.give(item)
+    return (perf_counter() - start) / len(items)
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [1000, 8000, 64000]
+    for size in sizes:
+        results = []
+        for cls in (Pool, IndexedPool):
+            pool = cls(list(range(size)))
+            items = [pool.get() for _ in range(size)]
+            random.Random(1).shuffle(items)
+            # Giving back every item to a Pool is quadratic, so large pools only give some back
+            results.append(per_give(pool, items[:8000] if cls is Pool else items))
+
+        pool = IndexedPool(list(range(size)))
+        items = pool.get_many(size)
+        random.Random(1).shuffle(items)
+        start = perf_counter()
+        pool.give_many(items)
+        many = (perf_counter() - start) / size
+
+        print(f'{size}: Pool {1e6 * results[0]:.2f}us, IndexedPool {1e6 * results[1]:.2f}us, give_many {1e6 * many:.2f}us per item')
+
+
+if __name__ == '__main__':
+    main()
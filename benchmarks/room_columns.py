@@ -0,0 +1,74 @@
+"""
+How much memory and time a room's tiles take as packed columns (user-003).
+
+Every room in the world is built once as a `Room`, and once as one object per tile the way
+rooms were stored before, to compare against.
+
+    python -m benchmarks.room_columns [world name] [repeats]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+import tracemalloc
+from time import perf_counter
+
+from resources import load_level
+from critter.core.world import Room, read_tile_types, expand_level
+
+
+class TileObject:
+    # A tile as it was stored before rooms were columns
+    def __init__(self, texture: int, transparent: bool, position: tuple[float, float, float]):
+        self.texture = texture
+        self.transparent = transparent
+        self.position = position
+        self.current_sprite = None
+
+
+def build_columns(rooms) -> list[Room]:
+    return [Room(room.name, room.x, room.y, room.z, room.texture, room.transparent) for room in rooms]
+
+
+def build_objects(rooms) -> list[tuple[TileObject, ...]]:
+    return [
+        tuple(TileObject(t, bool(o), (x, y, z)) for x, y, z, t, o in zip(room.x.tolist(), room.y.tolist(), room.z.tolist(), room.texture, room.transparent))
+        for room in rooms
+    ]
+
+
+def measure(build, rooms, repeats: int) -> tuple[float, int]:
+    best = float('inf')
+    for _ in range(repeats):
+        start = perf_counter()
+        build(rooms)
+        best = min(best, perf_counter() - start)
+
+    tracemalloc.start()
+    built = build(rooms)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return best, size
+
+
+def main():
+    world = sys.argv[1] if len(sys.argv) > 1 else 'dungeon'
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    root = load_level(world)
+    tile_types = {}
+    for tileset in root.defs.tilesets:
+        tile_types.update(read_tile_types(tileset))
+    textures = {}
+    rooms = [expand_level(level, tile_types, textures) for level in root.levels]
+    tiles = sum(len(room.texture) for room in rooms)
+
+    print(f'{len(rooms)} rooms, {tiles} tiles')
+    for name, build in (('objects', build_objects), ('columns', build_columns)):
+        best, size = measure(build, rooms, repeats)
+        print(f'{name}: {1e3 * best:.2f}ms to build, {size / tiles:.0f} bytes per tile')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Loading rooms all at once against a chunk at a time within the per frame budget (user-011).
+
+A headless window is opened for the gl context. The world's rooms are loaded with a fourth
+room made from all three of them, so one room is far bigger than the frame budget. The pools
+and every room's slots must end up the same either way.
+
+    python -m benchmarks.room_loading
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import io
+import statistics
+from array import array
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from critter.core.application import Window
+from critter.core.context import context, Persistent, Active
+from critter.core.world import World
+from resources import load_level
+from resources.levelcache import CompiledRoom
+
+ORDER = ('Entrance', 'Big', 'Level_1')
+
+
+def make_world(window: Window) -> World:
+    with redirect_stdout(io.StringIO()):
+        world = World(window.ctx)
+        world.load_world()
+    rooms = tuple(world.rooms.values())
+    x, y, z = array('f'), array('f'), array('f')
+    texture, transparent = array('H'), array('B')
+    for room in rooms:
+        x.extend(room.x)
+        y.extend(room.y)
+        z.extend(room.z)
+        texture.extend(room.texture)
+        transparent.extend(room.transparent)
+    world.add_compiled_room(CompiledRoom('Big', x, y, z, texture, transparent))
+    return world
+
+
+def loaded_state(world: World) -> tuple:
+    # Everything the loading order decides: which sprite sits where in each pool and which slots each room holds
+    return (
+        list(world.tiles.source), list(world.transparent.source), world.transparent.keys.tobytes(),
+        {name: room.slots.tobytes() for name, room in world.rooms.items()}
+    )
+
+
+def main():
+    window = Window()
+    context.window = window
+    context.persistent = Persistent()
+    context.active = Active()
+    context.active.world_data = load_level(context.WORLD_NAME, lazy=True)
+
+    world = make_world(window)
+    times = []
+    for name in ORDER:
+        start = perf_counter()
+        world.load_room(name)
+        times.append(perf_counter() - start)
+    expected = loaded_state(world)
+    sizes = [world.rooms[name].size for name in ORDER]
+    print('all at once: ' + ', '.join(f'{name} ({size} tiles) {1e3 * time:.1f}ms' for name, size, time in zip(ORDER, sizes, times)))
+
+    world = make_world(window)
+    for name in ORDER:
+        world.load_room_over_time(name)
+    frames = []
+    while world.loading:
+        start = perf_counter()
+        world.update_loading()
+        frames.append(perf_counter() - start)
+    assert loaded_state(world) == expected, 'loading over time gave different sprites or slots to loading all at once'
+    quantiles = statistics.quantiles(frames, n=100)
+    print(f'over time ({world.load_budget:.0f}us budget): {len(frames)} frames, p50 {1e3 * quantiles[49]:.2f}ms, p95 {1e3 * quantiles[94]:.2f}ms, max {1e3 * max(frames):.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Finding which room a point is in with a linear scan against the room spatial hash (user-009).
+
+The rooms are laid out on a jittered grid, each the size of the jam level's rooms.
+
+    python -m benchmarks.room_location [room counts...]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+import random
+from time import perf_counter
+
+from arcade.types import LRBTNF
+
+from critter.lib.spatial import SpatialHash
+
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or [1000, 10000]
+    rnd = random.Random(3)
+    for count in counts:
+        side = int(count ** 0.5) + 1
+        boxes = {}
+        for i in range(count):
+            x = (i % side) * 20 + rnd.uniform(-3, 3)
+            y = (i // side) * 45 + rnd.uniform(-3, 3)
+            boxes[f'room_{i}'] = LRBTNF(x - 8, x + 8, y - 20, y + 20, -0.5, 5.5)
+
+        index = SpatialHash(32.0)
+        for name, bounds in boxes.items():
+            index.insert(name, bounds)
+        points = [(rnd.uniform(-10, side * 20), rnd.uniform(-25, side * 45), rnd.uniform(0, 5)) for _ in range(2000)]
+
+        def linear(point):
+            for name, bounds in boxes.items():
+                if bounds.point_in_box(point):
+                    return name
+            return None
+
+        start = perf_counter()
+        expected = [linear(point) for point in points]
+        scan = perf_counter() - start
+
+        start = perf_counter()
+        found = [index.first(point) for point in points]
+        first = perf_counter() - start
+
+        start = perf_counter()
+        many = index.first_many(points)
+        batch = perf_counter() - start
+
+        assert expected == found == many
+        per = 1e6 / len(points)
+        print(f'{count} rooms: linear scan {scan * per:.1f}us, first {first * per:.2f}us, first_many {batch * per:.2f}us per point')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Baking opaque tiles into static buffer records (user-013).
+
+Times `bake_tiles` against packing every record on its own, then a synchronous load of the
+world's rooms as sprites against a static world. A headless window is opened for the second.
+
+    python -m benchmarks.static_baking [tile counts...]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import io
+import sys
+import random
+import struct
+from array import array
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from critter.core.baking import bake_tiles
+from critter.core.application import Window
+from critter.core.context import context, Persistent, Active
+from critter.core.world import World
+from resources import load_level
+
+
+def bake(counts: list[int]):
+    rnd = random.Random(2)
+    slots = list(range(100, 120))
+    sizes = [(32.0 + i, 48.0) for i in range(20)]
+    for count in counts:
+        x = array('f', (rnd.uniform(-50, 50) for _ in range(count)))
+        y = array('f', (rnd.uniform(-50, 50) for _ in range(count)))
+        z = array('f', (rnd.randint(0, 5) for _ in range(count)))
+        texture = array('H', (rnd.randrange(20) for _ in range(count)))
+        mask = bytes(rnd.random() < 0.8 for _ in range(count))
+
+        start = perf_counter()
+        baked = bake_tiles(x, y, z, texture, slots, sizes, mask)
+        bulk = perf_counter() - start
+
+        start = perf_counter()
+        packed = b''.join(
+            struct.pack('<7fI', x[i], y[i], z[i], *sizes[texture[i]], 0.0, slots[texture[i]], 0xFFFFFFFF)
+            for i in range(count) if mask[i]
+        )
+        single = perf_counter() - start
+
+        assert packed == bytes(baked)
+        print(f'{count} tiles (80% opaque): bake_tiles {1e3 * bulk:.1f}ms, per tile pack {1e3 * single:.1f}ms')
+
+
+def load(static: bool, window: Window) -> dict[str, float]:
+    with redirect_stdout(io.StringIO()):
+        world = World(window.ctx, static=static)
+        world.load_world()
+    times = {}
+    for name in world.rooms:
+        start = perf_counter()
+        world.load_room(name)
+        times[name] = perf_counter() - start
+    return times
+
+
+def main():
+    bake([int(count) for count in sys.argv[1:]] or [10000, 65536])
+
+    window = Window()
+    context.window = window
+    context.persistent = Persistent()
+    context.active = Active()
+    context.active.world_data = load_level(context.WORLD_NAME, lazy=True)
+    for static in (False, True):
+        times = load(static, window)
+        print(f'{"static " if static else "sprites"}: ' + ', '.join(f'{name} {1e3 * time:.1f}ms' for name, time in times.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Keeping the transparent sprites in draw order with SortedSpritePool against re-sorting the
+whole transparent set on every load and unload (user-012).
+
+Rooms of transparent tiles with random (partly tied) sort keys are loaded and unloaded at
+random, keeping a handful resident. The full re-sort is timed twice: the way the world used
+to do it, with SpritePool.sort reading the key off every sprite and moving every sprite, and
+as a bare list.sort of the slots which moves nothing. Every cycle the pool must give the
+same order as the bare sort, slot for slot.
+
+    python -m benchmarks.transparent_sort [cycles]
+"""
+import os
+os.environ.setdefault('ARCADE_HEADLESS', '1')
+
+import sys
+import random
+from array import array
+from time import perf_counter
+
+from arcade import BasicSprite, make_soft_square_texture
+
+from critter.lib.pool import SpritePool, SortedSpritePool
+
+ROOMS = 16
+RESIDENT = 8
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rnd = random.Random(5)
+    # Sort keys are depths and positions, so plenty of tiles share one
+    rooms = [array('d', (round(rnd.uniform(-50, 50) * 2) / 2 for _ in range(rnd.randint(100, 400)))) for _ in range(ROOMS)]
+
+    texture = make_soft_square_texture(4, (255, 255, 255))
+    pool = SortedSpritePool([BasicSprite(texture) for _ in range(RESIDENT * 400)])
+    full = SpritePool([BasicSprite(texture) for _ in range(RESIDENT * 400)])
+    keys = array('d', bytes(8 * pool.size))
+    order: list[int] = []
+    slots: dict[int, list[int]] = {}
+    full_slots: dict[int, list[int]] = {}
+    pooled = resprited = resorted = 0.0
+
+    def depth(sprite: BasicSprite) -> float:
+        return sprite.depth
+
+    def load(room: int):
+        nonlocal pooled, resprited, resorted
+        start = perf_counter()
+        given = slots[room] = pool.get_sorted(rooms[room])
+        pooled += perf_counter() - start
+
+        start = perf_counter()
+        sprites = full.sprites
+        full_slots[room] = full.get_many(len(rooms[room]))
+        for slot, key in zip(full_slots[room], rooms[room]):
+            sprites[slot].depth = key
+        full.sort(key=depth)
+        resprited += perf_counter() - start
+
+        start = perf_counter()
+        for slot, key in zip(given, rooms[room]):
+            keys[slot] = key
+        order.extend(given)
+        order.sort(key=keys.__getitem__)
+        resorted += perf_counter() - start
+
+    def unload(room: int):
+        nonlocal pooled, resprited, resorted
+        given = slots.pop(room)
+        start = perf_counter()
+        pool.give_many(given)
+        pooled += perf_counter() - start
+
+        start = perf_counter()
+        full.give_many(full_slots.pop(room))
+        full.sort(key=depth)
+        resprited += perf_counter() - start
+
+        start = perf_counter()
+        freed = set(given)
+        order[:] = [slot for slot in order if slot not in freed]
+        order.sort(key=keys.__getitem__)
+        resorted += perf_counter() - start
+
+    for room in rnd.sample(range(ROOMS), RESIDENT):
+        load(room)
+    for _ in range(cycles):
+        unload(rnd.choice(tuple(slots)))
+        load(rnd.choice([room for room in range(ROOMS) if room not in slots]))
+        assert list(pool.given_items) == order, 'the pool and the full sort disagree on the draw order'
+        assert [pool.keys[slot] for slot in order] == [full.sprites[slot].depth for slot in full.given_items]
+
+    per = 1e6 / (cycles * 2)
+    print(f'{cycles} load/unload cycles, {len(order)} resident transparent tiles, per load or unload:')
+    print(f'  SortedSpritePool {pooled * per:.1f}us, SpritePool.sort {resprited * per:.1f}us, bare list.sort {resorted * per:.1f}us')
+
+
+if __name__ == '__main__':
+    main()
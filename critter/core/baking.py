@@ -0,0 +1,112 @@
+"""
+Baking tiles which never move into one static buffer.
+
+Every record matches the attributes the isometric sprite shader reads from a SpriteList,
+interleaved into one buffer instead of spread over one per attribute:
+    in_pos 3f, in_size 2f, in_angle 1f, in_texture 1f, in_color 4f1 (32 bytes)
+
+So a baked room is drawn with the same program as the sprites, one draw call per room,
+and loading or unloading it is just attaching or detaching the buffer.
+"""
+from collections.abc import Sequence, Iterable
+from itertools import compress
+from array import array
+import struct
+
+from arcade import ArcadeContext
+from arcade.gl import BufferDescription, Buffer, Geometry, Program
+
+__all__ = (
+    'RECORD_FORMAT',
+    'RECORD_ATTRIBUTES',
+    'RECORD_SIZE',
+    'bake_tiles',
+    'StaticBatch'
+)
+
+RECORD_FORMAT = '3f 2f 1f 1f 4f1'
+RECORD_ATTRIBUTES = ('in_pos', 'in_size', 'in_angle', 'in_texture', 'in_color')
+RECORD_SIZE = 32
+_RECORD_STEP = RECORD_SIZE // 4
+_WHITE = 0xFFFFFFFF
+# in_size, in_angle, in_texture, in_color
+_TAIL = struct.Struct('<4fI')
+
+
+def bake_tiles(
+        x: Sequence[float],
+        y: Sequence[float],
+        z: Sequence[float],
+        texture: Sequence[int],
+        texture_slots: Sequence[int],
+        sizes: Sequence[tuple[float, float]],
+        mask: Iterable[int] | None = None
+    ) -> bytearray:
+    """
+    Interleave a room's tile columns into static buffer records. This is all CPU side so
+    it can be run (and checked) without a GPU.
+
+    Args:
+        x, y, z: The tile positions.
+        texture: The texture id of every tile.
+        texture_slots: The atlas slot of every texture id.
+        sizes: The (width, height) of every texture id.
+        mask: Which tiles to bake, or every tile if None.
+
+    Returns:
+        The records, RECORD_SIZE bytes per tile.
+    """
+    if mask is not None:
+        mask = bytes(mask)
+        x, y, z, texture = (compress(column, mask) for column in (x, y, z, texture))
+    x, y, z = array('f', x), array('f', y), array('f', z)
+
+    count = len(x)
+    data = bytearray(count * RECORD_SIZE)
+    if not count:
+        return data
+
+    # Everything after the position only depends on the texture, so each texture's
+    # tail is packed once and the tiles' tails are joined rather than packed one by one
+    tails = [_TAIL.pack(width, height, 0.0, slot, _WHITE) for slot, (width, height) in zip(texture_slots, sizes)]
+    step, tail_step = _RECORD_STEP, _TAIL.size // 4
+    with memoryview(data) as view, view.cast('f') as floats, memoryview(b''.join(map(tails.__getitem__, texture))) as joined, joined.cast('f') as tail:
+        floats[0::step] = x
+        floats[1::step] = y
+        floats[2::step] = z
+        for column in range(tail_step):
+            # Copying between views of the same format copies the bytes, so the color survives
+            floats[3 + column::step] = tail[column::tail_step]
+
+    return data
+
+
+class StaticBatch:
+    """
+    A baked buffer of tile records and the geometry to draw it with.
+    """
+
+    def __init__(self, ctx: ArcadeContext, data: bytes | bytearray):
+        self.count: int = len(data) // RECORD_SIZE
+        self.buffer: Buffer = ctx.buffer(data=data)
+        self.geometry: Geometry = ctx.geometry(
+            [BufferDescription(self.buffer, RECORD_FORMAT, list(RECORD_ATTRIBUTES))],
+            mode=ctx.POINTS
+        )
+
+    def render(self, program: Program, ranges: Sequence[tuple[int, int]] | None = None):
+        """
+        Draw the batch, or only the given (first, count) ranges of its records.
+        """
+        if not self.count:
+            return
+        if ranges is None:
+            self.geometry.render(program, vertices=self.count)
+            return
+        for first, count in ranges:
+            self.geometry.render(program, first=first, vertices=count)
+
+    def release(self):
+        # The geometry's vertex arrays are cleaned up with it, but the buffer can go straight away
+        self.buffer.delete()
+        self.count = 0
@@ -0,0 +1,134 @@
+"""
+Splitting rooms into chunks which can be culled against the camera.
+
+A chunk is a square of CHUNK_SIZE x CHUNK_SIZE tiles (a diamond on screen) within one room.
+A room's tiles are ordered by chunk when it is added to the world, so every chunk is one
+range of the room's tiles, and one range of its opaque tiles. Because the tile pool keeps
+a room's sprites together in the order they were given, and a baked room keeps its records
+in tile order, a visible chunk is always drawn as a single range.
+"""
+from __future__ import annotations
+from collections.abc import Sequence
+from dataclasses import dataclass
+from itertools import groupby
+from math import floor
+
+from arcade.types import LRBTNF
+
+__all__ = (
+    'CHUNK_SIZE',
+    'Chunk',
+    'CullStats',
+    'chunk_order',
+    'build_chunks',
+    'merge_ranges'
+)
+
+CHUNK_SIZE = 8
+
+
+class Chunk:
+    """
+    One chunk of a room, with its screen space bounds.
+
+    Args:
+        room: The name of the room the chunk belongs to.
+        start, end: The chunk's tiles are the room's tiles [start, end).
+        opaque_start, opaque_end: And the room's opaque tiles [opaque_start, opaque_end).
+        bounds: The left, right, bottom, and top of every sprite in the chunk on screen.
+    """
+
+    def __init__(self, room: str, start: int, end: int, opaque_start: int, opaque_end: int, bounds: tuple[float, float, float, float]):
+        self.room: str = room
+        self.start: int = start
+        self.end: int = end
+        self.opaque_start: int = opaque_start
+        self.opaque_end: int = opaque_end
+        self.bounds: tuple[float, float, float, float] = bounds
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+    @property
+    def box(self) -> LRBTNF:
+        left, right, bottom, top = self.bounds
+        return LRBTNF(left, right, bottom, top, 0.0, 0.0)
+
+
+@dataclass
+class CullStats:
+    """
+    What the last culled draw of the world considered and actually drew.
+    """
+    chunks: int = 0
+    chunks_drawn: int = 0
+    tiles: int = 0
+    tiles_drawn: int = 0
+    draw_calls: int = 0
+
+
+def _chunk_key(x: float, y: float, size: int) -> tuple[int, int]:
+    return floor(x / size), floor(y / size)
+
+
+def chunk_order(x: Sequence[float], y: Sequence[float], size: int = CHUNK_SIZE) -> list[int]:
+    """
+    The order of the tiles sorted by the chunk they are in. Tiles in the same chunk keep their order.
+    """
+    keys = [_chunk_key(tx, ty, size) for tx, ty in zip(x, y)]
+    return sorted(range(len(keys)), key=keys.__getitem__)
+
+
+def build_chunks(
+        name: str,
+        x: Sequence[float],
+        y: Sequence[float],
+        z: Sequence[float],
+        texture: Sequence[int],
+        transparent: Sequence[int],
+        sizes: Sequence[tuple[float, float]],
+        scale: tuple[float, float, float],
+        size: int = CHUNK_SIZE
+    ) -> list[Chunk]:
+    """
+    Split a room, whose tiles are already in `chunk_order`, into chunks.
+
+    The bounds match where the isometric shader puts each sprite: centered on
+    ((x - y) * sx, (x + y) * sy + z * sz + height / 2).
+    """
+    sx, sy, sz = scale
+    chunks = []
+    start = opaque_start = 0
+    for _, tiles in groupby(range(len(texture)), key=lambda idx: _chunk_key(x[idx], y[idx], size)):
+        tiles = list(tiles)
+        left = bottom = float('inf')
+        right = top = -float('inf')
+        for idx in tiles:
+            width, height = sizes[texture[idx]]
+            cx = (x[idx] - y[idx]) * sx
+            base = (x[idx] + y[idx]) * sy + z[idx] * sz
+            left, right = min(left, cx - width / 2.0), max(right, cx + width / 2.0)
+            bottom, top = min(bottom, base), max(top, base + height)
+
+        end = start + len(tiles)
+        opaque_end = opaque_start + sum(not transparent[idx] for idx in tiles)
+        chunks.append(Chunk(name, start, end, opaque_start, opaque_end, (left, right, bottom, top)))
+        start, opaque_start = end, opaque_end
+
+    return chunks
+
+
+def merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    Sort (first, count) ranges and join the ones which touch.
+    """
+    merged = []
+    for first, count in sorted(ranges):
+        if not count:
+            continue
+        if merged and merged[-1][0] + merged[-1][1] == first:
+            merged[-1] = merged[-1][0], merged[-1][1] + count
+        else:
+            merged.append((first, count))
+    return merged
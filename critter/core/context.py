@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from resources.LDtk import LDtkRoot
+from resources.levelcache import CompiledLevel
 
 if TYPE_CHECKING:
     from .application import Window, View
@@ -16,6 +17,7 @@ class Active:
     
     def __init__(self):
         self.world_data: LDtkRoot = None
+        self.world_cache: CompiledLevel | None = None
         self.world: World = None
 
 class Context:
@@ -31,6 +33,10 @@ class Context:
     THROBBER_SIZE: int = 48
     THROBBER_SPEED: int = 80 # ms / frame
     THROBBER_FADE: float = 200 # ms
+
+    # progress bar constants
+    PROGRESS_WIDTH: int = 160
+    PROGRESS_HEIGHT: int = 4
     
     def __init__(self):
         self.persistent: Persistent = None
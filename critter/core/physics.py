@@ -1,13 +1,690 @@
 """
 Simple Top Down AABB Physics Engine (with cludged depth)
+
+Colliders are boxes on the x/y plane with a depth along z. They are stored as columns in
+arrays rather than as objects, so every stage of a step works over the whole engine at once
+(the same way `Room` stores its tiles), and a Collider is only a handle to one row.
+
+A step:
+    1. Moves every collider by its velocity.
+    2. Finds the pairs of colliders which could be touching with a spatial hash. Every
+       collider which fits in a cell is put in the cell its bottom left corner is in, so
+       any collider it overlaps is in the same cell or one of the 8 around it. Colliders
+       too large for the cells are tested against everything.
+    3. Tests every candidate pair at once, one axis at a time so each axis only checks the
+       pairs the one before it kept, and pushes the ones which overlap apart along the axis
+       they overlap least on. Static colliders never move.
+    4. Keeps the moving colliders out of the ground. The ground is a height field (the
+       cludged depth): a collider walks up onto any cell no more than `step_height` above
+       it, and any taller cell is a wall, which it is slid along rather than stopped by.
+
+The engine runs at a fixed timestep however often it is updated, so it behaves the same
+at any frame rate.
+
+A step costs about 7us per collider (see `benchmarks/physics_step.py`), so around 2000
+colliders fit in the default 1/60s timestep with nothing else running. Past that the
+engine falls behind and `update` starts dropping time, so larger crowds need a longer
+timestep.
 """
+from __future__ import annotations
+from collections.abc import Sequence, Iterable, Callable
+from enum import IntEnum
+from array import array
+from itertools import repeat, compress, combinations, product
+from operator import add, sub, mul, gt, ge, lt, ne, or_, and_, not_, is_
+from math import floor, ceil, inf
+from typing import Any
+
+from arcade.types import LRBTNF
+
+from critter.lib.spatial import SpatialHash
+
+__all__ = (
+    'SIDE_RIGHT',
+    'SIDE_LEFT',
+    'SIDE_UP',
+    'SIDE_DOWN',
+    'Step',
+    'HeightField',
+    'Constraint',
+    'Collider',
+    'PhysicsEngine'
+)
+
+# Broadphase cells are keyed by column * stride + row
+_CELL_STRIDE = 1 << 32
+
+# The sides of a height field cell, see `HeightField.ledges`
+SIDE_RIGHT = 0b0001
+SIDE_LEFT = 0b0010
+SIDE_UP = 0b0100
+SIDE_DOWN = 0b1000
+
+
+class Step(IntEnum):
+    # What walking from one cell to another is like, see `HeightField.classify_step`
+    FLAT = 0
+    UP = 1  # Higher, but no more than a step
+    DOWN = 2  # Lower, but no more than a drop
+    WALL = 3  # Too high to step up
+    LEDGE = 4  # Too far to drop down
+    VOID = 5  # There is no ground
+
+
+class HeightField:
+    """
+    A compact grid of ground heights, one byte for every cell, such as the terrain of a room.
+
+    A cell's level is 0 if it has no ground, otherwise its ground is (level - 1) levels of
+    `level_height` above `base`. Storing the level + 1 means the highest ground under a box
+    is always the highest level, so a box is found with a plain `max` over its rows.
+
+    Args:
+        left, bottom: The corner of the first cell.
+        width, height: The number of cells along x and y.
+        levels: The level of every cell, a row of x at a time.
+        cell_size: The width and height of one cell.
+        base: The height of the lowest level.
+        level_height: How much higher each level is than the last.
+    """
+
+    def __init__(
+            self,
+            left: float,
+            bottom: float,
+            width: int,
+            height: int,
+            levels: bytes | bytearray | Sequence[int],
+            cell_size: float = 1.0,
+            base: float = 0.0,
+            level_height: float = 1.0
+        ):
+        if len(levels) != width * height:
+            raise ValueError(f'A {width}x{height} height field needs {width * height} levels, not {len(levels)}')
+        self.left: float = left
+        self.bottom: float = bottom
+        self.width: int = width
+        self.height: int = height
+        self.cell_size: float = cell_size
+        self._inv_size: float = 1.0 / cell_size
+        self.base: float = base
+        self.level_height: float = level_height
+        self.levels: array = array('B', levels)
+        # The height of every level, so reading a height is two lookups
+        self._heights: tuple[float, ...] = (-inf,) + tuple(base + level * level_height for level in range(255))
+
+    @classmethod
+    def from_tiles(cls, x: Sequence[float], y: Sequence[float], z: Sequence[float]) -> HeightField:
+        """
+        The ground of a room from its tiles. Tiles are centred on their cell, and the ground
+        of a cell is its highest tile, so it is the room's HeightOffset grid above its base.
+        Cells without any tiles have no ground.
+        """
+        if not len(x):
+            return cls(0.0, 0.0, 0, 0, b'')
+        left, bottom, base = min(x), min(y), floor(min(z))
+        width, height = round(max(x) - left) + 1, round(max(y) - bottom) + 1
+
+        # Flooring half a cell over rounds to the nearest cell, which float positions might be just off
+        cells = map(add, map(mul, map(floor, map(sub, y, repeat(bottom - 0.5))), repeat(width)), map(floor, map(sub, x, repeat(left - 0.5))))
+        levels = map(min, map(floor, map(sub, z, repeat(base - 1.5))), repeat(255))
+        # Sorted so the highest level of each cell is the one the dict keeps
+        tops = dict(sorted(zip(cells, levels)))
+        return cls(left - 0.5, bottom - 0.5, width, height, bytes(map(tops.get, range(width * height), repeat(0))), base=base)
+
+    @property
+    def bounds(self) -> LRBTNF:
+        return LRBTNF(
+            self.left, self.left + self.width * self.cell_size,
+            self.bottom, self.bottom + self.height * self.cell_size,
+            -inf, inf
+        )
+
+    def cell(self, x: float, y: float) -> int:
+        """
+        The index of the cell the point is in, or -1 if it is outside the field.
+        """
+        cx = floor((x - self.left) * self._inv_size)
+        cy = floor((y - self.bottom) * self._inv_size)
+        if not (0 <= cx < self.width and 0 <= cy < self.height):
+            return -1
+        return cy * self.width + cx
+
+    def height_at(self, x: float, y: float) -> float | None:
+        """
+        The ground height of the cell the point is in, or None if it has no ground or is
+        outside the field.
+        """
+        cx = floor((x - self.left) * self._inv_size)
+        cy = floor((y - self.bottom) * self._inv_size)
+        if not (0 <= cx < self.width and 0 <= cy < self.height):
+            return None
+        level = self.levels[cy * self.width + cx]
+        return self._heights[level] if level else None
+
+    def heights_at(self, x: Iterable[float], y: Iterable[float]) -> list[float | None]:
+        """
+        `height_at` for many points, with the lookups pulled out of the loop.
+        """
+        left, bottom, inv, width, height = self.left, self.bottom, self._inv_size, self.width, self.height
+        levels, heights = self.levels, (None,) + self._heights[1:]
+
+        found = []
+        add = found.append
+        for px, py in zip(x, y):
+            cx = floor((px - left) * inv)
+            cy = floor((py - bottom) * inv)
+            if 0 <= cx < width and 0 <= cy < height:
+                add(heights[levels[cy * width + cx]])
+            else:
+                add(None)
+        return found
+
+    def max_height(self, left: float, right: float, bottom: float, top: float) -> float:
+        """
+        The highest ground under a box, ignoring cells it only touches the edge of.
+        Parts of the box outside the field have no ground, and -inf is returned if none of it does.
+        """
+        inv = self._inv_size
+        c0 = max(floor((left - self.left) * inv), 0)
+        c1 = min(ceil((right - self.left) * inv), self.width)
+        r0 = max(floor((bottom - self.bottom) * inv), 0)
+        r1 = min(ceil((top - self.bottom) * inv), self.height)
+        if c0 >= c1 or r0 >= r1:
+            return -inf
+
+        levels, width = self.levels, self.width
+        return self._heights[max(max(levels[row + c0:row + c1]) for row in range(r0 * width, r1 * width, width))]
+
+    def max_heights(self, left: Sequence[float], right: Sequence[float], bottom: Sequence[float], top: Sequence[float]) -> list[float]:
+        """
+        `max_height` of many boxes. A box no bigger than a cell can only cover the cells under
+        its corners, so those are read for every box at once.
+        """
+        if not self.levels:
+            return [-inf] * len(left)
+        inv, origin_x, origin_y = self._inv_size, self.left, self.bottom
+        c0 = list(map(floor, map(mul, map(sub, left, repeat(origin_x)), repeat(inv))))
+        c1 = list(map(sub, map(ceil, map(mul, map(sub, right, repeat(origin_x)), repeat(inv))), repeat(1)))
+        r0 = list(map(floor, map(mul, map(sub, bottom, repeat(origin_y)), repeat(inv))))
+        r1 = list(map(sub, map(ceil, map(mul, map(sub, top, repeat(origin_y)), repeat(inv))), repeat(1)))
+        width, height, cell = self.width, self.height, self.levels.__getitem__
+
+        # Clamping a corner to the edge of the field still reads a cell under the box, as long as
+        # some of the box is inside the field
+        lower = list(map(mul, map(min, map(max, r0, repeat(0)), repeat(height - 1)), repeat(width)))
+        upper = list(map(mul, map(max, map(min, r1, repeat(height - 1)), repeat(0)), repeat(width)))
+        first = list(map(min, map(max, c0, repeat(0)), repeat(width - 1)))
+        last = list(map(max, map(min, c1, repeat(width - 1)), repeat(0)))
+        grounds = list(map(self._heights.__getitem__, map(
+            max,
+            map(cell, map(add, lower, first)), map(cell, map(add, lower, last)),
+            map(cell, map(add, upper, first)), map(cell, map(add, upper, last))
+        )))
+
+        # The boxes which cover more than their corners' cells, or none of the field, are done one by one.
+        # A span is only 0 or 1 cells if nothing but its lowest bit is set
+        odd = map(
+            or_,
+            map(or_, map(and_, map(sub, c1, c0), repeat(-2)), map(and_, map(sub, r1, r0), repeat(-2))),
+            map(or_, map(or_, map(ge, c0, repeat(width)), map(lt, c1, repeat(0))), map(or_, map(ge, r0, repeat(height)), map(lt, r1, repeat(0))))
+        )
+        for idx in compress(range(len(grounds)), odd):
+            grounds[idx] = self.max_height(left[idx], right[idx], bottom[idx], top[idx])
+        return grounds
+
+    def cell_edge(self, value: float, axis: int, upper: bool) -> float:
+        """
+        The nearest cell edge along x (axis 0) or y (axis 1) at or below the value,
+        or above it if `upper`.
+        """
+        origin = self.bottom if axis else self.left
+        cell = (value - origin) * self._inv_size
+        return origin + (ceil(cell) if upper else floor(cell)) * self.cell_size
+
+    def _sides(self, compare: Callable[[int, int], bool]) -> array:
+        # Compare every cell to its neighbour on each side by comparing the grid to shifted copies
+        # of itself, like finding the columns in `expand_level`. Off the grid there is no ground.
+        levels, width = self.levels, self.width
+        if not levels:
+            # An empty room's field has no cells, and slicing it by its width would fail
+            return array('B')
+        pad = bytes(width)
+        right = [*levels[1:], 0]
+        right[width - 1::width] = bytes(self.height)
+        left = [0, *levels[:-1]]
+        left[::width] = bytes(self.height)
+        up, down = [*levels[width:], *pad], [*pad, *levels[:-width]]
+
+        sides = map(
+            or_,
+            map(or_, map(compare, levels, right), map(mul, map(compare, levels, left), repeat(SIDE_LEFT))),
+            map(or_, map(mul, map(compare, levels, up), repeat(SIDE_UP)), map(mul, map(compare, levels, down), repeat(SIDE_DOWN)))
+        )
+        return array('B', sides)
+
+    def ledges(self, drop: float) -> array:
+        """
+        The sides of every cell (SIDE_* flags) which drop more than `drop`, or onto no ground.
+        Cells without ground have no ledges.
+        """
+        levels = drop / self.level_height
+        return self._sides(lambda cell, other: bool(cell) and (not other or cell - other > levels))
+
+    def walls(self, step: float) -> array:
+        """
+        The sides of every cell (SIDE_* flags) which rise more than `step`.
+        Cells without ground have no walls.
+        """
+        levels = step / self.level_height
+        return self._sides(lambda cell, other: bool(cell) and other - cell > levels)
+
+    def classify_step(self, x0: float, y0: float, x1: float, y1: float, step: float, drop: float = inf) -> Step:
+        """
+        What walking from one point to another is like, only looking at the two cells.
+        """
+        start, end = self.height_at(x0, y0), self.height_at(x1, y1)
+        if start is None or end is None:
+            return Step.VOID
+        rise = end - start
+        if rise > step:
+            return Step.WALL
+        if -rise > drop:
+            return Step.LEDGE
+        if rise > 0.0:
+            return Step.UP
+        if rise < 0.0:
+            return Step.DOWN
+        return Step.FLAT
+
+    def can_walk(self, x0: float, y0: float, x1: float, y1: float, step: float, drop: float = inf) -> bool:
+        """
+        Whether a point can walk in a straight line between two points, never climbing more
+        than `step` or dropping more than `drop` from one cell to the next, or leaving the ground.
+
+        Every cell the line crosses is visited in order (Amanatides & Woo), so it never cuts
+        across a corner.
+        """
+        inv = self._inv_size
+        fx, fy = (x0 - self.left) * inv, (y0 - self.bottom) * inv
+        dx, dy = (x1 - x0) * inv, (y1 - y0) * inv
+        cx, cy = floor(fx), floor(fy)
+        ex, ey = floor((x1 - self.left) * inv), floor((y1 - self.bottom) * inv)
+
+        width, height, levels = self.width, self.height, self.levels
+        if not (0 <= cx < width and 0 <= cy < height):
+            return False
+        level = levels[cy * width + cx]
+        if not level:
+            return False
+
+        step_x = 1 if dx > 0.0 else -1
+        step_y = 1 if dy > 0.0 else -1
+        # How far along the line (0 to 1) the next x and y cell edges are, and the distance between them
+        delta_x = abs(1.0 / dx) if dx else inf
+        delta_y = abs(1.0 / dy) if dy else inf
+        next_x = ((cx + 1 - fx) if dx > 0.0 else (fx - cx)) * delta_x if dx else inf
+        next_y = ((cy + 1 - fy) if dy > 0.0 else (fy - cy)) * delta_y if dy else inf
+
+        rise, fall = step / self.level_height, drop / self.level_height
+        for _ in range(abs(ex - cx) + abs(ey - cy)):
+            if next_x < next_y:
+                cx += step_x
+                next_x += delta_x
+            else:
+                cy += step_y
+                next_y += delta_y
+
+            if not (0 <= cx < width and 0 <= cy < height):
+                return False
+            other = levels[cy * width + cx]
+            if not other or other - level > rise or level - other > fall:
+                return False
+            level = other
+        return True
+
 
 class Constraint:
 
     def __init__(self):
         pass
 
+
 class Collider:
-    
-    def __init__(self):
-        pass
\ No newline at end of file
+    """
+    A handle to one collider in a PhysicsEngine. It stays valid while other colliders are
+    added and removed, until it is removed itself.
+
+    Args:
+        engine: The engine the collider is in.
+        index: The collider's row in the engine's arrays.
+        owner: Whatever the collider belongs to, so contacts can be traced back to it.
+    """
+    __slots__ = ('engine', 'index', 'owner')
+
+    def __init__(self, engine: PhysicsEngine, index: int, owner: Any = None):
+        self.engine: PhysicsEngine | None = engine
+        self.index: int = index
+        self.owner: Any = owner
+
+    @property
+    def alive(self) -> bool:
+        return self.engine is not None
+
+    @property
+    def position(self) -> tuple[float, float]:
+        return self.engine.x[self.index], self.engine.y[self.index]
+
+    @position.setter
+    def position(self, position: tuple[float, float]):
+        self.engine.x[self.index], self.engine.y[self.index] = position
+
+    @property
+    def z(self) -> float:
+        return self.engine.z[self.index]
+
+    @z.setter
+    def z(self, z: float):
+        self.engine.z[self.index] = z
+
+    @property
+    def velocity(self) -> tuple[float, float]:
+        return self.engine.vx[self.index], self.engine.vy[self.index]
+
+    @velocity.setter
+    def velocity(self, velocity: tuple[float, float]):
+        if self.static:
+            raise ValueError('A static collider cannot move')
+        self.engine.vx[self.index], self.engine.vy[self.index] = velocity
+
+    @property
+    def half_size(self) -> tuple[float, float]:
+        return self.engine.half_width[self.index], self.engine.half_height[self.index]
+
+    @property
+    def static(self) -> bool:
+        return bool(self.engine.static[self.index])
+
+    @property
+    def box(self) -> LRBTNF:
+        engine, idx = self.engine, self.index
+        x, y, z, hw, hh = engine.x[idx], engine.y[idx], engine.z[idx], engine.half_width[idx], engine.half_height[idx]
+        return LRBTNF(x - hw, x + hw, y - hh, y + hh, z, z + engine.depth[idx])
+
+
+class PhysicsEngine:
+    """
+    Steps every collider at a fixed timestep, see the module docstring.
+
+    The columns (x, y, z, half_width, half_height, depth, vx, vy, static) can be read and
+    written directly to move many colliders at once, as long as colliders aren't added or
+    removed at the same time.
+
+    Args:
+        timestep: The seconds one step simulates.
+        cell_size: The size of a broadphase cell. It should be a little larger than the
+            most common collider, as any collider larger than a cell is tested against
+            every other collider.
+        step_height: How far a collider can step up onto higher ground.
+        max_steps: The most steps one update will run, so a long frame can't snowball.
+    """
+
+    def __init__(self, timestep: float = 1.0 / 60.0, cell_size: float = 2.0, step_height: float = 0.5, max_steps: int = 5):
+        self.timestep: float = timestep
+        self.cell_size: float = cell_size
+        self.step_height: float = step_height
+        self.max_steps: int = max_steps
+        self._accumulator: float = 0.0
+
+        self.x: array = array('d')
+        self.y: array = array('d')
+        self.z: array = array('d')
+        self.half_width: array = array('d')
+        self.half_height: array = array('d')
+        self.depth: array = array('d')
+        self.vx: array = array('d')
+        self.vy: array = array('d')
+        self.static: array = array('B')
+        self._columns: tuple[array, ...] = (
+            self.x, self.y, self.z, self.half_width, self.half_height, self.depth, self.vx, self.vy, self.static
+        )
+        self._colliders: list[Collider] = []
+
+        self._fields: SpatialHash[HeightField] = SpatialHash(16.0)
+        self.contacts: list[tuple[Collider, Collider]] = []
+
+    def __len__(self) -> int:
+        return len(self._colliders)
+
+    @property
+    def colliders(self) -> tuple[Collider, ...]:
+        return tuple(self._colliders)
+
+    def add_collider(
+            self,
+            x: float,
+            y: float,
+            half_width: float,
+            half_height: float,
+            z: float = 0.0,
+            depth: float = 1.0,
+            static: bool = False,
+            owner: Any = None
+        ) -> Collider:
+        collider = Collider(self, len(self._colliders), owner)
+        for column, value in zip(self._columns, (x, y, z, half_width, half_height, depth, 0.0, 0.0, static)):
+            column.append(value)
+        self._colliders.append(collider)
+        return collider
+
+    def remove_collider(self, collider: Collider):
+        if collider.engine is not self:
+            raise ValueError(f'{collider} is not in this engine')
+        # The last collider takes the removed one's row so the columns stay packed
+        idx, last = collider.index, len(self._colliders) - 1
+        for column in self._columns:
+            column[idx] = column[last]
+            column.pop()
+        moved = self._colliders.pop()
+        if moved is not collider:
+            self._colliders[idx] = moved
+            moved.index = idx
+        collider.engine, collider.index = None, -1
+
+    def add_heightfield(self, field: HeightField):
+        self._fields.insert(field, field.bounds)
+
+    def remove_heightfield(self, field: HeightField):
+        self._fields.remove(field)
+
+    def heightfield_at(self, x: float, y: float) -> HeightField | None:
+        return self._fields.first((x, y, 0.0))
+
+    def ground_at(self, x: float, y: float) -> float | None:
+        """
+        The ground height at a point, or None if there is no ground there.
+        """
+        field = self._fields.first((x, y, 0.0))
+        return None if field is None else field.height_at(x, y)
+
+    def update(self, delta_time: float) -> int:
+        """
+        Run as many fixed steps as the time passed needs.
+
+        Returns:
+            How many steps were run.
+        """
+        self._accumulator += delta_time
+        steps = 0
+        while self._accumulator >= self.timestep:
+            if steps >= self.max_steps:
+                # Too far behind to catch up, so drop the time rather than stall every frame after
+                self._accumulator = 0.0
+                break
+            self.step()
+            self._accumulator -= self.timestep
+            steps += 1
+        return steps
+
+    def step(self):
+        dt = self.timestep
+        x, y = self.x, self.y
+        old_x, old_y = x[:], y[:]
+
+        x[:] = array('d', map(add, x, map(mul, self.vx, repeat(dt))))
+        y[:] = array('d', map(add, y, map(mul, self.vy, repeat(dt))))
+
+        self._collide_colliders()
+        if len(self._fields):
+            self._collide_ground(old_x, old_y)
+
+    def _candidate_pairs(self) -> tuple[Sequence[int], Sequence[int]]:
+        x, y, hw, hh = self.x, self.y, self.half_width, self.half_height
+        size = self.cell_size
+        inv = 1.0 / size
+
+        # Colliders which fit in a cell only have to be checked against the cells around them
+        fits = list(map(not_, map(or_, map(gt, hw, repeat(size / 2.0)), map(gt, hh, repeat(size / 2.0)))))
+        small = list(compress(range(len(x)), fits))
+        large = [idx for idx, fit in enumerate(fits) if not fit]
+
+        # A cell is keyed by one int rather than a tuple so its neighbours are just offsets
+        stride = _CELL_STRIDE
+        cells: dict[int, list[int]] = {}
+        # Without any large colliders every row is small, and the columns can be read as they are
+        if large:
+            x, y, hw, hh = (list(map(column.__getitem__, small)) for column in (x, y, hw, hh))
+        keys = map(
+            add,
+            map(mul, map(floor, map(mul, map(sub, x, hw), repeat(inv))), repeat(stride)),
+            map(floor, map(mul, map(sub, y, hh), repeat(inv)))
+        )
+        for idx, key in zip(small, keys):
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [idx]
+            else:
+                cell.append(idx)
+
+        pairs: list[tuple[int, int]] = []
+        add_pairs = pairs.extend
+        filled = list(cells.values())
+        for cell in compress(filled, map(gt, map(len, filled), repeat(1))):
+            add_pairs(combinations(cell, 2))
+        # Half of the neighbours, so each pair of cells is only visited once
+        for offset in (stride, stride + 1, 1, 1 - stride):
+            neighbours = list(map(cells.get, map(add, cells, repeat(offset))))
+            for cell, other in compress(zip(filled, neighbours), neighbours):
+                add_pairs(product(cell, other))
+
+        for n, idx in enumerate(large):
+            add_pairs(product((idx,), small))
+            add_pairs(product((idx,), large[n + 1:]))
+
+        if not pairs:
+            return [], []
+        first, second = zip(*pairs)
+        return first, second
+
+    def _collide_colliders(self):
+        self.contacts = []
+        first, second = self._candidate_pairs()
+        if not first:
+            return
+
+        x, y, z, hw, hh, depth, static = self.x, self.y, self.z, self.half_width, self.half_height, self.depth, self.static
+
+        # Most candidates are thrown out by their x overlap alone, so each axis only checks what
+        # survived the one before it
+        overlap_x = list(map(sub, map(add, map(hw.__getitem__, first), map(hw.__getitem__, second)), map(abs, map(sub, map(x.__getitem__, second), map(x.__getitem__, first)))))
+        near = list(compress(zip(first, second, overlap_x), map(gt, overlap_x, repeat(0.0))))
+        if not near:
+            return
+        first, second, overlap_x = zip(*near)
+        overlap_y = list(map(sub, map(add, map(hh.__getitem__, first), map(hh.__getitem__, second)), map(abs, map(sub, map(y.__getitem__, second), map(y.__getitem__, first)))))
+        near = list(compress(zip(first, second, overlap_x, overlap_y), map(gt, overlap_y, repeat(0.0))))
+        if not near:
+            return
+        first, second, overlap_x, overlap_y = zip(*near)
+
+        top = map(min, map(add, map(z.__getitem__, first), map(depth.__getitem__, first)), map(add, map(z.__getitem__, second), map(depth.__getitem__, second)))
+        overlap_z = map(sub, top, map(max, map(z.__getitem__, first), map(z.__getitem__, second)))
+        movable = map(not_, map(and_, map(static.__getitem__, first), map(static.__getitem__, second)))
+
+        hits = map(and_, map(gt, overlap_z, repeat(0.0)), movable)
+        vx, vy, colliders = self.vx, self.vy, self._colliders
+        contacts = self.contacts
+        for i, j, px, py in compress(zip(first, second, overlap_x, overlap_y), hits):
+            contacts.append((colliders[i], colliders[j]))
+            # How much of the push each collider takes
+            share_i = 0.0 if static[i] else (1.0 if static[j] else 0.5)
+            share_j = 1.0 - share_i
+            if px < py:
+                direction = 1.0 if x[j] >= x[i] else -1.0
+                x[i] -= px * share_i * direction
+                x[j] += px * share_j * direction
+                if vx[i] * direction > 0.0 and share_i:
+                    vx[i] = 0.0
+                if vx[j] * direction < 0.0 and share_j:
+                    vx[j] = 0.0
+            else:
+                direction = 1.0 if y[j] >= y[i] else -1.0
+                y[i] -= py * share_i * direction
+                y[j] += py * share_j * direction
+                if vy[i] * direction > 0.0 and share_i:
+                    vy[i] = 0.0
+                if vy[j] * direction < 0.0 and share_j:
+                    vy[j] = 0.0
+
+    def _collide_ground(self, old_x: array, old_y: array):
+        x, y, z, hw, hh = self.x, self.y, self.z, self.half_width, self.half_height
+        step = self.step_height
+
+        # Only colliders which moved can have walked into a wall or off a ledge
+        moved = list(compress(range(len(x)), map(or_, map(ne, x, old_x), map(ne, y, old_y))))
+        fields = self._fields.first_many(zip(map(x.__getitem__, moved), map(y.__getitem__, moved), repeat(0.0)))
+
+        # Only a few fields are ever under the colliders, so each is grouped with a pass of its own
+        for field in dict.fromkeys(fields):
+            if field is None:
+                continue
+            group = list(compress(moved, map(is_, fields, repeat(field))))
+            gx, gy, gw, gh, gz = (list(map(column.__getitem__, group)) for column in (x, y, hw, hh, z))
+            grounds = field.max_heights(list(map(sub, gx, gw)), list(map(add, gx, gw)), list(map(sub, gy, gh)), list(map(add, gy, gh)))
+
+            for n in compress(range(len(group)), map(gt, grounds, map(add, gz, repeat(step)))):
+                idx = group[n]
+                grounds[n] = self._slide(field, idx, old_x[idx], old_y[idx])
+            # Any box whose center is in the field has ground under it, unless sliding took it back out.
+            # Most are still on the ground they were on, so only the ones whose height changed are written
+            changed = map(and_, map(gt, grounds, repeat(-inf)), map(ne, grounds, gz))
+            for idx, ground in compress(zip(group, grounds), changed):
+                z[idx] = ground
+
+    def _slide(self, field: HeightField, idx: int, ox: float, oy: float) -> float:
+        """
+        Move a collider which walked into a wall one axis at a time, so it slides along the
+        wall rather than sticking to it.
+
+        Returns:
+            The ground height where it ends up.
+        """
+        x, y, hw, hh = self.x, self.y, self.half_width, self.half_height
+        nx, ny, w, h = x[idx], y[idx], hw[idx], hh[idx]
+        limit = self.z[idx] + self.step_height
+
+        if nx != ox and field.max_height(nx - w, nx + w, oy - h, oy + h) > limit:
+            if nx > ox:
+                nx = max(field.cell_edge(nx + w, 0, False) - w, ox)
+            else:
+                nx = min(field.cell_edge(nx - w, 0, True) + w, ox)
+            self.vx[idx] = 0.0
+        if ny != oy and field.max_height(nx - w, nx + w, ny - h, ny + h) > limit:
+            if ny > oy:
+                ny = max(field.cell_edge(ny + h, 1, False) - h, oy)
+            else:
+                ny = min(field.cell_edge(ny - h, 1, True) + h, oy)
+            self.vy[idx] = 0.0
+
+        x[idx], y[idx] = nx, ny
+        return field.max_height(nx - w, nx + w, ny - h, ny + h)
@@ -0,0 +1,138 @@
+"""
+Loading every asset the game needs while the splash screens play.
+
+The files are read and decoded on the worker threads. Only the work which needs the GPU
+(adding textures to the atlas, compiling shaders, and making the world's sprites) is done
+on the main thread, a step at a time, so the splash and throbber keep animating.
+"""
+from __future__ import annotations
+from collections.abc import Callable, Generator
+
+from arcade import ArcadeContext, Texture, Sound, get_window
+
+from critter.lib.loading import ThreadedTask, TaskGraph
+from .context import context
+from .world import World
+
+from resources import (
+    LDtkRoot,
+    CompiledLevel,
+    read_shader,
+    load_png,
+    load_ogg,
+    load_level,
+    load_level_cache,
+    load_atlas,
+    list_atlas_sources,
+    list_ogg,
+    register_png,
+    register_ogg,
+    register_program
+)
+
+__all__ = (
+    'PROGRAMS',
+    'preload_assets'
+)
+
+# (vertex, fragment, geometry) shader names of every program the game compiles
+PROGRAMS: tuple[tuple[str, str | None, str | None], ...] = (
+    ('isometric_sprite_vs', 'isometric_sprite_fs', 'isometric_sprite_gs'),
+)
+
+
+def _load_textures() -> dict[str, Texture]:
+    # The packed atlas is one decode, otherwise every png is decoded on its own
+    textures = load_atlas()
+    if textures is None:
+        textures = {name: load_png(name) for name in list_atlas_sources()}
+    return textures
+
+
+def _upload_textures(ctx: ArcadeContext, textures: dict[str, Texture]) -> Generator:
+    atlas = ctx.default_atlas
+    for name, texture in textures.items():
+        register_png(name, texture)
+        atlas.add(texture)
+        yield
+
+
+def _load_sound(name: str) -> Sound | None:
+    try:
+        return load_ogg(name)
+    except FileNotFoundError:
+        # arcade raises this when there is no decoder for the file too. The sound is left
+        # to load (and fail) when it is played rather than stopping every other asset.
+        return None
+
+
+def _upload_sound(name: str, sound: Sound | None):
+    if sound is not None:
+        register_ogg(name, sound)
+
+
+def _read_program(vertex: str, fragment: str | None, geometry: str | None) -> tuple[str, str | None, str | None]:
+    return read_shader(vertex), None if fragment is None else read_shader(fragment), None if geometry is None else read_shader(geometry)
+
+
+def _upload_program(ctx: ArcadeContext, names: tuple[str, str | None, str | None], sources: tuple[str, str | None, str | None]):
+    vertex, fragment, geometry = (None if source is None else ctx.shader_inc(source) for source in sources)
+    register_program(ctx.program(vertex_shader=vertex, fragment_shader=fragment, geometry_shader=geometry), *names)
+
+
+def _load_world_data() -> tuple[LDtkRoot, CompiledLevel | None]:
+    # The layers are only needed if there is no up to date compiled cache
+    return load_level(context.WORLD_NAME, lazy=True), load_level_cache(context.WORLD_NAME)
+
+
+def _upload_world_data(data: tuple[LDtkRoot, CompiledLevel | None]):
+    context.active.world_data, context.active.world_cache = data
+
+
+def _upload_world(ctx: ArcadeContext) -> Generator:
+    world = World(ctx)
+    yield
+    # There are no saves to pick from, so the one world is loaded straight away
+    world.load_world()
+    context.active.world = world
+
+
+def preload_assets(finish: Callable[[], None] | None = None, ctx: ArcadeContext | None = None) -> TaskGraph:
+    """
+    Make the task which loads every texture, sound, and shader, and then the world.
+
+    The world is only made once the textures and shaders it uses are uploaded, while
+    reading the world's files happens alongside everything else. The tasks are weighted
+    by roughly how long each takes so the fraction moves steadily.
+
+    Args:
+        finish: Called once everything is loaded.
+        ctx: The context to upload to, the window's if None.
+    """
+    ctx = ctx or get_window().ctx
+    graph = TaskGraph(finish)
+
+    textures = ThreadedTask()
+    textures.add(_load_textures, lambda loaded: _upload_textures(ctx, loaded))
+    graph.add(textures, weight=8.0)
+
+    sounds = ThreadedTask()
+    for name in list_ogg():
+        sounds.add(lambda name=name: _load_sound(name), lambda sound, name=name: _upload_sound(name, sound))
+    graph.add(sounds, weight=4.0)
+
+    programs = ThreadedTask()
+    for names in PROGRAMS:
+        programs.add(lambda names=names: _read_program(*names), lambda sources, names=names: _upload_program(ctx, names, sources))
+    graph.add(programs, weight=2.0)
+
+    world_data = ThreadedTask()
+    world_data.add(_load_world_data, _upload_world_data)
+    graph.add(world_data, weight=4.0)
+
+    # Making the world is all main thread work, so its job has nothing to do
+    world = ThreadedTask()
+    world.add(lambda: None, lambda _: _upload_world(ctx))
+    graph.add(world, after=(textures, programs, world_data), weight=12.0)
+
+    return graph
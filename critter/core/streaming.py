@@ -0,0 +1,234 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from collections import deque, OrderedDict
+from math import inf
+
+from arcade import Vec2
+from arcade.types import LRBTNF
+
+if TYPE_CHECKING:
+    from .world import World
+
+
+class RoomStreamer:
+    """
+    Keeps the room the player is in, and the rooms around it, loaded.
+
+    The rooms which should be resident are the focused room, every room within `radius`
+    neighbour hops of it (using the LDtk neighbours), and the rooms below each of those
+    (a lower world depth under the room's bounds) since they can be seen through gaps.
+    Rooms are only unloaded once the sprite pools cannot fit a room that is wanted, and then
+    the least recently wanted rooms go first. So walking back and forth between two rooms
+    never reloads either.
+
+    The movement of the camera is tracked so the room it is heading towards can be loaded
+    before it gets there.
+
+    Loading and unloading are queued and `update` only hands up to `budget` tiles of work
+    to the world each frame (always at least one room so the queue can't stall). The world
+    then loads the rooms a chunk at a time within its own per frame time budget.
+
+    Args:
+        world: The world to stream rooms into.
+        radius: How many neighbour hops around the focused room to keep loaded.
+        budget: The number of tiles which can be queued or unloaded in one frame.
+        prefetch_time: How many seconds ahead the camera's movement is predicted.
+    """
+
+    def __init__(self, world: World, radius: int = 1, budget: int = 4096, prefetch_time: float = 0.5):
+        self.world: World = world
+        self.radius: int = radius
+        self.budget: int = budget
+        self.prefetch_time: float = prefetch_time
+
+        self.focus_room: str | None = None
+        self.prefetch_room: str | None = None
+        # The rooms which must not be evicted, in the order they should load
+        self.wanted: tuple[str, ...] = ()
+
+        self._queue: deque[str] = deque()
+        # loaded rooms from least to most recently wanted
+        self._recent: OrderedDict[str, None] = OrderedDict()
+
+        self._camera: Vec2 | None = None
+        self._velocity: Vec2 = Vec2(0.0, 0.0)
+
+    @property
+    def pending(self) -> tuple[str, ...]:
+        return tuple(self._queue)
+
+    @property
+    def idle(self) -> bool:
+        return not self._queue
+
+    def reset(self):
+        self.focus_room = self.prefetch_room = None
+        self.wanted = ()
+        self._queue.clear()
+        self._recent.clear()
+        self._camera = None
+        self._velocity = Vec2(0.0, 0.0)
+
+    def resident_set(self, name: str, radius: int | None = None) -> list[str]:
+        """
+        The room, the rooms within `radius` neighbour hops of it, and the rooms below all of them.
+        """
+        world = self.world
+        radius = self.radius if radius is None else radius
+
+        found = [name]
+        seen = {name}
+        frontier = [name]
+        for _ in range(radius):
+            step = []
+            for room in frontier:
+                for neighbour in world.neighbours.get(room, ()):
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        step.append(neighbour)
+            found.extend(step)
+            frontier = step
+
+        for room in tuple(found):
+            for below in self.rooms_below(room):
+                if below not in seen:
+                    seen.add(below)
+                    found.append(below)
+
+        return found
+
+    def rooms_below(self, name: str) -> list[str]:
+        world = self.world
+        depth = world.room_depths.get(name, 0)
+        bounds = world.rooms[name].bounds
+        under = LRBTNF(bounds.left, bounds.right, bounds.bottom, bounds.top, -inf, bounds.far)
+        return [room for room in world.rooms_in(under) if world.room_depths.get(room, 0) < depth]
+
+    def focus(self, name: str):
+        """
+        Make `name` the room which is streamed around. Rooms are queued closest first.
+        """
+        if name not in self.world.rooms:
+            return
+
+        self.focus_room = name
+        self._refresh()
+
+    def prefetch(self, name: str | None):
+        """
+        Load a room (and the rooms below it) ahead of time without moving the focus.
+        """
+        if name == self.prefetch_room:
+            return
+        self.prefetch_room = name
+        self._refresh()
+
+    def _refresh(self):
+        wanted = self.resident_set(self.focus_room) if self.focus_room is not None else []
+        if self.prefetch_room is not None:
+            wanted.extend(room for room in self.resident_set(self.prefetch_room, 0) if room not in wanted)
+        self.wanted = tuple(wanted)
+
+        loaded = self.world.loaded_rooms
+        # Rooms which are no longer wanted are dropped from the queue rather than loaded
+        queue = [room for room in self._queue if room in wanted]
+        for room in wanted:
+            if room in loaded:
+                self._touch(room)
+            elif room not in queue:
+                queue.append(room)
+        self._queue = deque(queue)
+
+    def _touch(self, name: str):
+        self._recent[name] = None
+        self._recent.move_to_end(name)
+
+    def track(self, camera_position: Vec2, delta_time: float):
+        """
+        Follow the camera (in screen space). The room the camera is over becomes the focus,
+        and the room it will be over after `prefetch_time` seconds is prefetched.
+        """
+        position = Vec2(*camera_position)
+        if self._camera is not None and delta_time > 0.0:
+            velocity = (position - self._camera) / delta_time
+            # Smooth the velocity so a single jittery frame doesn't prefetch the wrong room
+            self._velocity = self._velocity * 0.5 + velocity * 0.5
+        self._camera = position
+
+        world = self.world
+        current = world.screen_location(position)
+        if current is not None and current != self.focus_room:
+            world.enter_room(current)
+
+        ahead = world.screen_location(position + self._velocity * self.prefetch_time)
+        self.prefetch(ahead if ahead != self.focus_room else None)
+
+    def update(self) -> int:
+        """
+        Queue up to `budget` tiles of loading with the world (and do any evictions it needs).
+
+        Returns:
+            The number of tiles queued or unloaded.
+        """
+        world = self.world
+        spent = 0
+        while self._queue and (spent == 0 or spent < self.budget):
+            name = self._queue[0]
+            if name in world.loaded_rooms or any(load.name == name for load in world.loading):
+                self._queue.popleft()
+                self._touch(name)
+                continue
+
+            room = world.rooms[name]
+            if not world.can_fit(name):
+                evicted = self._evict()
+                if evicted is None:
+                    # Every loaded room is wanted, so the room waits until it is asked for again
+                    self._queue.popleft()
+                    continue
+                spent += evicted
+                continue
+
+            self._queue.popleft()
+            world.load_room_over_time(name)
+            self._touch(name)
+            spent += room.size
+
+        return spent
+
+    def _evict(self) -> int | None:
+        """
+        Unload the least recently wanted room which isn't wanted now.
+
+        Returns:
+            The number of tiles unloaded or None if there was nothing to evict.
+        """
+        world = self.world
+        wanted = set(self.wanted)
+        # Rooms which are part way through loading can be evicted too
+        loaded = world.loaded_rooms.union(load.name for load in world.loading)
+
+        # Rooms loaded without going through the streamer are the oldest
+        for name in loaded:
+            if name not in self._recent:
+                self._recent[name] = None
+                self._recent.move_to_end(name, last=False)
+
+        for name in tuple(self._recent):
+            if name not in loaded:
+                del self._recent[name]
+                continue
+            if name in wanted:
+                continue
+            del self._recent[name]
+            world.unload_room(name)
+            return world.rooms[name].size
+        return None
+
+    def flush(self):
+        """
+        Finish everything queued right now, e.g. behind a loading screen.
+        """
+        while self._queue:
+            self.update()
+        self.world.finish_loading()
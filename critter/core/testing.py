@@ -0,0 +1,100 @@
+"""
+Stand-ins, synthetic levels, and reference implementations shared by the tests and the benchmarks.
+"""
+import random
+from array import array
+
+from resources.LDtk import Level, Layer, Tile
+from resources.levelcache import CompiledRoom
+
+__all__ = (
+    'FakeBuffer',
+    'SYNTHETIC_TYPES',
+    'synthetic_level',
+    'expand_level_per_tile'
+)
+
+
+class FakeBuffer:
+    """
+    Stands in for a gl Buffer, keeping its bytes and every write made to it.
+    """
+
+    def __init__(self, size: int):
+        self.data = bytearray(size)
+        self.writes: list[tuple[int, int]] = []
+
+    def write(self, data, offset: int = 0):
+        data = bytes(data)
+        self.data[offset:offset + len(data)] = data
+        self.writes.append((offset, len(data)))
+
+    def read(self) -> bytes:
+        return bytes(self.data)
+
+    def orphan(self, size: int):
+        self.data = bytearray(size)
+
+
+# The tile types `synthetic_level` uses, as `read_tile_types` would give them
+SYNTHETIC_TYPES = {3: ('bridge', False), 5: ('ground', False), 12: ('stair_lower', False), 13: ('stair_upper', False), 16: ('water', True)}
+
+
+def synthetic_level(width: int, height: int, seed: int) -> Level:
+    """
+    A random level of width x height tiles, with about a tenth of its terrain missing.
+    """
+    rnd = random.Random(seed)
+    heights = [rnd.choice((0, 1, 1, 2, 3, 5)) for _ in range(width * height)]
+    tiles = [Tile(1, 0, x * 4, y * 4, 0, 0, rnd.choice((3, 5, 5, 5, 12, 13, 16))) for y in range(height) for x in range(width) if rnd.random() < 0.9]
+
+    def layer(identifier: str, csv: list[int], grid: list[Tile]) -> Layer:
+        return Layer(height, width, 4, identifier, 1, 0, 0, None, None, 'x', [], [], grid, '', csv, 0, 0, None, 0, 0, True)
+
+    return Level(
+        '', None, [], None, None, [], f'synthetic_{seed}', '',
+        [layer('HeightOffset', heights, []), layer('Terrain', [], tiles)],
+        height * 4, width * 4, 0, rnd.randint(-2, 2), rnd.randint(-100, 100) * 4, rnd.randint(-100, 100) * 4
+    )
+
+
+def expand_level_per_tile(data: Level, tile_types: dict[int, tuple[str, bool]], textures: dict[str, int]) -> CompiledRoom:
+    """
+    `expand_level` as it was before it worked in bulk, walking the terrain one tile at a time.
+    """
+    wx, wy, wz = data.world_x / 4, data.world_y / 4, data.world_depth * 5
+    layers = {layer.identifier: layer for layer in data.layer_instances}
+    heights = layers['HeightOffset'].int_grid_csv
+    r_width = layers['Terrain'].c_width
+    r_height = layers['Terrain'].c_height
+
+    x, y, z = array('f'), array('f'), array('f')
+    texture, transparent = array('H'), array('B')
+    for terrain in layers['Terrain'].grid_tiles:
+        tx = int(terrain.pos_x / 4)
+        ty = int(terrain.pos_y / 4)
+        idx = ty * r_width + tx
+        height = heights[idx]
+        name, tile_transparent = tile_types[terrain.tile_id]
+        top = name
+
+        at_edge = 0 == tx or tx == r_width - 1 or ty == 0 or ty == r_height - 1
+        at_ledge = False if at_edge else (min(heights[idx + 1], heights[idx - 1], heights[idx + r_width], heights[idx - r_width]) < height)
+        if (at_edge or at_ledge) and name != 'bridge':
+            column, column_transparent, start = 'block', False, 0
+            if name == 'water':
+                column, column_transparent, top, start = 'water_column', True, 'water_fall', 1
+            count = max(height - start, 0)
+            x.extend([wx + tx] * count)
+            y.extend([wy + ty] * count)
+            z.extend(range(wz + start, wz + height))
+            texture.extend([textures.setdefault(column, len(textures))] * count)
+            transparent.extend([column_transparent] * count)
+
+        x.append(wx + tx)
+        y.append(wy + ty)
+        z.append(wz + height)
+        texture.append(textures.setdefault(top, len(textures)))
+        transparent.append(tile_transparent)
+
+    return CompiledRoom(data.identifier, x, y, z, texture, transparent)
@@ -1,42 +1,37 @@
 from typing import Any
-
-from arcade import SpriteList, BasicSprite, ArcadeContext, Vec2, Vec3, Texture
+from collections.abc import Iterable, Iterator, Sequence, Callable
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os import cpu_count
+from math import inf
+from time import perf_counter_ns
+from itertools import chain, repeat, compress
+from operator import lt, add, sub, mul, not_
+from array import array
+
+from arcade import BasicSprite, ArcadeContext, Vec2, Vec3, Texture
 from arcade.types import Box, LRBTNF
 
-from critter.lib.pool import Pool
+from critter.lib.pool import StableSpritePool, SortedSpritePool
+from critter.lib.spatial import SpatialHash
 from critter.lib.loading import Task
 from critter.lib.utils import get_window
 
 from resources import load_png, load_program
 from resources.LDtk import LDtkRoot, TilesetDefintion, Level
+from resources.levelcache import CompiledLevel, CompiledRoom
 
 from .context import context
 from .tile import Tiles
+from .streaming import RoomStreamer
+from .baking import bake_tiles, StaticBatch
+from .chunks import CHUNK_SIZE, Chunk, CullStats, chunk_order, build_chunks, merge_ranges
+from .physics import HeightField, PhysicsEngine
 
+# How far one world unit moves a tile on screen along x, y, and z (matches the isometric shader)
+ISOMETRIC_SCALE = (32, 16, 35)
 
-class Tile:
-
-    def __init__(self, texture: Texture, transparent: bool, position: tuple):
-        self.texture = texture
-        self.transparent: bool = transparent
-        self.position: tuple[float, float, float] = position
-
-        self.current_sprite: BasicSprite = None
-
-    def set_sprite(self, sprite: BasicSprite):
-        if self.current_sprite is not None:
-            self.free_sprite()
-        self.current_sprite = sprite
-
-        sprite.visible = True
-        sprite.position = self.position[0], self.position[1]
-        sprite.depth = self.position[2]
-        sprite.texture = self.texture
-
-    def free_sprite(self):
-        self.current_sprite.visible = False
-        self.current_sprite.position = (0, 0)
-        self.current_sprite.depth = 0
 
 class Interactable:
 
@@ -45,40 +40,278 @@ class Interactable:
         pass
 
 class Room:
-    
-    def __init__(self, name: str, tiles: tuple[Tile, ...] = (), interactables: tuple[Interactable, ...] = (), bounds: Box = None):
+    """
+    The tiles of a room stored as columns rather than objects.
+
+    Each tile is one entry in every column: its position, the index of its texture in the
+    world's texture table, whether it is transparent, and which sprite slot it has been given
+    while the room is loaded (-1 when it has none).
+
+    The transparent tiles are drawn back to front, so every tile's draw order key
+    (1.1 * z - (x + y)) is worked out once here rather than every time the room loads.
+
+    The height of the ground in every cell of the room is kept as a byte grid (`ground`),
+    so walking over the room never has to look at its tiles.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            x: array,
+            y: array,
+            z: array,
+            texture: array,
+            transparent: array,
+            interactables: tuple[Interactable, ...] = (),
+            bounds: Box = None
+        ):
         self.name: str = name
-        self.tiles: tuple[Tile, ...] = tiles
-        self.size = len(self.tiles)
-        self.transparent_count = len([t for t in self.tiles if t.transparent])
+        self.x: array = x
+        self.y: array = y
+        self.z: array = z
+        self.texture: array = texture
+        self.transparent: array = transparent
+        self.size = len(self.texture)
+        self.slots: array = array('i', [-1]) * self.size
+        self.transparent_count = self.transparent.count(1)
+        # The opaque tiles baked into static buffer records, see `World.static`
+        self.baked: bytearray | None = None
+        self.sort_key: array = array('d', map(sub, map(mul, repeat(1.1), z), map(add, x, y)))
+        # The first opaque tile, whose sprite is where the room's opaque sprites start in the pool
+        self.first_opaque: int = bytes(self.transparent).find(0)
+        self.chunks: list[Chunk] = []
         self.interactable: set[Interactable] = set(interactables)
+        self.ground: HeightField = HeightField.from_tiles(x, y, z)
 
-        # TODO: EW
         if bounds is None:
-            min_x = 1000000
-            max_x = -1000000
-            min_y = 1000000
-            max_y = -1000000
-            min_z = 1000000
-            max_z = -1000000
-
-            for tile in tiles:
-                x, y, z = tile.position
-                min_x = min(x - 0.5, min_x)
-                max_x = max(x + 0.5, max_x)
-                min_y = min(y - 0.5, min_y)
-                max_y = max(y + 0.5, max_y)
-                min_z = min(z - 0.5, min_z)
-                max_z = max(z + 0.5, max_z)
-            
-            bounds = LRBTNF(min_x, max_x, min_y, max_y, min_z, max_z)
+            if self.size:
+                bounds = LRBTNF(min(x) - 0.5, max(x) + 0.5, min(y) - 0.5, max(y) + 0.5, min(z) - 0.5, max(z) + 0.5)
+            else:
+                bounds = LRBTNF(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
 
         self.bounds: Box = bounds
 
+class RoomLoad:
+    """
+    A room which is being loaded a chunk of tiles at a time.
+    """
+
+    def __init__(self, room: Room, on_progress: Callable[['RoomLoad'], Any] | None = None, on_complete: Callable[['RoomLoad'], Any] | None = None):
+        self.room: Room = room
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+
+        self.done: int = 0
+        self.transparent_done: int = 0
+        self.complete: bool = False
+
+    @property
+    def name(self) -> str:
+        return self.room.name
+
+    @property
+    def tiles_done(self) -> int:
+        return self.done - self.transparent_done
+
+    @property
+    def fraction(self) -> float:
+        if self.complete:
+            return 1.0
+        # The last step adds the room to the world so a fully placed room isn't quite done
+        return 0.99 * self.done / self.room.size if self.room.size else 0.99
+
+def read_tile_types(definition: TilesetDefintion) -> dict[int, tuple[str, bool]]:
+    """
+    Read the tile name and transparency for every tile in a tileset which has a matching `Tiles` texture.
+    """
+    tile_types = {}
+    for tile in definition.custom_data:
+        tile_name, *other = tile.data.split('\n')
+        if tile_name not in Tiles.__targets__:
+            continue
+        tile_types[tile.tile_id] = tile_name, 'transparent' in other
+    return tile_types
+
+def _tile_runs(name: str, transparent: bool, height: int, column: bool, base: int, textures: dict[str, int]) -> tuple[tuple[int, ...], tuple[bool, ...], range]:
+    """
+    The texture ids, transparency and depths of a tile's column followed by its top tile.
+
+    Returns:
+        (textures, transparency, depths)
+    """
+    top_texture = textures.setdefault(name, len(textures))
+    if not column or name == 'bridge':
+        return (top_texture,), (transparent,), range(base + height, base + height + 1)
+
+    if name == 'water':
+        column_texture = textures.setdefault('water_column', len(textures))
+        top_texture = textures.setdefault('water_fall', len(textures))
+        count = max(height - 1, 0)
+        return (column_texture,) * count + (top_texture,), (True,) * count + (transparent,), range(base + height - count, base + height + 1)
+
+    column_texture = textures.setdefault('block', len(textures))
+    return (column_texture,) * height + (top_texture,), (False,) * height + (transparent,), range(base, base + height + 1)
+
+def expand_level(data: Level, tile_types: dict[int, tuple[str, bool]], textures: dict[str, int]) -> CompiledRoom:
+    """
+    Turn an LDtk level into the final tiles of a room, including the columns under ledges.
+
+    The height grid is compared against copies of itself shifted by one cell in each direction
+    to find the ledges. Every distinct (tile, height, has column) combination is only expanded once,
+    and the runs are then stitched together in bulk. The tiles come out in the same order as
+    walking the terrain tiles and adding each tile's column followed by its top.
+
+    This doesn't touch any textures so it is safe to use offline (see `compile_world`).
+
+    Args:
+        data: The LDtk level to expand.
+        tile_types: The name and transparency of each tileset tile.
+        textures: The texture id of each tile name. New names are added as they are found.
+
+    Returns:
+        The packed columns of the room.
+    """
+    wx, wy, wz = data.world_x / 4, data.world_y / 4, data.world_depth * 5
+    layers = {layer.identifier: layer for layer in data.layer_instances}
+
+    heights = layers['HeightOffset'].int_grid_csv
+    terrain_tiles = layers['Terrain'].grid_tiles
+
+    r_width = layers['Terrain'].c_width
+    r_height = layers['Terrain'].c_height
+
+    # -- Columns --
+    # Compare each cell to its lowest neighbour. Values which wrap around at the edges are junk,
+    # but they get overwritten as every edge cell has a column anyway.
+    pad = [0] * r_width
+    lowest = list(map(min, heights[1:] + [0], [0] + heights[:-1], heights[r_width:] + pad, pad + heights[:-r_width]))
+    columns = list(map(lt, lowest, heights))
+    columns[:r_width] = [True] * r_width
+    columns[-r_width:] = [True] * r_width
+    columns[::r_width] = [True] * r_height
+    columns[r_width - 1::r_width] = [True] * r_height
+
+    tx = [tile.pos_x // 4 for tile in terrain_tiles]
+    ty = [tile.pos_y // 4 for tile in terrain_tiles]
+    idx = list(map(add, map(mul, ty, repeat(r_width)), tx))
+    keys = list(zip(
+        [tile.tile_id for tile in terrain_tiles],
+        map(heights.__getitem__, idx),
+        map(columns.__getitem__, idx)
+    ))
+    runs = {key: _tile_runs(*tile_types[key[0]], key[1], key[2], wz, textures) for key in set(keys)}
+    tile_runs = list(map(runs.__getitem__, keys))
+    counts = [len(run[2]) for run in tile_runs]
+
+    # -- Emit --
+    x = array('f', list(chain.from_iterable(map(repeat, [wx + v for v in tx], counts))))
+    y = array('f', list(chain.from_iterable(map(repeat, [wy + v for v in ty], counts))))
+    z = array('f', list(chain.from_iterable([run[2] for run in tile_runs])))
+    texture = array('H', list(chain.from_iterable([run[0] for run in tile_runs])))
+    transparent = array('B', list(chain.from_iterable([run[1] for run in tile_runs])))
+
+    return CompiledRoom(data.identifier, x, y, z, texture, transparent)
+
+def order_room(data: CompiledRoom) -> CompiledRoom:
+    """
+    Put a room's tiles in chunk order so every chunk is one range of tiles.
+    """
+    order = chunk_order(data.x, data.y)
+    return CompiledRoom(
+        data.name,
+        array('f', map(data.x.__getitem__, order)),
+        array('f', map(data.y.__getitem__, order)),
+        array('f', map(data.z.__getitem__, order)),
+        array('H', map(data.texture.__getitem__, order)),
+        array('B', map(data.transparent.__getitem__, order))
+    )
+
+def _expand_level_job(
+        data: Level,
+        tile_types: dict[int, tuple[str, bool]],
+        sizes: dict[str, tuple[float, float]] | None
+    ) -> tuple[CompiledRoom, tuple[str, ...], list[Chunk] | None]:
+    # Runs in a worker process, so the texture ids are only the room's own until they are remapped
+    textures: dict[str, int] = {}
+    room = expand_level(data, tile_types, textures)
+    if sizes is None:
+        return room, tuple(textures), None
+
+    room = order_room(room)
+    chunks = build_chunks(room.name, room.x, room.y, room.z, room.texture, room.transparent, [sizes[name] for name in textures], ISOMETRIC_SCALE)
+    return room, tuple(textures), chunks
+
+def expand_levels(
+        levels: Sequence[Level],
+        tile_types: dict[int, tuple[str, bool]],
+        processes: int | None = None,
+        sizes: dict[str, tuple[float, float]] | None = None
+    ) -> Iterator[tuple[CompiledRoom, tuple[str, ...], list[Chunk] | None]]:
+    """
+    Expand levels across a pool of worker processes.
+
+    Lazily parsed levels are sent with their raw layers, so parsing them happens in the
+    workers too. Only the packed arrays of each room come back. The workers are spawned
+    rather than forked since the main process has a gl context and loading threads.
+
+    Args:
+        levels: The LDtk levels to expand.
+        tile_types: The name and transparency of each tileset tile.
+        processes: How many worker processes to use, one per core if None.
+        sizes: The (width, height) of every tile texture by name. If given the workers also
+            put each room in chunk order and split it into chunks, which is most of the
+            work of adding a room to the world.
+
+    Returns:
+        Every room with the names its texture ids refer to and its chunks (or None), in the
+        same order as the levels. Adding them in order with `World.add_compiled_room` gives
+        the same texture ids as expanding them one after the other would.
+    """
+    processes = processes or cpu_count() or 1
+    chunksize = max(1, len(levels) // (4 * processes))
+    with ProcessPoolExecutor(processes, mp_context=get_context('spawn')) as pool:
+        yield from pool.map(_expand_level_job, levels, repeat(tile_types), repeat(sizes), chunksize=chunksize)
+
+def compile_world(data: LDtkRoot, source_hash: bytes, processes: int = 0) -> CompiledLevel:
+    """
+    Expand every level in the world and pack the tiles into arrays for the level cache.
+
+    Args:
+        data: The parsed LDtk world.
+        source_hash: The hash of the .ldtk file, used to invalidate the cache when it changes.
+        processes: If more than 0 the levels are expanded across that many worker processes.
+    """
+    tile_types = {}
+    for tileset in data.defs.tilesets:
+        tile_types.update(read_tile_types(tileset))
+
+    textures: dict[str, int] = {}
+    if processes <= 0:
+        rooms = tuple(expand_level(level, tile_types, textures) for level in data.levels)
+        return CompiledLevel(source_hash, tuple(textures), rooms)
+
+    rooms = []
+    for room, names, _ in expand_levels(data.levels, tile_types, processes):
+        remap = [textures.setdefault(name, len(textures)) for name in names]
+        room.texture = array('H', map(remap.__getitem__, room.texture))
+        rooms.append(room)
+    return CompiledLevel(source_hash, tuple(textures), tuple(rooms))
+
 class World:
-    
-    def __init__(self, ctx: ArcadeContext = None):
+    """
+    Args:
+        ctx: The context to draw with, the window's if None.
+        static: If True the opaque tiles of a room are baked into one static buffer
+            when it loads rather than each taking a sprite. Only the transparent tiles,
+            which have to be sorted with the other rooms', are still sprites.
+        processes: If more than 0 and there is no compiled cache, the levels are expanded
+            across that many worker processes when the world loads (see `expand_levels`).
+    """
+
+    def __init__(self, ctx: ArcadeContext = None, static: bool = False, processes: int = 0):
         self.ctx = ctx or get_window().ctx
+        self.static: bool = static
+        self.processes: int = processes
         self.raw_data: LDtkRoot = None
 
         default_texture = Tiles.ground
@@ -90,164 +323,510 @@ class World:
             fragment_shader='isometric_sprite_fs'
         )
         program['uv_texture'] = 1
-        program['scale'] = 32, 16, 35
+        program['scale'] = ISOMETRIC_SCALE
 
-        self.tiles: Pool[BasicSprite] = Pool([BasicSprite(default_texture, 1.0, visible=False) for _ in range(8192)])
-        self.tile_sprites = SpriteList(capacity=1024)
-        self.tile_sprites.extend(self.tiles.source)
+        # The pools hand out sprite slots, which index into the pool's sprites.
+        # Only the sprites which have been given out are drawn. The tiles keep the order
+        # they were given in so every chunk of a room is one range of the pool.
+        self.tiles: StableSpritePool[BasicSprite] = StableSpritePool([BasicSprite(default_texture, 1.0) for _ in range(8192)])
+        # The transparent sprites are kept in draw order as rooms load and unload
+        self.transparent: SortedSpritePool[BasicSprite] = SortedSpritePool([BasicSprite(default_texture, 1.0) for _ in range(1024)])
 
-        self.transparent: Pool[BasicSprite] = Pool([BasicSprite(default_texture, 1.0, visible=False) for _ in range(1024)])
-        self.transparent_sprites = SpriteList(capacity=128)
-        self.transparent_sprites.extend(self.transparent.source)
+        self.tiles.sprite_list.program = self.transparent.sprite_list.program = program
+        self.program = program
 
-        self.tile_sprites.program = self.transparent_sprites.program = program
+        # The baked opaque tiles of every loaded room when the world is static
+        self.batches: dict[str, StaticBatch] = {}
 
         self.interactables: set = set()
         self.rooms: dict[str, Room] = {}
         self.loaded_rooms: set[str] = set()
         self.current_room: Room | None
-
-        self.tile_textures: dict[int, tuple[Texture, bool]] = {}
-        self.tile_names: dict[int, str] = {}
+        # Room names by their bounds, cells are about the size of a room
+        self.room_index: SpatialHash[str] = SpatialHash(32.0)
+        # The lowest and highest z of every room's bounds, which a point on screen could be at
+        self.room_heights: tuple[float, float] = (inf, -inf)
+        # Every room's chunks by their bounds on screen, cells are about a chunk wide
+        self.chunk_index: SpatialHash[Chunk] = SpatialHash(2.0 * CHUNK_SIZE * ISOMETRIC_SCALE[0])
+        self.cull_stats: CullStats = CullStats()
+        # The LDtk neighbours and world depth of every room, by name
+        self.neighbours: dict[str, tuple[str, ...]] = {}
+        self.room_depths: dict[str, int] = {}
+        self.streamer: RoomStreamer = RoomStreamer(self)
+        # Every room's ground is added so colliders walk over the terrain
+        self.physics: PhysicsEngine = PhysicsEngine()
+
+        # Rooms being loaded a chunk at a time, see `load_room_over_time`
+        self.loading: deque[RoomLoad] = deque()
+        self.load_budget: float = 2000.0 # microseconds a frame
+        self.load_chunk: int = 64 # tiles
+
+        self.tile_types: dict[int, tuple[str, bool]] = {}
+        self.texture_ids: dict[str, int] = {}
+        self.textures: list[Texture] = []
 
     def load_world(self):
-        for room in self.loaded_rooms:
+        for load in tuple(self.loading):
+            self.unload_room(load.name)
+        for room in tuple(self.loaded_rooms):
             self.unload_room(room)
         self.current_room = None
+        for room in self.rooms.values():
+            self.physics.remove_heightfield(room.ground)
         self.rooms = {}
-        self.tile_textures = {}
-        self.tile_names = {}
+        self.room_index.clear()
+        self.room_heights = (inf, -inf)
+        self.chunk_index.clear()
+        self.streamer.reset()
+        self.tile_types = {}
+        self.texture_ids = {}
+        self.textures = []
 
         self.raw_data = context.active.world_data
 
         for tileset in self.raw_data.defs.tilesets:
             self.add_tileset(tileset)
 
+        # The neighbours are read from the LDtk data even when the rooms come from the cache
+        names = {level.iid: level.identifier for level in self.raw_data.levels}
+        self.neighbours = {
+            level.identifier: tuple(names[neighbour.level_iid] for neighbour in level.neighbours if neighbour.level_iid in names)
+            for level in self.raw_data.levels
+        }
+        self.room_depths = {level.identifier: level.world_depth for level in self.raw_data.levels}
+
+        # The compiled cache is only loaded when it matches the source .ldtk
+        compiled = context.active.world_cache
+        if compiled is not None:
+            for room in compiled.rooms:
+                self.add_compiled_room(room, compiled.textures)
+            return
+
+        if self.processes > 0:
+            sizes = {name: Tiles(name).size for name in Tiles.__targets__}
+            for room, textures, chunks in expand_levels(self.raw_data.levels, self.tile_types, self.processes, sizes):
+                self.add_compiled_room(room, textures, chunks)
+            return
+
         for level in self.raw_data.levels:
             self.add_room(level)
 
 
     def add_tileset(self, definition: TilesetDefintion):
-        for tile in definition.custom_data:
-            tile_name, *other = tile.data.split('\n')
-            tile_transparent = 'transparent' in other
-            try:
-                tile_texture = Tiles(tile_name)
-            except KeyError:
-                continue
-            self.tile_textures[tile.tile_id] = tile_texture, tile_transparent
-            self.tile_names[tile.tile_id] = tile_name 
+        self.tile_types.update(read_tile_types(definition))
 
     def add_room(self, data: Level):
         print(data.identifier)
-        wx, wy, wz = data.world_x / 4, data.world_y / 4, data.world_depth * 5
-        layers = {layer.identifier: layer for layer in data.layer_instances}
-
-        self.rooms[data.identifier] = None
-        heights = layers['HeightOffset'].int_grid_csv
-        terrain_tiles = layers['Terrain'].grid_tiles
-
-        r_width = layers['Terrain'].c_width
-        r_height = layers['Terrain'].c_height
-
-        tiles = []
-        for terrain in terrain_tiles:
-            tx = int(terrain.pos_x / 4)
-            ty = int(terrain.pos_y / 4)
-
-            idx = ty * r_width + tx
-            height = heights[idx]
-
-            t_name = self.tile_names[terrain.tile_id]
-
-            tile_texture, tile_transparent = self.tile_textures[terrain.tile_id]
-            
-            # -- Column --
-            
-            # Check surrounding heights or at the edge of room to choose whether to generate a column
-            at_edge = 0 == tx or tx == r_width-1 or ty == 0 or ty == r_height-1
-            at_ledge = False if at_edge else (min(heights[idx + 1], heights[idx - 1], heights[idx + r_width], heights[idx - r_width]) < height)
-            is_valid = t_name != 'bridge'
-            if (at_edge or at_ledge) and is_valid:
-                column_texture, column_transparent = Tiles.block, False
-                column_start, column_end = 0, height
-                if t_name == 'water':
-                    column_texture, column_transparent = Tiles.water_column, True
-                    tile_texture = Tiles.water_fall
-                    column_start = 1
-                for h in range(column_start, column_end):
-                    tiles.append(Tile(column_texture, column_transparent, (wx + tx, wy + ty, wz + h)))
-
-            # Top Layer
-            tiles.append(Tile(tile_texture, tile_transparent, (wx + tx, wy + ty, wz + height)))
-
-        print(len(tiles))
-
-        self.rooms[data.identifier] = Room(data.identifier, tuple(tiles))
-
-    def load_room(self, name: str):
+        room = expand_level(data, self.tile_types, self.texture_ids)
+        print(room.size)
+
+        self.add_compiled_room(room)
+
+    def add_compiled_room(self, data: CompiledRoom, textures: tuple[str, ...] | None = None, chunks: list[Chunk] | None = None):
+        """
+        Add a room from its packed columns.
+
+        Args:
+            data: The packed room.
+            textures: The names the room's texture ids refer to. If None the ids already
+                refer to the world's texture table.
+            chunks: The room's chunks if its tiles are already in chunk order (see `expand_levels`).
+                If None the tiles are put in chunk order and split into chunks here.
+        """
+        texture = array('H', data.texture)
+        if textures is not None:
+            remap = [self.texture_ids.setdefault(name, len(self.texture_ids)) for name in textures]
+            texture = array('H', map(remap.__getitem__, texture))
+
+        # Make sure every texture id has a texture to go with it
+        for name in tuple(self.texture_ids)[len(self.textures):]:
+            self.textures.append(Tiles(name))
+
+        if chunks is None:
+            # The tiles are put in chunk order so every chunk is one range of tiles
+            data = order_room(CompiledRoom(data.name, data.x, data.y, data.z, texture, data.transparent))
+            texture = data.texture
+        if data.name in self.rooms:
+            self._remove_room(data.name)
+        room = self.rooms[data.name] = Room(
+            data.name,
+            array('f', data.x),
+            array('f', data.y),
+            array('f', data.z),
+            texture,
+            array('B', data.transparent)
+        )
+        self.room_index.insert(room.name, room.bounds)
+        self.room_heights = min(self.room_heights[0], room.bounds.near), max(self.room_heights[1], room.bounds.far)
+        self.physics.add_heightfield(room.ground)
+
+        if chunks is None:
+            sizes = [texture.size for texture in self.textures]
+            chunks = build_chunks(room.name, room.x, room.y, room.z, room.texture, room.transparent, sizes, ISOMETRIC_SCALE)
+        room.chunks = chunks
+        for chunk in room.chunks:
+            self.chunk_index.insert(chunk, chunk.box)
+
+    def _remove_room(self, name: str):
+        """
+        Take a room out of the world before it is added again, so nothing is left pointing at the old one.
+        """
+        if name in self.loaded_rooms or any(load.name == name for load in self.loading):
+            self.unload_room(name)
+        room = self.rooms.pop(name)
+        self.room_index.remove(name)
+        for chunk in room.chunks:
+            self.chunk_index.remove(chunk)
+        self.physics.remove_heightfield(room.ground)
+
+    def _can_load(self, name: str) -> bool:
         if name not in self.rooms:
             print(f'{name} does not exsist')
+            return False
 
-        if name in self.loaded_rooms:
+        if name in self.loaded_rooms or any(load.name == name for load in self.loading):
             print(f'{name} already loaded')
-            return
-                
-        room = self.rooms[name]
+            return False
 
-        if self.tiles.remaining < room.size or self.transparent.remaining < room.transparent_count:
+        if not self.can_fit(name):
             print(f'{name} cannot be loaded due to lack of sprites')
+            return False
+
+        return True
+
+    def can_fit(self, name: str) -> bool:
+        room = self.rooms[name]
+        # Rooms still waiting to load have a claim on the sprites too
+        transparent = sum(load.room.transparent_count - load.transparent_done for load in self.loading)
+        if self.transparent.remaining - transparent < room.transparent_count:
+            return False
+        if self.static:
+            return True
+
+        tiles = sum(load.room.size - load.room.transparent_count - load.tiles_done for load in self.loading)
+        return self.tiles.remaining - tiles >= room.size - room.transparent_count
+
+    def load_room(self, name: str):
+        # Finish anything being loaded over time first so the sprites are given in the same order
+        self.finish_loading()
+        if not self._can_load(name):
             return
 
-        for tile in room.tiles:
-            if tile.transparent:
-                sprite = self.transparent.get()
+        room = self.rooms[name]
+        self._load_tiles(room, 0, room.size)
+        self._finish_room(room)
+
+    def load_room_over_time(
+            self,
+            name: str,
+            on_progress: Callable[[RoomLoad], Any] | None = None,
+            on_complete: Callable[[RoomLoad], Any] | None = None
+        ) -> RoomLoad | None:
+        """
+        Queue a room to be loaded a chunk at a time by `update`, spending at most `load_budget`
+        microseconds a frame. The result is the same as calling `load_room`.
+
+        Args:
+            name: The room to load.
+            on_progress: Called with the load at the end of every frame it made progress in.
+            on_complete: Called with the load once the room is fully loaded.
+
+        Returns:
+            The queued load, or None if the room can't be loaded.
+        """
+        if not self._can_load(name):
+            return None
+
+        load = RoomLoad(self.rooms[name], on_progress, on_complete)
+        self.loading.append(load)
+        return load
+
+    def _load_tiles(self, room: Room, start: int, end: int):
+        """
+        Give sprites to the tiles [start, end) of a room. The sprites have to be given in tile order.
+        """
+        transparent_count = room.transparent[start:end].count(1)
+
+        # Static worlds bake the opaque tiles once the room is done instead
+        static = self.static
+        textures = self.textures
+        slots = room.slots
+        tile_sprites, transparent_sprites = self.tiles.sprites, self.transparent.sprites
+        tile_slots = iter(self.tiles.get_many(0 if static else end - start - transparent_count))
+        transparent_slots = iter(self.transparent.get_sorted(array('d', compress(room.sort_key[start:end], room.transparent[start:end]))))
+        for idx, x, y, z, texture, transparent in zip(range(start, end), room.x[start:end], room.y[start:end], room.z[start:end], room.texture[start:end], room.transparent[start:end]):
+            if transparent:
+                slot = next(transparent_slots)
+                sprite = transparent_sprites[slot]
+            elif static:
+                continue
             else:
-                sprite = self.tiles.get()
-            
-            tile.set_sprite(sprite)
+                slot = next(tile_slots)
+                sprite = tile_sprites[slot]
+            slots[idx] = slot
 
-        if room.transparent_count:
-            self.transparent_sprites.sort(key=lambda t: 1.1*t.depth - (t.center_x + t.center_y))
+            sprite.position = x, y
+            sprite.depth = z
+            sprite.texture = textures[texture]
+
+    def _finish_room(self, room: Room):
+        if self.static:
+            self.batches[room.name] = StaticBatch(self.ctx, self.bake_room(room))
 
         self.interactables.update(room.interactable)
 
-        self.loaded_rooms.add(name)
+        self.loaded_rooms.add(room.name)
+
+    def update_loading(self, budget: float | None = None):
+        """
+        Load queued rooms a chunk at a time until the budget (in microseconds) is spent.
+        At least one chunk is loaded every call so a tiny budget still makes progress.
+        """
+        budget_ns = 1000 * (self.load_budget if budget is None else budget)
+        began = perf_counter_ns()
+
+        progressed = []
+        while self.loading:
+            load = self.loading[0]
+            room = load.room
+            if load not in progressed:
+                progressed.append(load)
+
+            if load.done < room.size:
+                end = min(load.done + self.load_chunk, room.size)
+                self._load_tiles(room, load.done, end)
+                load.transparent_done += room.transparent[load.done:end].count(1)
+                load.done = end
+            else:
+                self.loading.popleft()
+                self._finish_room(room)
+                load.complete = True
+
+            if perf_counter_ns() - began >= budget_ns:
+                break
+
+        for load in progressed:
+            if load.on_progress is not None:
+                load.on_progress(load)
+            if load.complete and load.on_complete is not None:
+                load.on_complete(load)
+
+    def finish_loading(self):
+        """
+        Load everything queued right now.
+        """
+        while self.loading:
+            self.update_loading(inf)
 
     def unload_room(self, name: str):
         if name not in self.rooms:
             print(f'{name} does not exsist')
-        
-        if name not in self.loaded_rooms():
+            return
+
+        for load in self.loading:
+            if load.name == name:
+                # Give back the sprites of a room which was only partly loaded
+                self.loading.remove(load)
+                self._give_back(load.room, load.done)
+                return
+
+        if name not in self.loaded_rooms:
             print(f'{name} is not loaded')
+            return
 
         room = self.rooms[name]
 
         self.interactables.difference_update(room.interactable)
-        for tile in room.tiles:
-            if tile.transparent:
-                self.transparent.give(tile.current_sprite)
-            else:
-                self.tiles.give(tile.current_sprite)
-            tile.free_sprite()
+        self._give_back(room, room.size)
+        batch = self.batches.pop(name, None)
+        if batch is not None:
+            batch.release()
 
         self.loaded_rooms.remove(name)
 
+    def _give_back(self, room: Room, end: int):
+        """
+        Give back the sprites of the tiles [0, end) of a room.
+        """
+        # The freed sprites are left as they are since only given sprites get drawn
+        slots, transparent = room.slots[:end], room.transparent[:end]
+        if not self.static:
+            self.tiles.give_many(compress(slots, map(not_, transparent)))
+        self.transparent.give_many(compress(slots, transparent))
+        room.slots = array('i', [-1]) * room.size
+
+    def bake_room(self, room: Room) -> bytearray:
+        """
+        Bake the opaque tiles of a room into static buffer records. The bake is kept on the room
+        so loading it again only has to upload it.
+        """
+        if room.baked is None:
+            atlas = self.ctx.default_atlas
+            texture_slots = [atlas.add(texture)[0] for texture in self.textures]
+            sizes = [texture.size for texture in self.textures]
+            room.baked = bake_tiles(room.x, room.y, room.z, room.texture, texture_slots, sizes, map(not_, room.transparent))
+        return room.baked
+
     def enter_room(self, name: str):
-        pass # TODO: load rooms around and below the current room
+        if name not in self.rooms:
+            print(f'{name} does not exsist')
+            return
 
-    def location(self, position: Vec3) -> str:
+        self.current_room = self.rooms[name]
+        # The rooms around and below are streamed in over the next few frames
+        self.streamer.focus(name)
+
+    def screen_to_world(self, position: Vec2, z: float = 0.0) -> Vec3:
+        """
+        Undo the isometric projection for a point on screen at the given height.
+        """
+        sx, sy, sz = ISOMETRIC_SCALE
+        across = position[0] / sx
+        along = (position[1] - z * sz) / sy
+        return Vec3((along + across) / 2.0, (along - across) / 2.0, z)
+
+    def location(self, position: Vec3) -> str | None:
         if self.current_room is not None and self.current_room.bounds.point_in_box(position):
             return self.current_room.name
-        
-        for room in self.rooms.values():
-            if room.bounds.point_in_box(position):
-                return room.name
+
+        return self.room_index.first(position)
+
+    def screen_location(self, position: Vec2) -> str | None:
+        """
+        The room under a point on screen.
+
+        A point on screen is a line through the world, so each room it could be over is checked
+        where the line meets the room's base. If more than one room is under the point the
+        current room wins, and then the highest room, since it is drawn over the ones below.
+        """
+        near, far = self.room_heights
+        if near > far:
+            return None
+
+        low, high = self.screen_to_world(position, near), self.screen_to_world(position, far)
+        line = LRBTNF(min(low.x, high.x), max(low.x, high.x), min(low.y, high.y), max(low.y, high.y), near, far)
+
+        found, base = None, -inf
+        for name in self.room_index.query_box(line):
+            bounds = self.rooms[name].bounds
+            # The bounds reach half a tile below the lowest tile
+            if not bounds.point_in_box(self.screen_to_world(position, bounds.near + 0.5)):
+                continue
+            if self.current_room is not None and name == self.current_room.name:
+                return name
+            if bounds.near > base:
+                found, base = name, bounds.near
+        return found
+
+    def locations(self, positions: Iterable[Vec3]) -> list[str | None]:
+        return self.room_index.first_many(positions)
+
+    def ground_at(self, x: float, y: float) -> float | None:
+        return self.physics.ground_at(x, y)
+
+    def rooms_in(self, bounds: Box) -> list[str]:
+        return self.room_index.query_box(bounds)
 
     def update(self):
-        pass
+        self.streamer.update()
+        self.update_loading()
  
-    def draw(self):
+    def draw(self, view: tuple[float, float, float, float] | None = None):
+        """
+        Args:
+            view: The left, right, bottom, and top of the screen space which is visible.
+                If given only the chunks which overlap it are drawn.
+        """
+        if view is None:
+            tile_ranges = transparent_ranges = batch_ranges = None
+        else:
+            tile_ranges, transparent_ranges, batch_ranges = self.cull(view)
+
         with self.ctx.enabled(self.ctx.DEPTH_TEST):
-            self.tile_sprites.draw(pixelated=True)
-            self.transparent_sprites.draw(pixelated=True) # TODO: sort transparent sprites
\ No newline at end of file
+            if self.batches:
+                self._draw_batches(batch_ranges)
+            self.tiles.draw(tile_ranges, pixelated=True)
+            self.transparent.draw(transparent_ranges, pixelated=True)
+
+    def cull(self, view: tuple[float, float, float, float]) -> tuple[list[tuple[int, int]], list[tuple[int, int]], dict[str, list[tuple[int, int]]]]:
+        """
+        Find the chunks of the loaded rooms which overlap the view, and the ranges of the pools
+        (and baked rooms) to draw for them. The counts are kept in `cull_stats`.
+
+        Rooms which are only part way through loading aren't culled.
+
+        Returns:
+            The (first, count) ranges of the tile pool, the transparent pool, and each baked room.
+        """
+        left, right, bottom, top = view
+        visible = self.chunk_index.query_box(LRBTNF(left, right, bottom, top, 0.0, 0.0))
+
+        loaded = self.loaded_rooms
+        tiles = self.tiles
+        transparent_position = self.transparent.positions.__getitem__
+        tile_ranges, transparent_positions = [], []
+        batch_ranges: dict[str, list[tuple[int, int]]] = {name: [] for name in self.batches}
+        stats = CullStats()
+
+        for chunk in visible:
+            if chunk.room not in loaded:
+                continue
+            room = self.rooms[chunk.room]
+            stats.chunks_drawn += 1
+            stats.tiles_drawn += chunk.size
+
+            count = chunk.opaque_end - chunk.opaque_start
+            if not count:
+                pass
+            elif self.static:
+                batch_ranges[room.name].append((chunk.opaque_start, count))
+            else:
+                tile_ranges.append((tiles.index(room.slots[room.first_opaque]) + chunk.opaque_start, count))
+
+            transparent_positions.extend(map(transparent_position, compress(room.slots[chunk.start:chunk.end], room.transparent[chunk.start:chunk.end])))
+
+        for name in loaded:
+            room = self.rooms[name]
+            stats.chunks += len(room.chunks)
+            stats.tiles += room.size
+
+        for load in self.loading:
+            # A room which is still loading is drawn as it is
+            room = load.room
+            opaque, given = load.tiles_done, load.done
+            stats.tiles += given
+            stats.tiles_drawn += given
+            if opaque and not self.static:
+                tile_ranges.append((tiles.index(room.slots[room.first_opaque]), opaque))
+            transparent_positions.extend(map(transparent_position, compress(room.slots[:given], room.transparent[:given])))
+
+        tile_ranges = merge_ranges(tile_ranges)
+        # The transparent sprites have to stay in draw order, so only runs of them can be drawn together
+        transparent_ranges = []
+        transparent_positions.sort()
+        for position in transparent_positions:
+            if transparent_ranges and transparent_ranges[-1][1] == position:
+                transparent_ranges[-1][1] = position + 1
+            else:
+                transparent_ranges.append([position, position + 1])
+        transparent_ranges = [(first, end - first) for first, end in transparent_ranges]
+        if len(transparent_ranges) > 64:
+            first = transparent_ranges[0][0]
+            transparent_ranges = [(first, transparent_ranges[-1][0] + transparent_ranges[-1][1] - first)]
+        batch_ranges = {name: merge_ranges(ranges) for name, ranges in batch_ranges.items()}
+
+        stats.draw_calls = len(tile_ranges) + len(transparent_ranges) + sum(map(len, batch_ranges.values()))
+        self.cull_stats = stats
+        return tile_ranges, transparent_ranges, batch_ranges
+
+    def _draw_batches(self, ranges: dict[str, list[tuple[int, int]]] | None = None):
+        # Bind everything a SpriteList would before drawing with the same program
+        atlas = self.ctx.default_atlas
+        atlas.texture.filter = self.ctx.NEAREST, self.ctx.NEAREST
+        self.program['spritelist_color'] = 1.0, 1.0, 1.0, 1.0
+        self.program.set_uniform_safe('uv_offset_bias', 0.0)
+        atlas.texture.use(0)
+        atlas.use_uv_texture(1)
+
+        for name, batch in self.batches.items():
+            batch.render(self.program, None if ranges is None else ranges[name])
@@ -1,29 +1,69 @@
-from typing import Callable
-from threading import Lock, Thread
+from typing import Callable, Any
+from collections.abc import Generator, Iterable
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Thread
+from queue import SimpleQueue, Empty
+from os import cpu_count
 
-from time import sleep
+from time import sleep, perf_counter
 
 class Task:
-    
+    """
+    Something which loads over several frames.
+
+    The status is polled by the render thread every frame, so it is never behind a lock.
+    Each status flag only ever has one writer (the thread doing the work sets `_compelete`,
+    the main thread sets `_cancelled`) and only ever goes from False to True, so reading
+    a plain attribute is always safe. Progress which many threads contribute to is sent
+    back to the main thread as events instead, see `ThreadedTask`.
+    """
+
     def __init__(self):
         self._compelete: bool = False
-        self._interface_lock: Lock = Lock()
+        self._cancelled: bool = False
 
     def begin(self):
         pass
 
+    def update(self):
+        # Called every frame on the main thread while the task is being waited on
+        pass
+
     def finish(self):
         pass
 
+    def cancel(self):
+        # Stop as soon as possible. A cancelled task never completes
+        self._cancelled = True
+
+    def wait(self, timeout: float | None = None, poll: float = 0.001) -> bool:
+        """
+        Begin the task and update it until it completes, without a window.
+
+        Returns:
+            True if the task completed, False if it was cancelled or timed out.
+        """
+        self.begin()
+        end = None if timeout is None else perf_counter() + timeout
+        while not self.complete:
+            if self.cancelled or (end is not None and perf_counter() >= end):
+                return False
+            self.update()
+            sleep(poll)
+        return True
+
     @property
     def complete(self) -> bool:
-        with self._interface_lock:
-            return self._compelete
+        return self._compelete
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
 
     @property
     def fraction(self) -> float | None:
-        with self._interface_lock:
-            return None
+        return None
         
     def task(self):
         pass
@@ -44,5 +84,280 @@ class SleepTask(Task):
     
     def task(self):
         sleep(self.duration)
-        with self._interface_lock:
-            self._compelete = True
\ No newline at end of file
+        self._compelete = True
+
+
+_workers: ThreadPoolExecutor | None = None
+
+def get_workers() -> ThreadPoolExecutor:
+    # The worker threads every task shares, made the first time they are needed
+    global _workers
+    if _workers is None:
+        _workers = ThreadPoolExecutor(max_workers=min(4, cpu_count() or 1), thread_name_prefix='critter-loading')
+    return _workers
+
+
+class ThreadedTask(Task):
+    """
+    Runs jobs on the shared worker threads and hands their results back to the main thread.
+
+    A job does everything which doesn't need the GPU (reading and decoding files) and its
+    upload is then called with the result on the main thread from `update`. If the upload
+    is a generator it is stepped once per call instead, so a big upload can be spread over
+    frames. `update` keeps running uploads until it has spent `budget` seconds (always at
+    least one step) so the frame never stalls on them.
+
+    The fraction is how much of the work is done, where decoding and uploading are each half
+    of a job's weight. An exception raised by a job is raised again from `update`.
+
+    The workers never touch the task's counters. Each finished job is an event on a queue
+    which `update` drains once per frame, so only the main thread writes the progress and
+    reading it needs no lock (it is at most a frame behind).
+
+    Cancelling drops every job which hasn't started, and the results of the ones which have.
+
+    Args:
+        finish: Called by whatever is waiting on the task once it is complete. It only
+            ever runs once, however many times `finish` is called.
+        budget: How many seconds of uploads `update` may run each frame.
+    """
+
+    def __init__(self, finish: Callable[[], None] | None = None, budget: float = 0.004):
+        Task.__init__(self)
+        self._on_finish: Callable[[], None] | None = finish
+        self._finished: bool = False
+        self.budget: float = budget
+
+        self._jobs: list[tuple[Callable[[], Any], Callable[[Any], Any] | None, float]] = []
+        self._started: bool = False
+        self._remaining: int = 0
+
+        self._total: float = 0.0
+        self._decoded: float = 0.0
+        self._uploaded: float = 0.0
+
+        # (result, error, upload, weight) for every job the workers have finished
+        self._ready: SimpleQueue = SimpleQueue()
+        # The finished jobs which have been drained from the queue but not uploaded
+        self._pending: deque[tuple[Any, Exception | None, Callable[[Any], Any] | None, float]] = deque()
+        # The upload generator being stepped and the weight of its job
+        self._uploading: tuple[Generator, float] | None = None
+        self._futures: list[Future] = []
+
+    def add(self, job: Callable[[], Any], upload: Callable[[Any], Any] | None = None, weight: float = 1.0):
+        if self._started:
+            raise RuntimeError('Jobs cannot be added once the task has begun')
+        self._jobs.append((job, upload, weight))
+        self._total += weight
+
+    def begin(self):
+        if self._started:
+            return
+        self._started = True
+        self._remaining = len(self._jobs)
+        if not self._jobs:
+            self._compelete = True
+            return
+
+        workers = get_workers()
+        self._futures = [workers.submit(self.task, job, upload, weight) for job, upload, weight in self._jobs]
+        self._jobs = []
+
+    def finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        if self._on_finish is not None:
+            self._on_finish()
+
+    def cancel(self):
+        Task.cancel(self)
+        for future in self._futures:
+            future.cancel()
+        if self._uploading is not None:
+            self._uploading[0].close()
+            self._uploading = None
+
+    def task(self, job: Callable[[], Any], upload: Callable[[Any], Any] | None, weight: float):
+        if self.cancelled:
+            return
+        try:
+            result, error = job(), None
+        except Exception as e:
+            result, error = None, e
+        self._ready.put((result, error, upload, weight))
+
+    def update(self):
+        if not self._started or self._cancelled:
+            return
+
+        ready, pending = self._ready, self._pending
+        while True:
+            try:
+                event = ready.get_nowait()
+            except Empty:
+                break
+            pending.append(event)
+            self._decoded += event[3]
+
+        end = perf_counter() + self.budget
+        while True:
+            if self._uploading is None:
+                if not pending:
+                    return
+                result, error, upload, weight = pending.popleft()
+                if error is not None:
+                    raise error
+
+                steps = upload(result) if upload is not None else None
+                if isinstance(steps, Generator):
+                    self._uploading = steps, weight
+                else:
+                    self._uploaded_job(weight)
+            else:
+                steps, weight = self._uploading
+                try:
+                    next(steps)
+                except StopIteration:
+                    self._uploading = None
+                    self._uploaded_job(weight)
+
+            if perf_counter() >= end:
+                return
+
+    def _uploaded_job(self, weight: float):
+        self._remaining -= 1
+        self._uploaded += weight
+        if not self._remaining:
+            self._compelete = True
+
+    @property
+    def fraction(self) -> float | None:
+        if not self._total:
+            return 1.0 if self._compelete else 0.0
+        return 0.5 * (self._decoded + self._uploaded) / self._total
+
+
+class TaskGraph(Task):
+    """
+    Runs tasks once the tasks they depend on are complete, as one task.
+
+    Every task is begun as soon as everything it was added after is complete, so independent
+    tasks run side by side on the shared workers. The graph updates the running tasks, and
+    calls each task's `finish` on the main thread exactly once when it completes, before
+    anything which depends on it is begun.
+
+    The fraction is the weighted average of the tasks' fractions, where a task without a
+    fraction counts as 0 until it completes. Cancelling the graph cancels every task in it.
+
+    Nothing here needs a window, so a graph can be run with `wait`.
+
+    Args:
+        finish: Called once every task is complete. It only ever runs once.
+    """
+
+    def __init__(self, finish: Callable[[], None] | None = None):
+        Task.__init__(self)
+        self._on_finish: Callable[[], None] | None = finish
+        self._finished: bool = False
+        self._started: bool = False
+
+        # Tasks are kept in the order they were added, which is always a valid order to run them
+        self._tasks: list[Task] = []
+        self._after: dict[Task, tuple[Task, ...]] = {}
+        self._weights: dict[Task, float] = {}
+        self._total: float = 0.0
+
+        self._running: list[Task] = []
+        self._done: set[Task] = set()
+
+    def add(self, task: Task, after: Iterable[Task] = (), weight: float = 1.0) -> Task:
+        """
+        Add a task which begins once every task in `after` is complete. The tasks it
+        depends on have to be added first, so the graph can never have a cycle.
+
+        Returns:
+            The task, so it can be passed to `after` of later tasks.
+        """
+        if self._started:
+            raise RuntimeError('Tasks cannot be added once the graph has begun')
+        if task in self._after:
+            raise ValueError(f'{task} is already in the graph')
+        after = tuple(after)
+        for dependency in after:
+            if dependency not in self._after:
+                raise ValueError(f'{dependency} has to be added to the graph before the tasks which depend on it')
+
+        self._tasks.append(task)
+        self._after[task] = after
+        self._weights[task] = weight
+        self._total += weight
+        return task
+
+    def begin(self):
+        if self._started:
+            return
+        self._started = True
+        self._start_ready()
+
+    def _start_ready(self) -> bool:
+        started = False
+        for task in self._tasks:
+            if task in self._done or task in self._running:
+                continue
+            if all(dependency in self._done for dependency in self._after[task]):
+                self._running.append(task)
+                task.begin()
+                started = True
+        return started
+
+    def update(self):
+        if not self._started or self.cancelled:
+            return
+
+        while True:
+            for task in tuple(self._running):
+                task.update()
+                # A task (or its finish) can cancel the graph, which drops everything still running
+                if self.cancelled:
+                    return
+                if task.complete:
+                    self._running.remove(task)
+                    self._done.add(task)
+                    task.finish()
+                    if self.cancelled:
+                        return
+
+            # Tasks which complete as soon as they begin unlock the next ones straight away
+            if not self._start_ready() or not any(task.complete for task in self._running):
+                break
+
+        if len(self._done) == len(self._tasks):
+            self._compelete = True
+
+    def finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        if self._on_finish is not None:
+            self._on_finish()
+
+    def cancel(self):
+        Task.cancel(self)
+        for task in self._tasks:
+            if task not in self._done:
+                task.cancel()
+        self._running.clear()
+
+    @property
+    def fraction(self) -> float | None:
+        if not self._total:
+            return 1.0 if self.complete else 0.0
+        done = 0.0
+        for task in self._tasks:
+            if task in self._done:
+                done += self._weights[task]
+            elif task in self._running:
+                fraction = task.fraction
+                done += self._weights[task] * (fraction or 0.0)
+        return done / self._total
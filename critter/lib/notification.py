@@ -1,81 +1,36 @@
 """
-This is a low-class count version of notifier, but there is another way which lets us type
-notifications alot stronger, but it is more work for the end developer we can discuss DX later.
+There are two ways to send notifications here, and they can be used side by side.
 
-Currently:
+Notifier:
     Notifications are just hashable tuples of items which link to a list of callbacks,
-    This lets the notifications be created at run time
+    This lets the notifications be created at run time. Listeners are called with whichever
+    of the pushed arguments they take by name.
 
-Possibly:
-    If we make Notifier and Notification inheritable types you could make notifications statically typed,
-    but it means that the developer has to hand-write the typing for every notification.
+NotificationBus:
+    Notifications are declared as subclasses of Notification, with their payload in __slots__,
+    so every notification is statically typed but the developer has to hand-write the typing
+    for every notification. In return a push is a single object with no __dict__, listeners
+    are bound to the notification type's integer slot when they are added, and the cached
+    notifications are kept in a ring buffer, so nothing is hashed or allocated to dispatch one.
 
-    It could be as simple as making Notifier subclass TypedDict so when we fetch a specific notifcation
-    we know exactly what types
+    class Killed(Notification):
+        __slots__ = ('time',)
+
+        def __init__(self, time: float):
+            self.time: float = time
+
+    bus.add_listener(Killed, lambda killed: print(killed.time))
+    bus.push(Killed(0.9))
 """
-# from typing import TypedDict, Callable
-#
-#
-# class Notification:
-#     @staticmethod
-#     def push(*args, **kwargs):
-#         raise NotImplementedError()
-#
-#     @staticmethod
-#     def add_listener(*args, **kwargs):
-#         raise NotImplementedError()
-#
-#
-# class DefaultNotification(Notification):
-#
-#     @staticmethod
-#     def push():
-#         pass
-#
-#     @staticmethod
-#     def add_listener(listener: Callable):
-#         pass
-#
-#
-# class EnableNotification(Notification):
-#
-#     @staticmethod
-#     def push(scope: str):
-#         pass
-#
-#     @staticmethod
-#     def add_listener(listener: Callable):
-#         pass
-#
-#
-# class KilledNotification(Notification):
-#
-#     @staticmethod
-#     def push(time: float):
-#         pass
-#
-#     @staticmethod
-#     def note(listener: Callable):
-#         pass
-#
-#
-# class Notifications(TypedDict):
-#     enable: EnableNotification
-#
-#
-# class CustomNotifs(Notifications):
-#     kill: KilledNotification
-#
-#
-# notifications: CustomNotifs = {
-#     name: Notification() for name in CustomNotifs.__dict__['__annotations__']
-# }
-#
-#
-# notifications['kill'].push(0.9)
-
-from typing import Callable, Any, Hashable, NamedTuple, Optional
+
+from typing import Callable, Any, Hashable, NamedTuple, Optional, ClassVar, TypeVar
 from enum import IntEnum
+from itertools import count
+from collections import deque
+from bisect import insort
+from time import perf_counter
+from types import MethodType
+from weakref import WeakMethod, WeakKeyDictionary
 import inspect
 
 
@@ -92,52 +47,156 @@ class NotificationCreateMode(IntEnum):
     BOTH = 0b11
 
 
+class NotificationCoalesce(IntEnum):
+    # What happens when a notification is pushed while it is already waiting in the cache
+    NONE = 0  # Both are dispatched
+    KEEP_LAST = 1  # The waiting push takes the new arguments
+    MERGE = 2  # The new arguments are added to the waiting push's, replacing any it already had
+    COUNT = 3  # As KEEP_LAST, but listeners taking `count` are told how many pushes it stands for
+
+
 class Notifier:
+    """
+    Listeners are called with only the arguments they take, by name. Anything a push
+    leaves out falls back to the notification's defaults, and then the listener's own.
+
+    Working out which arguments each listener takes is done once when it is added, not on
+    every push. Each (notification, listener) pair gets a dispatch plan: the names the
+    listener takes, and the defaults it would use. When a push only has arguments the
+    listener takes (the usual case) the arguments are passed straight through.
+
+    Recording where a notification was pushed from means inspecting the caller's frame,
+    which costs more than the dispatch itself. It is only done if `capture_caller` is set,
+    and then listeners which take a `caller` argument are given a NotificationCaller.
 
-    def __init__(self, mode: NotificationCreateMode = NotificationCreateMode.BOTH):
+    Bound methods are only weakly referenced, so a view or sprite listening to a notification
+    is not kept alive by it. When the object is collected its listeners are forgotten
+    straight away, without calling `remove_listener`. Any other callable is kept alive while
+    it is listening, so a lambda or closure can still be added on its own. So are the methods
+    of objects which can't be weakly referenced (__slots__ without __weakref__).
+
+    Pushes which aren't immediate wait until `push_cache`. Each notification can be given
+    a priority and a coalesce policy when it is created. Higher priorities are dispatched
+    first, and pushes of the same priority are dispatched in the order they were pushed.
+    A coalesced push is dispatched where the first of the pushes it stands for was queued.
+    If `push_cache` is given a budget it stops once it has spent that long (always after
+    dispatching at least one push) and the rest stay at the front of their priority, in the
+    same order, for next time.
+    """
+
+    def __init__(self, mode: NotificationCreateMode = NotificationCreateMode.BOTH, capture_caller: bool = False):
         self._create_mode: NotificationCreateMode = mode
-        self._notifications: dict[Hashable, list[Callable]] = {}
+        self._capture_caller: bool = capture_caller
+        # The dispatch plan of every listener by its key, in the order they were added. A plan is
+        # (listener or weak reference to it, is it weak, the names it takes, the same names in order,
+        # the notification's defaults it takes)
+        self._notifications: dict[Hashable, dict[Hashable, tuple[Callable, bool, frozenset[str], tuple[str, ...], dict[str, Any]]]] = {}
         self._defaults: dict[Hashable, dict[str, Any]] = {}
-        self._callable_signatures: dict[Callable, tuple] = {}
+        # The parameters of every function listening, which are forgotten along with the function
+        self._callable_signatures: WeakKeyDictionary[Callable, tuple[str, ...]] = WeakKeyDictionary()
+        # The plans of each notification as a tuple to dispatch, or None when they have changed
+        self._plans: dict[Hashable, tuple | None] = {}
 
-        self._notification_cache: list[tuple[Hashable, dict[str, Any]]] = []
+        self._policies: dict[Hashable, NotificationCoalesce] = {}
+        self._priorities: dict[Hashable, int] = {}
 
-    def clean_up_signatures(self):
-        all_active_listeners = set(sum(self._notifications.values(), start=[]))
-        self._callable_signatures = {listener: cache for listener, cache in self._callable_signatures.items() if listener in all_active_listeners}
+        # A lane of waiting (notification, arguments) for each priority, with the priorities highest first
+        self._lanes: dict[int, deque[tuple[Hashable, dict[str, Any]]]] = {0: deque()}
+        self._lane_order: list[int] = [0]
+        self._cached: int = 0
+        # The arguments of the waiting push of each coalesced notification
+        self._coalesced: dict[Hashable, dict[str, Any]] = {}
 
-    def create_notification(self, name_: Hashable, **defaults):
+    def create_notification(self, name_: Hashable, coalesce_: NotificationCoalesce = NotificationCoalesce.NONE, priority_: int = 0, **defaults):
         if name_ in self._notifications:
             raise ValueError("notification already exists")
 
-        self._notifications[name_] = []
+        self._notifications[name_] = {}
         self._defaults[name_] = defaults
+        self._plans[name_] = ()
+        self._policies[name_] = coalesce_
+        self._priorities[name_] = priority_
+        if priority_ not in self._lanes:
+            self._lanes[priority_] = deque()
+            insort(self._lane_order, priority_, key=lambda priority: -priority)
 
     def delete_notification(self, name_: Hashable):
         del self._notifications[name_]
         del self._defaults[name_]
+        del self._plans[name_]
+        del self._policies[name_]
+        lane = self._lanes[self._priorities.pop(name_)]
+        self._coalesced.pop(name_, None)
 
-        self._notification_cache = filter(lambda item: item[0] != name_, self._notification_cache)
+        waiting = [item for item in lane if item[0] != name_]
+        self._cached -= len(lane) - len(waiting)
+        lane.clear()
+        lane.extend(waiting)
 
     def does_notification_exist(self, notification_: Hashable):
         return notification_ in self._notifications
 
+    @staticmethod
+    def _listener_key(listener_: Callable) -> Hashable:
+        # Bound methods are made every time they are looked up, so they are told apart by what they bind
+        if isinstance(listener_, MethodType):
+            return id(listener_.__self__), listener_.__func__
+        return listener_
+
+    def _listener_parameters(self, listener_: Callable) -> tuple[str, ...]:
+        # Methods share their function's parameters, without self
+        function, bound = (listener_.__func__, 1) if isinstance(listener_, MethodType) else (listener_, 0)
+        try:
+            return self._callable_signatures[function][bound:]
+        except KeyError:
+            pass
+        except TypeError:
+            # Builtins can't be weakly referenced, so they aren't cached
+            return tuple(inspect.signature(listener_).parameters)
+
+        parameters = tuple(inspect.signature(function).parameters)
+        self._callable_signatures[function] = parameters
+        return parameters[bound:]
+
     def add_listener(self, notification_: Hashable, listener_: Callable):
         if notification_ not in self._notifications and NotificationCreateMode.LISTENER & self._create_mode:
             self.create_notification(notification_)
-        if listener_ in self._notifications[notification_]:
+        listeners = self._notifications[notification_]
+        key = self._listener_key(listener_)
+        if key in listeners:
             return
 
-        if listener_ not in self._callable_signatures:
-            self._callable_signatures[listener_] = tuple(inspect.signature(listener_).parameters)
+        parameters = self._listener_parameters(listener_)
+        defaults = {parameter: value for parameter, value in self._defaults[notification_].items() if parameter in parameters}
 
-        self._notifications[notification_].append(listener_)
+        target, weak = listener_, False
+        if isinstance(listener_, MethodType):
+            try:
+                target, weak = WeakMethod(listener_, lambda dead: self._forget_listener(notification_, key, dead)), True
+            except TypeError:
+                # Objects with __slots__ and no __weakref__ can't be weakly referenced, so are kept alive
+                pass
+        listeners[key] = (target, weak, frozenset(parameters), parameters, defaults)
+        self._plans[notification_] = None
+
+    def _forget_listener(self, notification_: Hashable, key: Hashable, dead: WeakMethod):
+        # Called when a listening method's object is collected
+        listeners = self._notifications.get(notification_)
+        if listeners is None or key not in listeners or listeners[key][0] is not dead:
+            return
+        del listeners[key]
+        self._plans[notification_] = None
 
     def remove_listener(self, notification_: Hashable, listener_: Callable):
-        self._notifications[notification_].remove(listener_)
+        if self._notifications[notification_].pop(self._listener_key(listener_), None) is None:
+            raise ValueError(f"{listener_} is not listening to {notification_}")
+        self._plans[notification_] = None
+
+    def listener_count(self, notification_: Hashable) -> int:
+        return len(self._notifications[notification_])
 
     def push_notification(self, notification_: Hashable, immediate_: bool = False, **arguments_):
-        if 'caller' not in arguments_:
+        if self._capture_caller and 'caller' not in arguments_:
             frame_code = inspect.currentframe().f_back
             f_name = frame_code.f_code.co_name
             arguments_['caller'] = NotificationCaller(frame_code.f_lineno, f_name if f_name != '<module>' else None, frame_code.f_locals.get('self', None))
@@ -146,27 +205,207 @@ class Notifier:
             self.create_notification(notification_, **arguments_)
         if immediate_:
             self._dispatch_notification(notification_, arguments_)
-        else:
-            self._notification_cache.append((notification_, arguments_))
+            return
 
-    def push_cache(self):
-        if not self._notification_cache:
+        policy = self._policies[notification_]
+        if policy:
+            waiting = self._coalesced.get(notification_)
+            if waiting is not None:
+                if policy == NotificationCoalesce.MERGE:
+                    waiting.update(arguments_)
+                else:
+                    pushes = waiting.get('count', 1)
+                    waiting.clear()
+                    waiting.update(arguments_)
+                    if policy == NotificationCoalesce.COUNT:
+                        waiting['count'] = pushes + 1
+                return
+            if policy == NotificationCoalesce.COUNT:
+                arguments_['count'] = 1
+            self._coalesced[notification_] = arguments_
+
+        self._lanes[self._priorities[notification_]].append((notification_, arguments_))
+        self._cached += 1
+
+    def push_cache(self, budget_: float | None = None):
+        """
+        Dispatch the waiting pushes.
+
+        Args:
+            budget_: How many seconds to spend dispatching, or None to dispatch everything.
+        """
+        if not self._cached:
             return
-        # This make a copy, but maybe don't?
-        # like if you do a notification in the push step
-        # then it will be called later this dispatch,
-        # so we don't get that delay we had to worry about?
-        # We could get an infinite loop which would be bad so maybe not.
+        # Only what was waiting when this was called is dispatched. A listener that pushes
+        # gets its notification dispatched next time, so it can never loop forever.
+        end = None if budget_ is None else perf_counter() + budget_
+        waiting = [(self._lanes[priority], len(self._lanes[priority])) for priority in self._lane_order]
 
-        notification_cache = self._notification_cache[:]
-        self._notification_cache = []
+        for lane, length in waiting:
+            for _ in range(length):
+                if not lane:
+                    # A listener deleted a notification that was waiting
+                    break
+                notification, arguments = lane.popleft()
+                self._cached -= 1
+                if self._coalesced.get(notification) is arguments:
+                    del self._coalesced[notification]
 
-        for notification, arguments in notification_cache:
-            self._dispatch_notification(notification, arguments)
+                self._dispatch_notification(notification, arguments)
+                if end is not None and perf_counter() >= end:
+                    return
 
     def _dispatch_notification(self, notification_, arguments_: dict[str, Any]):
         # TODO: add try loop to make exceptions more obvious
-        defaults = self._defaults[notification_]
-        for listener in self._notifications[notification_]:
-            kwargs = {parameter: arguments_.get(parameter, None) if parameter in arguments_ else defaults[parameter] for parameter in self._callable_signatures[listener] if parameter in arguments_ or parameter in defaults}
-            listener(**kwargs)
+        plans = self._plans[notification_]
+        if plans is None:
+            # Dispatching a tuple means listeners can be added, removed, or collected mid dispatch
+            plans = self._plans[notification_] = tuple(self._notifications[notification_].values())
+
+        pushed = arguments_.keys()
+        for listener, weak, accepts, parameters, defaults in plans:
+            if weak:
+                listener = listener()
+                if listener is None:
+                    continue
+            if pushed <= accepts:
+                # The listener takes everything that was pushed
+                if defaults:
+                    listener(**(defaults | arguments_))
+                else:
+                    listener(**arguments_)
+            elif defaults:
+                listener(**(defaults | {parameter: arguments_[parameter] for parameter in parameters if parameter in arguments_}))
+            else:
+                listener(**{parameter: arguments_[parameter] for parameter in parameters if parameter in arguments_})
+
+
+# Every Notification subclass gets the next slot when it is declared
+_notification_slots = count()
+
+
+class Notification:
+    """
+    The base of every notification sent through a NotificationBus.
+
+    A subclass has to declare its payload with __slots__ (even if it is empty) so pushing
+    one never makes a __dict__. The listeners for a type are stored at its `slot` in every
+    bus, so a subclass is its own notification: listening to a base type does not hear
+    notifications of its subclasses.
+    """
+    __slots__ = ()
+    slot: ClassVar[int] = -1
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '__slots__' not in cls.__dict__:
+            raise TypeError(f"{cls.__name__} has to declare __slots__ to be a Notification")
+        cls.slot = next(_notification_slots)
+
+
+N = TypeVar('N', bound=Notification)
+
+
+class NotificationBus:
+    """
+    Dispatches typed notifications to the listeners of their type.
+
+    Notifications pushed without `immediate` wait in a ring buffer until `push_cache`.
+    Notifications pushed while the cache is being dispatched wait until the next call, so
+    a listener which pushes can never keep `push_cache` going forever. The ring grows if
+    more notifications are pushed than it can hold, so it never drops any.
+
+    The listeners of each type are kept as a tuple which is replaced when one is added or
+    removed, so a listener can add or remove listeners (itself included) mid dispatch without
+    the rest being skipped, and dispatching never has to copy them.
+
+    Args:
+        capacity: How many notifications the ring holds before it has to grow, rounded up
+            to a power of two.
+    """
+
+    def __init__(self, capacity: int = 256):
+        # The listeners of every Notification type, indexed by its slot
+        self._listeners: list[tuple[Callable[[Any], Any], ...]] = []
+
+        self._ring: list[Notification | None] = [None] * (1 << max(capacity - 1, 1).bit_length())
+        self._mask: int = len(self._ring) - 1
+        self._head: int = 0
+        self._count: int = 0
+        # How many notifications the running push_cache still has to dispatch
+        self._draining: int = 0
+
+    def _slot(self, type_: type[Notification]) -> int:
+        slot = type_.slot
+        if slot < 0:
+            raise TypeError(f"{type_.__name__} is not a Notification subclass")
+        if slot >= len(self._listeners):
+            self._listeners.extend(() for _ in range(slot + 1 - len(self._listeners)))
+        return slot
+
+    def add_listener(self, type_: type[N], listener: Callable[[N], Any]) -> int:
+        """
+        Call the listener with every notification of the type.
+
+        Returns:
+            The slot the listener was bound to.
+        """
+        slot = self._slot(type_)
+        if listener not in self._listeners[slot]:
+            self._listeners[slot] += (listener,)
+        return slot
+
+    def remove_listener(self, type_: type[N], listener: Callable[[N], Any]):
+        slot = self._slot(type_)
+        listeners = self._listeners[slot]
+        if listener not in listeners:
+            raise ValueError(f"{listener} is not listening to {type_.__name__}")
+        idx = listeners.index(listener)
+        self._listeners[slot] = listeners[:idx] + listeners[idx + 1:]
+
+    def has_listeners(self, type_: type[Notification]) -> bool:
+        return type_.slot < len(self._listeners) and bool(self._listeners[type_.slot])
+
+    @property
+    def pending(self) -> int:
+        # How many notifications are waiting for push_cache
+        return self._count
+
+    def push(self, notification: Notification, immediate: bool = False):
+        if immediate:
+            self._dispatch(notification)
+            return
+
+        if self._count > self._mask:
+            self._grow()
+        self._ring[(self._head + self._count) & self._mask] = notification
+        self._count += 1
+
+    def _grow(self):
+        # Unroll the ring into a buffer twice the size, oldest first
+        ring, head = self._ring, self._head
+        self._ring = ring[head:] + ring[:head] + [None] * len(ring)
+        self._mask = len(self._ring) - 1
+        self._head = 0
+
+    def push_cache(self):
+        # Listeners can push (growing the ring) or clear the cache, so nothing is held across a dispatch
+        self._draining = self._count
+        while self._draining:
+            self._draining -= 1
+            ring, head = self._ring, self._head
+            notification = ring[head]
+            ring[head] = None
+            self._head = (head + 1) & self._mask
+            self._count -= 1
+            self._dispatch(notification)
+
+    def clear_cache(self):
+        self._ring = [None] * len(self._ring)
+        self._head = self._count = self._draining = 0
+
+    def _dispatch(self, notification: Notification):
+        slot = notification.slot
+        if slot < len(self._listeners):
+            for listener in self._listeners[slot]:
+                listener(notification)
@@ -1,19 +1,29 @@
 from __future__ import annotations
 from typing import Deque, Any
+from collections.abc import Sequence
 from array import array
 from collections import deque
 from arcade import ArcadeContext, get_window
+from arcade.gl import Buffer
 
 class Attribute[T]:
-    
+    """
+    Links an attribute on an Object to one of its ObjectList's targets.
+
+    Goes straight to the target's SyncedArray rather than through `ObjectList.get`/`set`
+    since attribute access is by far the most common way the data is touched.
+    """
+
     def __init__(self, target: str):
         self.target = target
 
     def __get__(self, obj: Object, objtype=None) -> T:
-        return obj.source.get(obj.idx, self.target)
+        if obj is None:
+            return self
+        return obj.source._targets[self.target][obj.idx]  # noqa: SLF001
 
     def __set__(self, obj: Object, value: T):
-        obj.source.set(obj.idx, self.target, value)
+        obj.source._targets[self.target][obj.idx] = value  # noqa: SLF001
 
 class Object:
 
@@ -24,8 +34,25 @@ class Object:
 
 _CAPACITY_DEFAULT = 128
 class SyncedArray:
+    """
+    A typed array on the CPU with a matching gl Buffer on the GPU.
+
+    Every slot is `step` values wide. Writes on the CPU side mark their slots as dirty and
+    `sync` coalesces the dirty slots into runs, writing each run straight from a memoryview
+    of the array rather than uploading the whole thing.
+
+    If no context is given the buffer is only made the first time the array is synced,
+    so the CPU side can be used before there is a window. Anything with the same
+    `write(data, offset)`, `read()`, and `orphan(size)` methods as a gl Buffer can be passed
+    in place of one.
 
-    def __init__(self, dtype, step, size, ctx: ArcadeContext = None):
+    `uploads` and `uploaded_bytes` count the writes done since the array was made, while
+    `frame_bytes` is how much the last sync wrote.
+
+    Single values (step == 1) are read as a scalar, otherwise as a tuple.
+    """
+
+    def __init__(self, dtype: str, step: int, size: int, ctx: ArcadeContext = None, lazy: bool = False, buffer: Buffer | None = None):
         self._size = size
         self._dtype = dtype
         self._step = step
@@ -33,43 +60,196 @@ class SyncedArray:
         self._cpu_stale = False
         self._gpu_stale = False
 
+        # The slots which have changed since the last sync. When every slot
+        # is stale the set is skipped and the whole array is written.
+        self._dirty: set[int] = set()
+        self._all_dirty: bool = False
+
+        self._array = array(self._dtype, [0]) * (self._size * self._step)
+        self._itemsize = self._array.itemsize
+
+        self.uploads: int = 0
+        self.uploaded_bytes: int = 0
+        self.frame_bytes: int = 0
+
+        self._buffer: Buffer | None = buffer
+        if buffer is not None:
+            self._all_dirty = self._gpu_stale = True
+        elif ctx is not None or not lazy:
+            self._init_buffer(ctx)
+
+    def _init_buffer(self, ctx: ArcadeContext = None):
         ctx = ctx or get_window().ctx
-        self._buffer = ctx.buffer(reserve=4 * self._size * self._step)
-        self._array = array(self._dtype, [0] * self._size * self._step)
+        self._buffer = ctx.buffer(data=self._array)
+        self._dirty.clear()
+        self._all_dirty = self._gpu_stale = False
+
+    @property
+    def buffer(self) -> Buffer:
+        if self._buffer is None:
+            self._init_buffer()
+        return self._buffer
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def step(self) -> int:
+        return self._step
+
+    @property
+    def data(self) -> array:
+        return self._array
+
+    @property
+    def dirty(self) -> tuple[int, ...]:
+        if self._all_dirty:
+            return tuple(range(self._size))
+        return tuple(sorted(self._dirty))
+
+    def _mark(self, start: int, end: int):
+        if not self._all_dirty:
+            if end - start == 1:
+                self._dirty.add(start)
+            elif start == 0 and end >= self._size:
+                self._all_dirty = True
+                self._dirty.clear()
+            else:
+                self._dirty.update(range(start, end))
+        self._gpu_stale = True
+
+    def mark_cpu_stale(self):
+        # The buffer was written to on the GPU, so the next sync should read it back
+        self._cpu_stale = True
 
     def sync(self, force_cpu: bool = False, force_gpu: bool = False):
-        if self._gpu_stale or force_cpu:
-            self._buffer.write(self._array.tobytes())
-            self._gpu_stale = self._cpu_stale = False
+        self.frame_bytes = 0
+        if self._buffer is None:
+            self._init_buffer()
+            return
+
+        if force_cpu:
+            self._mark(0, self._size)
+
+        if self._gpu_stale:
+            with memoryview(self._array) as view:
+                if self._all_dirty:
+                    self._write(view, 0, self._size)
+                elif self._dirty:
+                    slots = sorted(self._dirty)
+                    start = end = slots[0]
+                    for slot in slots[1:]:
+                        if slot != end + 1:
+                            self._write(view, start, end + 1)
+                            start = slot
+                        end = slot
+                    self._write(view, start, end + 1)
+            self._dirty.clear()
+            self._all_dirty = self._gpu_stale = self._cpu_stale = False
         elif self._cpu_stale or force_gpu:
             self._array = array(self._dtype, self._buffer.read())
             self._gpu_stale = self._cpu_stale = False
 
-    def extend(self, size: int, extend: int):
-        self._array.extend([0] * extend * self._step)
-        self._buffer.orphan(size=size)
-        
-        self._gpu_stale = True
+    def _write(self, view: memoryview, start: int, end: int):
+        step = self._step
+        chunk = view[start * step:end * step]
+        self._buffer.write(chunk, offset=start * step * self._itemsize)
+        self.uploads += 1
+        self.uploaded_bytes += chunk.nbytes
+        self.frame_bytes += chunk.nbytes
+
+    def extend(self, size: int):
+        """
+        Grow the array to hold `size` slots. The new slots are zeroed and the buffer is orphaned
+        to the new size, so everything is written on the next sync.
+        """
+        if size <= self._size:
+            return
+
+        self._array.extend(array(self._dtype, [0]) * ((size - self._size) * self._step))
+        self._size = size
+        if self._buffer is not None:
+            self._buffer.orphan(size=len(self._array) * self._itemsize)
+        self._mark(0, size)
+
+    def get_many(self, start: int, stop: int) -> array:
+        """
+        Read slots [start, stop) as a flat array (a copy, step values per slot).
+        """
+        return self._array[start * self._step:stop * self._step]
+
+    def set_many(self, start: int, values: Sequence[Any]):
+        """
+        Write a flat sequence of values (step values per slot) starting at slot `start`.
+        """
+        count = len(values) // self._step
+        if start + count > self._size:
+            raise IndexError(f'writing {count} slots at {start} overflows the array of {self._size} slots')
+        step = self._step
+        if not isinstance(values, array) or values.typecode != self._dtype:
+            values = array(self._dtype, values)
+        self._array[start * step:(start + count) * step] = values
+        self._mark(start, start + count)
 
     def __getitem__(self, idx: int) -> Any:
-        return tuple(self._array[idx*self._step + i] for i in range(self._step))
+        if self._step == 1:
+            return self._array[idx]
+        return tuple(self._array[idx * self._step:(idx + 1) * self._step])
 
     def __setitem__(self, idx: int, value: Any):
-        for i in range(self._step):
-            self._array[idx*self._step + i] = value[i]
+        if self._step == 1:
+            self._array[idx] = value
+        else:
+            self._array[idx * self._step:(idx + 1) * self._step] = array(self._dtype, value)
+        self._mark(idx, idx + 1)
 
 
 class ObjectList:
+    """
+    A struct-of-arrays store of objects. Each target is its own typed SyncedArray and
+    an object is just the slot index shared by every target.
+
+    Args:
+        targets: (name, step) or (name, step, dtype) for every array. dtype defaults to 'f'.
+        capacity: How many objects there is initially room for. Doubles whenever it is exceeded.
+        lazy: If True the gl Buffers are made on the first sync rather than immediately.
+    """
 
-    def __init__(self, targets: tuple[tuple[str, int], ...], capacity: int = _CAPACITY_DEFAULT, lazy: bool = True):
+    def __init__(self, targets: tuple[tuple[str, int] | tuple[str, int, str], ...], capacity: int = _CAPACITY_DEFAULT, lazy: bool = True):
         self._lazy = lazy
 
         self._capacity = self._slot_capacity = abs(capacity) or _CAPACITY_DEFAULT
         self._freed_slots: Deque[int] = deque()
         self._used_slots: int = 0
+        self._alive: bytearray = bytearray(self._capacity)
 
         self._targets: dict[str, SyncedArray] = {}
-    
+        for target in targets:
+            name, step, *dtype = target
+            self._targets[name] = SyncedArray(dtype[0] if dtype else 'f', step, self._capacity, lazy=lazy)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def count(self) -> int:
+        return self._used_slots - len(self._freed_slots)
+
+    @property
+    def slots(self) -> int:
+        # The number of slots ever used, so every live object is below this
+        return self._used_slots
+
+    @property
+    def frame_bytes(self) -> int:
+        # How many bytes the last sync wrote across every target
+        return sum(synced.frame_bytes for synced in self._targets.values())
+
+    def get_array(self, target: str) -> SyncedArray:
+        return self._targets[target]
+
     def _next_slot(self) -> int:
         """
         Get the next available slot in the buffers
@@ -79,31 +259,78 @@ class ObjectList:
         """
         if self._freed_slots:
             return self._freed_slots.popleft()
-        
+
         slot = self._used_slots
         self._used_slots += 1
         self._grow_buffers()
         return slot
-    
+
     def _grow_buffers(self):
         if self._used_slots <= self._capacity:
             return
-        
+
         extend_by = self._capacity
         self._capacity *= 2
 
+        self._alive.extend(bytes(extend_by))
+        for synced in self._targets.values():
+            synced.extend(self._capacity)
 
     def new(self) -> int:
-        pass
+        slot = self._next_slot()
+        self._alive[slot] = 1
+        return slot
+
+    def new_many(self, count: int) -> range | list[int]:
+        """
+        Create `count` objects at once. Freed slots are reused first, after which
+        the new slots are one contiguous range which the arrays grow to fit in one go.
+        """
+        recycled = [self._freed_slots.popleft() for _ in range(min(count, len(self._freed_slots)))]
+        start = self._used_slots
+        self._used_slots += count - len(recycled)
+        if self._used_slots > self._capacity:
+            while self._used_slots > self._capacity:
+                self._alive.extend(bytes(self._capacity))
+                self._capacity *= 2
+            for synced in self._targets.values():
+                synced.extend(self._capacity)
+
+        for slot in recycled:
+            self._alive[slot] = 1
+        self._alive[start:self._used_slots] = b'\x01' * (self._used_slots - start)
+
+        if not recycled:
+            return range(start, self._used_slots)
+        return recycled + list(range(start, self._used_slots))
 
     def rem(self, idx: int) -> None:
-        pass
+        if idx >= self._used_slots or not self._alive[idx]:
+            raise ValueError(f'There is no object in slot {idx}')
+
+        self._alive[idx] = 0
+        for synced in self._targets.values():
+            synced[idx] = (0,) * synced.step if synced.step != 1 else 0
+        self._freed_slots.append(idx)
+
+    def is_alive(self, idx: int) -> bool:
+        return idx < self._used_slots and bool(self._alive[idx])
 
     def get(self, idx: int, target: str) -> Any:
-        pass
+        return self._targets[target][idx]
 
     def set(self, idx: int, target: str, value: Any):
-        pass
+        self._targets[target][idx] = value
+
+    def get_many(self, target: str, start: int = 0, stop: int | None = None) -> array:
+        return self._targets[target].get_many(start, self._used_slots if stop is None else stop)
+
+    def set_many(self, target: str, start: int, values: Sequence[Any]):
+        self._targets[target].set_many(start, values)
+
+    def sync(self, force_cpu: bool = False, force_gpu: bool = False):
+        for synced in self._targets.values():
+            synced.sync(force_cpu, force_gpu)
 
 
 
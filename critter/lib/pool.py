@@ -1,6 +1,9 @@
 from __future__ import annotations
-from typing import Self
-from collections.abc import Callable
+from typing import Self, Any, Protocol
+from collections.abc import Callable, Iterable, Sequence
+from itertools import compress
+from bisect import bisect_right
+from array import array
 from arcade import SpriteList, BasicSprite
 
 
@@ -19,9 +22,9 @@ class Pool[T]:
     The weakness here is that if the number of used items stays small with small variations the same items
     will be used over and over again, but that isn't really an issue.
 
-    the slowest part is getting the item's index, so we could speed it up with some dictionaries, but
-    that adds complexity and memory that probably isn't worth it. Also using the idx methods exclude that step
-    so if you need the speed that is the way to use the Pool.
+    the slowest part is getting the item's index, which is a linear search. Using the idx methods exclude that step,
+    and if items are returned often (like when unloading whole rooms) use the IndexedPool which tracks every
+    item's index at the cost of a dictionary.
     """
     def __init__(self, items: list[T]):
         self._source: list[T] = items
@@ -30,7 +33,7 @@ class Pool[T]:
 
     @classmethod
     def from_callback(cls, size: int, callback: Callable[[int], T]) -> Self:
-        return cls([(callback(idx) for idx in range(size))])
+        return cls([callback(idx) for idx in range(size)])
 
     @property
     def source(self) -> list[T]:
@@ -80,7 +83,59 @@ class Pool[T]:
         self._source[self._free_idx], self._source[idx] = item, self._source[self._free_idx]
 
 
-# TODO: make a SpritePool that works better with how Spritelists work internally
+class IndexedPool[T](Pool[T]):
+    """
+    A Pool which keeps a dictionary of where each item is in the source list.
+
+    This makes `give()` constant time rather than a linear search, and the index is
+    updated whenever two items are swapped. The items must be hashable and unique.
+
+    Also supports getting and giving items in batches, which skips most of the per item overhead.
+    """
+    def __init__(self, items: list[T]):
+        Pool.__init__(self, items)
+        self._index: dict[T, int] = {item: idx for idx, item in enumerate(items)}
+
+    def index(self, item: T) -> int:
+        return self._index[item]
+
+    def give(self, item: T) -> None:
+        idx = self._index[item]
+        if idx >= self._free_idx:
+            raise ValueError('trying to return an item which was already returned')
+
+        self._free_idx -= 1
+        swap = self._source[self._free_idx]
+        self._source[self._free_idx], self._source[idx] = item, swap
+        self._index[item], self._index[swap] = self._free_idx, idx
+
+    def get_many(self, count: int) -> list[T]:
+        if self._free_idx + count > self._size:
+            raise IndexError(f'Only {self.remaining} free items, but {count} were requested')
+
+        items = self._source[self._free_idx:self._free_idx + count]
+        self._free_idx += count
+        return items
+
+    def give_many(self, items: Iterable[T]) -> None:
+        source = self._source
+        index = self._index
+        free_idx = self._free_idx
+        try:
+            for item in items:
+                idx = index[item]
+                if idx >= free_idx:
+                    raise ValueError('trying to return an item which was already returned')
+
+                free_idx -= 1
+                swap = source[free_idx]
+                source[free_idx], source[idx] = item, swap
+                index[item], index[swap] = free_idx, idx
+        finally:
+            # Even if one item fails the ones before it were still returned
+            self._free_idx = free_idx
+
+
 class OrderedPool[T]:
     """
     A Pool object which uses a shifting index to mark which items are free and which aren't
@@ -97,7 +152,7 @@ class OrderedPool[T]:
 
     @classmethod
     def from_callback(cls, size: int, callback: Callable[[int], T]) -> Self:
-        return cls([(callback(idx) for idx in range(size))])
+        return cls([callback(idx) for idx in range(size)])
 
     @property
     def source(self) -> list[T]:
@@ -140,27 +195,308 @@ class OrderedPool[T]:
         self._source.append(item)
 
 
-class SpritePool[S: BasicSprite](Pool[S]):
-    def __init__(self, items: list[S]):
-        self._size: int = len(items)
-        self._source: SpriteList[S] = SpriteList(capacity=self._size)
-        self._source.extend(items)
-        self._free_idx: int = 0
+class IndexBuffer(Protocol):
+    """
+    The part of arcade's gl Buffer the SpritePool uses. Anything with a matching `write`
+    can stand in for it, which lets the pool be checked without a GPU.
+    """
 
-    def give(self, item: S) -> None:
-        idx = self._source.index(item)
+    def write(self, data: Any, offset: int = 0) -> None:
+        ...
+
+
+class SpritePool[S: BasicSprite](IndexedPool[int]):
+    """
+    A Pool of sprite slots which lives directly inside a SpriteList's index data.
+
+    The items are buffer slots, which index into `sprites` and never change. The pool's source
+    is the sprite list's index data, so the given slots are exactly the first `used` entries
+    of the index buffer and `draw()` only renders those.
+
+    Giving a slot back swaps two entries of the index data in place, rather than popping
+    and appending which shifts everything after it. Only the entries which changed get written
+    to the index buffer the next time the pool is drawn, instead of the whole buffer.
+
+    The index buffer can be replaced (with any IndexBuffer) to check the pool without a GPU.
+    `swaps`, `uploads`, and `uploaded_bytes` count the work done since the pool was made.
+
+    The pool reaches into the SpriteList's private index data and geometry, which arcade
+    reworks between releases, so arcade is pinned to the release it was written against.
+    """
+    def __init__(self, items: list[S], buffer: IndexBuffer | None = None):
+        self._sprites: tuple[S, ...] = tuple(items)
+        self._sprite_list: SpriteList[S] = SpriteList(capacity=len(items))
+        self._sprite_list.extend(items)
+
+        # A fresh sprite list gives the n-th sprite buffer slot n, so the index data starts as 0..n-1
+        Pool.__init__(self, self._sprite_list._sprite_index_data)  # noqa: SLF001
+        self._size = len(items)
+        self._index: array[int] = array('i', range(self._size))
+
+        self._buffer: IndexBuffer | None = buffer
+        self._dirty: set[int] = set()
+
+        self.swaps: int = 0
+        self.uploads: int = 0
+        self.uploaded_bytes: int = 0
+
+    @property
+    def sprites(self) -> tuple[S, ...]:
+        return self._sprites
+
+    @property
+    def sprite_list(self) -> SpriteList[S]:
+        return self._sprite_list
+
+    @property
+    def buffer(self) -> IndexBuffer | None:
+        if self._buffer is not None:
+            return self._buffer
+        if self._sprite_list._sprite_index_changed:  # noqa: SLF001
+            # The sprite list is going to write the whole index buffer itself
+            return None
+        return self._sprite_list._sprite_index_buf  # noqa: SLF001
+
+    @property
+    def dirty(self) -> tuple[int, ...]:
+        return tuple(sorted(self._dirty))
+
+    @property
+    def positions(self) -> array[int]:
+        # Where every slot is in the index data, by slot
+        return self._index
+
+    def _swap(self, idx_a: int, idx_b: int) -> None:
+        source = self._source
+        index = self._index
+        sprites = self._sprite_list.sprite_list
+
+        slot_a, slot_b = source[idx_a], source[idx_b]
+        source[idx_a], source[idx_b] = slot_b, slot_a
+        index[slot_a], index[slot_b] = idx_b, idx_a
+        sprites[idx_a], sprites[idx_b] = sprites[idx_b], sprites[idx_a]
+
+        self._dirty.add(idx_a)
+        self._dirty.add(idx_b)
+        self.swaps += 1
+
+    def give(self, item: int) -> None:
+        idx = self._index[item]
         if idx >= self._free_idx:
             raise ValueError('trying to return an item which was already returned')
 
         self._free_idx -= 1
+        if idx != self._free_idx:
+            self._swap(idx, self._free_idx)
+
+    def give_many(self, items: Iterable[int]) -> None:
+        index = self._index
+        for item in items:
+            idx = index[item]
+            if idx >= self._free_idx:
+                raise ValueError('trying to return an item which was already returned')
+
+            self._free_idx -= 1
+            if idx != self._free_idx:
+                self._swap(idx, self._free_idx)
+
+    def sort(self, *, key: Callable[[S], Any], reverse: bool = False) -> None:
+        """
+        Sort the given slots by a key on their sprites. The free slots are left alone.
+        """
+        count = self._free_idx
+        sprites = self._sprites
+        order = sorted(self._source[:count], key=lambda slot: key(sprites[slot]), reverse=reverse)
+
+        self._source[:count] = array(self._source.typecode, order)
+        for idx, slot in enumerate(order):
+            self._index[slot] = idx
+        self._sprite_list.sprite_list[:count] = [sprites[slot] for slot in order]
+        self._dirty.update(range(count))
+
+    def sync(self) -> None:
+        """
+        Write every changed run of the index data to the index buffer.
+        """
+        if not self._dirty:
+            return
+
+        buffer = self.buffer
+        positions = sorted(self._dirty)
+        self._dirty.clear()
+        if buffer is None:
+            return
+
+        data = memoryview(self._source)
+        start = end = positions[0]
+        for position in positions[1:]:
+            if position != end + 1:
+                self._write(buffer, data, start, end)
+                start = position
+            end = position
+        self._write(buffer, data, start, end)
+
+    def _write(self, buffer: IndexBuffer, data: memoryview, start: int, end: int) -> None:
+        chunk = data[start:end + 1]
+        buffer.write(chunk, offset=start * data.itemsize)
+        self.uploads += 1
+        self.uploaded_bytes += chunk.nbytes
+
+    def draw(self, ranges: Sequence[tuple[int, int]] | None = None, **kwargs: Any) -> None:
+        """
+        Draw the given sprites. Takes the same arguments as `SpriteList.draw`.
+
+        Args:
+            ranges: Only draw these (first, count) ranges of the given positions, all of them if None.
+        """
+        if not self._free_idx or (ranges is not None and not ranges):
+            return
+
+        self.sync()
+
+        sprite_list = self._sprite_list
+        sprite_list.initialize()
+        slots = sprite_list._sprite_index_slots  # noqa: SLF001
+        sprite_list._sprite_index_slots = self._free_idx  # noqa: SLF001
+        if ranges is None:
+            sprite_list.draw(**kwargs)
+        else:
+            geometry = sprite_list._geometry  # noqa: SLF001
+            sprite_list._geometry = _RangedGeometry(geometry, ranges)  # noqa: SLF001
+            try:
+                sprite_list.draw(**kwargs)
+            finally:
+                sprite_list._geometry = geometry  # noqa: SLF001
+        sprite_list._sprite_index_slots = slots  # noqa: SLF001
+
+
+class _RangedGeometry:
+    """
+    Stands in for a SpriteList's geometry so one `SpriteList.draw` renders several ranges
+    of the index buffer, rather than setting up the draw state once per range.
+    """
 
-        self._source.sprite_list.append(self._source.sprite_list.pop(idx))
-        self._source._sprite_index_data.append(self._source._sprite_index_data.pop(idx))  # noqa: SLF001
-        self._source._sprite_index_changed = True  # noqa: SLF001
+    def __init__(self, geometry: Any, ranges: Sequence[tuple[int, int]]):
+        self.geometry = geometry
+        self.ranges = ranges
 
-    # TODO: Add args
-    def draw(self) -> None:
-        slots = self._source._sprite_index_slots  # noqa: SLF001
-        self._source._sprite_index_slots = self._free_idx  # noqa: SLF001
-        self._source.draw()
-        self._source._sprite_index_slots = slots  # noqa: SLF001
+    def render(self, program: Any, *, mode: int, vertices: int) -> None:
+        for first, count in self.ranges:
+            self.geometry.render(program, mode=mode, first=first, vertices=count)
+
+
+class StableSpritePool[S: BasicSprite](SpritePool[S]):
+    """
+    A SpritePool where the given slots keep the order they were given in.
+
+    Returned slots are removed by shifting the slots after them down rather than swapping
+    in the last slot. So slots which were given together stay together, and can be drawn as
+    a range of positions.
+    """
+
+    def _place(self, first: int, order: list[int]) -> None:
+        """
+        Put the slots in `order` at the positions from `first` onwards.
+        """
+        end = first + len(order)
+        sprites = self._sprites
+        index = self._index
+
+        self._source[first:end] = array(self._source.typecode, order)
+        for idx, slot in enumerate(order, first):
+            index[slot] = idx
+        self._sprite_list.sprite_list[first:end] = [sprites[slot] for slot in order]
+        self._dirty.update(range(first, end))
+
+    def give(self, item: int) -> None:
+        self.give_many((item,))
+
+    def give_many(self, items: Iterable[int]) -> None:
+        index = self._index
+        count = self._free_idx
+
+        positions = sorted(index[item] for item in items)
+        if not positions:
+            return
+        if positions[-1] >= count:
+            raise ValueError('trying to return an item which was already returned')
+
+        first = positions[0]
+        keep = bytearray(b'\x01') * (count - first)
+        for position in positions:
+            if not keep[position - first]:
+                raise ValueError('trying to return an item which was already returned')
+            keep[position - first] = 0
+
+        # The kept slots shift down in order and the returned ones go after them
+        region = self._source[first:count]
+        self._place(first, list(compress(region, keep)) + [region[position - first] for position in positions])
+        self._free_idx = count - len(positions)
+
+
+class SortedSpritePool[S: BasicSprite](StableSpritePool[S]):
+    """
+    A SpritePool which keeps the given slots sorted by a key, for sprites which have to
+    be drawn back to front.
+
+    Every slot is given out with its key (cached in `keys`), so nothing is read off the sprites.
+    There is no keyless `get` or `get_many`, they raise a TypeError pointing at `get_sorted`.
+    New slots are merged into the sorted slots, which only moves the slots after the first
+    new key, and returned slots are removed in order (see StableSpritePool). Neither needs
+    a full sort.
+
+    Ties keep the order the slots were given in, so getting slots in batches gives the
+    same order as getting them all at once and then sorting.
+    """
+    def __init__(self, items: list[S], buffer: IndexBuffer | None = None):
+        SpritePool.__init__(self, items, buffer)
+        self._keys: array[float] = array('d', bytes(8 * self._size))
+
+    @property
+    def keys(self) -> array[float]:
+        # The key of every slot (by slot, not by position)
+        return self._keys
+
+    def get(self) -> int:
+        # A slot given without a key would have no place in the order
+        raise TypeError('A SortedSpritePool needs the key of every slot it gives, use get_sorted(keys)')
+
+    def get_many(self, count: int) -> list[int]:
+        raise TypeError('A SortedSpritePool needs the key of every slot it gives, use get_sorted(keys)')
+
+    def get_sorted(self, keys: Sequence[float]) -> list[int]:
+        """
+        Get a slot for every key and merge them into the sorted slots.
+
+        Returns:
+            The slots in the same order as the keys.
+        """
+        count = len(keys)
+        start = self._free_idx
+        slots = IndexedPool.get_many(self, count)
+        if not count:
+            return slots
+
+        slot_keys = self._keys
+        for slot, key in zip(slots, keys):
+            slot_keys[slot] = key
+
+        # Everything before the smallest new key is already in place
+        source = self._source
+        get_key = slot_keys.__getitem__
+        first = bisect_right(source, min(keys), 0, start, key=get_key)
+        end = start + count
+
+        # The slice is two sorted runs which timsort merges in one pass
+        self._place(first, sorted(source[first:end], key=get_key))
+        return slots
+
+    def sort(self, *, key: Callable[[S], Any] | None = None) -> None:
+        """
+        Sort the given slots by their cached keys, or re-key them from their sprites if a key is given.
+        """
+        if key is not None:
+            sprites = self._sprites
+            for slot in self._source[:self._free_idx]:
+                self._keys[slot] = key(sprites[slot])
+        self._place(0, sorted(self._source[:self._free_idx], key=self._keys.__getitem__))
@@ -0,0 +1,189 @@
+from __future__ import annotations
+from collections.abc import Iterable
+from math import floor
+
+from arcade.types import Box, Point3
+
+__all__ = (
+    'SpatialHash',
+)
+
+
+class SpatialHash[T]:
+    """
+    A uniform grid over the x/y plane which maps every cell to the boxes that overlap it.
+
+    A point query only has to test the boxes in the one cell the point falls in, and a box
+    query only the cells it covers, rather than every box. The z axis is not hashed since
+    boxes (rooms) are spread out over the plane, but it is still tested.
+
+    Items are kept in the order they were inserted, and every query returns hits in that order,
+    so `first` gives the same answer as a linear scan over the items would.
+
+    The cell size should be around the size of the average box. Much smaller and big boxes
+    end up in many cells, much larger and each cell holds many boxes.
+    """
+
+    def __init__(self, cell_size: float = 32.0):
+        if cell_size <= 0.0:
+            raise ValueError(f'The cell size must be positive, not {cell_size}')
+        self._cell_size: float = cell_size
+        self._inv_size: float = 1.0 / cell_size
+
+        self._next_id: int = 0
+        self._ids: dict[T, int] = {}
+        # id -> (item, left, right, bottom, top, near, far)
+        self._entries: dict[int, tuple[T, float, float, float, float, float, float]] = {}
+        # Ids within a cell are always ascending as they are only ever appended
+        self._cells: dict[tuple[int, int], list[int]] = {}
+
+    @classmethod
+    def from_boxes(cls, items: Iterable[tuple[T, Box]], cell_size: float | None = None) -> SpatialHash[T]:
+        """
+        Build a hash from (item, box) pairs. If no cell size is given it is the
+        average of the boxes' widths and heights.
+        """
+        items = tuple(items)
+        if cell_size is None:
+            extent = sum(box.width + box.height for _, box in items)
+            cell_size = (extent / (2 * len(items))) if extent > 0.0 else 32.0
+        spatial = cls(cell_size)
+        for item, box in items:
+            spatial.insert(item, box)
+        return spatial
+
+    @property
+    def cell_size(self) -> float:
+        return self._cell_size
+
+    @property
+    def cell_count(self) -> int:
+        return len(self._cells)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._ids
+
+    def _cell_range(self, left: float, right: float, bottom: float, top: float) -> tuple[range, range]:
+        inv = self._inv_size
+        return range(floor(left * inv), floor(right * inv) + 1), range(floor(bottom * inv), floor(top * inv) + 1)
+
+    def insert(self, item: T, box: Box) -> None:
+        if item in self._ids:
+            self.remove(item)
+
+        idx = self._next_id
+        self._next_id += 1
+        self._ids[item] = idx
+        self._entries[idx] = (item, box.left, box.right, box.bottom, box.top, box.near, box.far)
+
+        cells = self._cells
+        columns, rows = self._cell_range(box.left, box.right, box.bottom, box.top)
+        for cx in columns:
+            for cy in rows:
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[cx, cy] = [idx]
+                else:
+                    cell.append(idx)
+
+    def remove(self, item: T) -> None:
+        idx = self._ids.pop(item)
+        _, left, right, bottom, top, _, _ = self._entries.pop(idx)
+
+        cells = self._cells
+        columns, rows = self._cell_range(left, right, bottom, top)
+        for cx in columns:
+            for cy in rows:
+                cell = cells[cx, cy]
+                cell.remove(idx)
+                if not cell:
+                    del cells[cx, cy]
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._entries.clear()
+        self._cells.clear()
+
+    def first(self, point: Point3) -> T | None:
+        """
+        The first inserted item whose box contains (or touches) the point.
+        """
+        x, y, z = point
+        inv = self._inv_size
+        cell = self._cells.get((floor(x * inv), floor(y * inv)))
+        if cell is None:
+            return None
+
+        entries = self._entries
+        for idx in cell:
+            item, left, right, bottom, top, near, far = entries[idx]
+            if left <= x <= right and bottom <= y <= top and near <= z <= far:
+                return item
+        return None
+
+    def first_many(self, points: Iterable[Point3]) -> list[T | None]:
+        """
+        `first` for every point, with the lookups pulled out of the loop.
+        """
+        inv = self._inv_size
+        get_cell = self._cells.get
+        entries = self._entries
+
+        found = []
+        add = found.append
+        for x, y, z in points:
+            hit = None
+            for idx in get_cell((floor(x * inv), floor(y * inv)), ()):
+                item, left, right, bottom, top, near, far = entries[idx]
+                if left <= x <= right and bottom <= y <= top and near <= z <= far:
+                    hit = item
+                    break
+            add(hit)
+        return found
+
+    def query_point(self, point: Point3) -> list[T]:
+        """
+        Every item whose box contains (or touches) the point, in insertion order.
+        """
+        x, y, z = point
+        inv = self._inv_size
+        entries = self._entries
+
+        hits = []
+        for idx in self._cells.get((floor(x * inv), floor(y * inv)), ()):
+            item, left, right, bottom, top, near, far = entries[idx]
+            if left <= x <= right and bottom <= y <= top and near <= z <= far:
+                hits.append(item)
+        return hits
+
+    def query_box(self, box: Box) -> list[T]:
+        """
+        Every item whose box overlaps (or touches) the given box, in insertion order.
+        """
+        l, r, b, t, n, f = box.left, box.right, box.bottom, box.top, box.near, box.far
+        cells = self._cells
+
+        candidates = set()
+        columns, rows = self._cell_range(l, r, b, t)
+        if len(columns) * len(rows) > len(cells):
+            # The box covers more cells than there are filled ones so check those instead
+            for (cx, cy), cell in cells.items():
+                if cx in columns and cy in rows:
+                    candidates.update(cell)
+        else:
+            for cx in columns:
+                for cy in rows:
+                    cell = cells.get((cx, cy))
+                    if cell is not None:
+                        candidates.update(cell)
+
+        entries = self._entries
+        hits = []
+        for idx in sorted(candidates):
+            item, left, right, bottom, top, near, far = entries[idx]
+            if left <= r and l <= right and bottom <= t and b <= top and near <= f and n <= far:
+                hits.append(item)
+        return hits
@@ -1,10 +1,10 @@
 from .core.application import Window
 from .core.context import context, Persistent, Active
-from .core.world import World
+from .core.world import compile_world
 
 from .views.root import RootView
 
-from resources import load_level
+from resources import load_level, dump_level_cache, hash_level, dump_atlas
 
 def main() -> None:
     win = Window()
@@ -13,10 +13,17 @@ def main() -> None:
     context.persistent = Persistent()
     context.active = Active()
 
-    context.active.world_data = load_level(context.WORLD_NAME)
-    context.active.world = World(win.ctx)
-
-    context.active.world.load_world() # TODO: move to when the game starts. Pick save (or create new) etc
-
+    # The assets and the world are loaded by the root view while the splashes play
     win.show_view(RootView())
     win.run()
+
+
+def compile_levels() -> None:
+    # Offline step which bakes the expanded world tiles into a binary cache next to the .ldtk
+    data = load_level(context.WORLD_NAME)
+    dump_level_cache(context.WORLD_NAME, compile_world(data, hash_level(context.WORLD_NAME)))
+
+
+def pack_textures() -> None:
+    # Offline step which packs every png into one atlas image and index under resources/images/packed
+    dump_atlas()
@@ -7,9 +7,9 @@ class GameView(View):
 
     def __init__(self):
         super().__init__()
-        context.active.world.load_room('Entrance')
-        context.active.world.load_room('Level_1')
-        context.active.world.load_room('Level_2')
+        # The first rooms load behind the loading screen, the rest are streamed in as the camera moves
+        context.active.world.enter_room('Entrance')
+        context.active.world.streamer.flush()
 
         self.camera = Camera2D(position=(0.0, 0.0))
         self.camera.projection_near = -1000.0
@@ -19,10 +19,18 @@ class GameView(View):
         pos = self.camera.position
         self.camera.position = pos[0] - dx, pos[1] - dy
 
+    @property
+    def view(self) -> tuple[float, float, float, float]:
+        # The part of the world the camera can see, in screen space (the projection is already zoomed)
+        x, y = self.camera.position
+        projection = self.camera.projection
+        return x + projection.left, x + projection.right, y + projection.bottom, y + projection.top
+
     def on_draw(self):
         self.clear()
         with self.camera.activate():
-            context.active.world.draw()
+            context.active.world.draw(self.view)
 
     def on_update(self, delta_time):
+        context.active.world.streamer.track(self.camera.position, delta_time)
         context.active.world.update()
\ No newline at end of file
@@ -1,18 +1,22 @@
+from typing import Callable
+
 from critter.core.application import View
 from critter.core.context import context
 
 from critter.lib.loading import Task
 
-from arcade import Texture, SpriteSheet, BasicSprite, draw_sprite
+from arcade import Texture, SpriteSheet, BasicSprite, draw_sprite, draw_lrbt_rectangle_filled, key
 from resources import load_png_sheet
 
 class LoadView(View):
     throbber_sheet: SpriteSheet = None
     throbber_frames: tuple[Texture, ...] = ()
 
-    def __init__(self, task: Task) -> None:
+    def __init__(self, task: Task, back: Callable[[], None] | None = None) -> None:
         super().__init__()
         self.task = task
+        # Where escape goes, the task is cancelled first. Escape does nothing if None
+        self.back = back
 
         if LoadView.throbber_sheet is None:
             s = context.THROBBER_SIZE
@@ -25,6 +29,14 @@ class LoadView(View):
     def on_show_view(self):
         self.task.begin()
 
+    def on_update(self, delta_time: float) -> None:
+        self.task.update()
+
+    def on_key_press(self, symbol: int, modifiers: int) -> None:
+        if symbol == key.ESCAPE and self.back is not None:
+            self.task.cancel()
+            self.back()
+
     def on_draw(self) -> None:
         self.clear()
 
@@ -38,6 +50,13 @@ class LoadView(View):
         self.sprite.alpha = int(255 * a)
 
         draw_sprite(self.sprite)
+
+        fraction = self.task.fraction
+        if fraction is not None:
+            w, h = context.PROGRESS_WIDTH / 2.0, context.PROGRESS_HEIGHT
+            bottom = self.center_y - context.THROBBER_SIZE
+            left = self.center_x - w
+            draw_lrbt_rectangle_filled(left, left + 2.0 * w * min(fraction, 1.0), bottom - h, bottom, (255, 255, 255, int(255 * a)))
         
         if self.task.complete:
             self.task.finish()
\ No newline at end of file
@@ -4,7 +4,7 @@ from .load import LoadView
 from .menu import MenuView
 
 from critter.lib.splash import Splash, Action
-from critter.lib.loading import SleepTask
+from critter.core.resources import preload_assets
 from resources import load_png
 
 from arcade import BasicSprite, draw_sprite, clock, get_default_texture
@@ -39,12 +39,16 @@ class RootView(View):
 
         self.splash_sprite = BasicSprite(get_default_texture(), 1.0, self.center_x, self.center_y, visible=False)
 
-        self.load_context = SleepTask(self.show_menu, 0.5)
+        # Everything is loaded while the splashes play
+        self.load_context = preload_assets(self.show_menu)
         self.load_context.begin()
 
     def on_key_release(self, _symbol, _modifiers):
         self.switch_view()
 
+    def on_update(self, delta_time: float) -> None:
+        self.load_context.update()
+
     def on_draw(self) -> None:
         self.clear()
         if self.splash is None:
@@ -76,7 +80,8 @@ class RootView(View):
         if self.load_context.complete:
             self.show_menu()
             return
-        self.window.show_view(LoadView(self.load_context))
+        # Backing out of the first load quits the game
+        self.window.show_view(LoadView(self.load_context, self.window.close))
 
     def show_menu(self):
         self.window.show_view(MenuView())
\ No newline at end of file
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from enum import StrEnum
-from typing import NamedTuple, Any
+from typing import NamedTuple, Any, Callable
+from functools import partial
+from pathlib import Path
 import json
 
 @dataclass
@@ -251,6 +253,32 @@ class Layer:
     px_offset_y: int
     visible: bool
 
+class LazyLayers:
+    """
+    A descriptor for `Level.layer_instances` which can hold either the parsed layers or
+    a loader which creates them. The loader is only called the first time the layers
+    are accessed, and the result replaces it so it is never called twice.
+
+    This lets a lazily parsed world keep the raw layer data around (or just the path to
+    an external level file) until a room is actually needed.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, typ=None) -> list[Layer] | None:
+        if obj is None:
+            # Raising here tells dataclass that this field has no default.
+            raise AttributeError(self.name)
+
+        layers = obj.__dict__[self.name]
+        if callable(layers):
+            layers = obj.__dict__[self.name] = layers()
+        return layers
+
+    def __set__(self, obj, value: list[Layer] | Callable[[], list[Layer]] | None):
+        obj.__dict__[self.name] = value
+
 @dataclass
 class Level:
     bg_color: str
@@ -261,7 +289,7 @@ class Level:
     field_instance: list[Field]
     identifier: str
     iid: str
-    layer_instances: list[Layer]
+    layer_instances: list[Layer] = LazyLayers()
     px_height: int
     px_width: int
     uid: int
@@ -269,6 +297,10 @@ class Level:
     world_x: int
     world_y: int
 
+    @property
+    def layers_loaded(self) -> bool:
+        return not callable(self.__dict__['layer_instances'])
+
 
 class WorldLayout(StrEnum):
     FREE = 'Free'
@@ -512,21 +544,42 @@ def _parse_LDtk_layer(data: dict[str, Any]) -> Layer:
         data['visible']
     )
 
-def _parse_LDtk_level(data: dict[str, Any]) -> Level:
+def _parse_LDtk_layers(data: list[dict[str, Any]]) -> list[Layer]:
+    return [_parse_LDtk_layer(layer) for layer in data]
+
+def _load_LDtk_external_layers(path: Path) -> list[Layer] | None:
+    with open(path, 'r') as fp:
+        layer_instances = json.load(fp).get('layerInstances', None)
+    if layer_instances is None:
+        return None
+    return _parse_LDtk_layers(layer_instances)
+
+def _parse_LDtk_level(data: dict[str, Any], root: Path | None = None, lazy: bool = False) -> Level:
     bg_crop = data.get('__bgPos', None)
     if bg_crop is not None:
         bg_crop = bgCropObj(*bg_crop['cropRect'], *bg_crop['scale'], bg_crop['topLeftPx'])
 
+    external_rel_path = data.get('externalRelPath', None)
     layer_instances = data.get('layerInstances', None)
     if layer_instances is not None:
-        layer_instances = [_parse_LDtk_layer(layer) for layer in layer_instances]
+        if lazy:
+            # Only the raw layer list is bound so the rest of the level dict can be freed
+            layer_instances = partial(_parse_LDtk_layers, layer_instances)
+        else:
+            layer_instances = _parse_LDtk_layers(layer_instances)
+    elif external_rel_path is not None and root is not None:
+        external_path = root / external_rel_path
+        if lazy:
+            layer_instances = partial(_load_LDtk_external_layers, external_path)
+        else:
+            layer_instances = _load_LDtk_external_layers(external_path)
 
     return Level(
         data['__bgColor'],
         bg_crop,
         [NeighbourObj(sub['dir'], sub['levelIid']) for sub in data['__neighbours']],
         data.get('bgRelPath', None),
-        data.get('externalRelPath', None),
+        external_rel_path,
         [Field(field['__identifier'], field['__tile'], field['__type'], field['__value'], field['defUid']) for field in data['fieldInstances']],
         data['identifier'],
         data['iid'],
@@ -545,19 +598,32 @@ def _parse_LDtk_toc(data: dict[str, Any]) -> TocObj:
         [InstanceDataObj(sub['fields'], sub['heiPx'], sub['heiPx'], sub['worldX'], sub['worldY'], sub['iids']) for sub in data['instancesData']],
     )
 
-def _parse_LDtk_world(data: dict[str, Any]) -> World:
+def _parse_LDtk_world(data: dict[str, Any], root: Path | None = None, lazy: bool = False) -> World:
     return World(
         data['identifier'],
         data['iid'],
-        [_parse_LDtk_level(level) for level in data['levels']],
+        [_parse_LDtk_level(level, root, lazy) for level in data['levels']],
         data.get('worldGridHeight', None),
         data.get('worldGridWidth', None),
         WorldLayout(data['worldLayout'])
     )
 
-def parse_LDtk_file(path: str) -> LDtkRoot:
+def parse_LDtk_file(path: str, lazy: bool = False) -> LDtkRoot:
+    """
+    Parse an LDtk project file into its dataclass representation.
+
+    Args:
+        path: The path to the .ldtk file. External level files (.ldtkl) are found relative to it.
+        lazy: When True the layers of each level are only parsed the first time
+            `Level.layer_instances` is accessed. For projects saved with external levels
+            the level files aren't even opened until then.
+
+    Returns:
+        The root of the LDtk project.
+    """
     with open(path, 'r') as fp:
         root_data = json.load(fp)
+    root = Path(path).parent
 
     world_layout = root_data.get('worldLayout', None)
     if world_layout is not None:
@@ -569,10 +635,10 @@ def parse_LDtk_file(path: str) -> LDtkRoot:
         root_data['externalLevels'],
         root_data['iid'],
         root_data['jsonVersion'],
-        [_parse_LDtk_level(level) for level in root_data['levels']],
+        [_parse_LDtk_level(level, root, lazy) for level in root_data['levels']],
         [_parse_LDtk_toc(toc) for toc in root_data['toc']],
         root_data.get('worldGridHeight', None),
         root_data.get('worldGridWidth', None),
         world_layout,
-        [_parse_LDtk_world(world) for world in root_data['worlds']]
+        [_parse_LDtk_world(world, root, lazy) for world in root_data['worlds']]
     )
@@ -1,8 +1,14 @@
 from collections.abc import Sequence, Iterable
+from pathlib import Path
+import importlib.resources as pkg
 import json
 
+from PIL import Image
+
 from .filefactory import make_file_opener, make_path_finder, make_string_opener
 from .LDtk import parse_LDtk_file, LDtkRoot
+from .levelcache import CompiledLevel, hash_level_source, read_level_cache, write_level_cache
+from .atlaspack import PackedAtlas, hash_atlas_sources, pack_images, read_atlas_index, write_atlas_index
 from arcade import (
     ArcadeContext,
     Sound,
@@ -13,7 +19,7 @@ from arcade import (
     load_spritesheet as _load_spritesheet,
     load_font as _load_font
 )
-from arcade.hitbox import HitBoxAlgorithm
+from arcade.hitbox import HitBoxAlgorithm, algo_default
 from arcade.gl import Program
 
 import resources.audio as audio
@@ -41,9 +47,34 @@ __all__ = (
     'dump_json',
     'get_level_path',
     'load_level',
-    'LDtkRoot'
+    'LDtkRoot',
+    'get_level_cache_path',
+    'hash_level',
+    'load_level_cache',
+    'dump_level_cache',
+    'CompiledLevel',
+    'get_atlas_index_path',
+    'list_atlas_sources',
+    'hash_atlas',
+    'dump_atlas',
+    'load_atlas',
+    'PackedAtlas',
+    'list_ogg',
+    'register_png',
+    'register_ogg',
+    'register_program'
 )
 
+# The names (without the extension) of every file of one type in a resource directory
+def _list_names(anchor, extension: str) -> list[str]:
+    names = []
+    for entry in sorted(pkg.files(anchor).iterdir(), key=lambda entry: entry.name):
+        name, _, suffix = entry.name.rpartition('.')
+        if suffix == extension:
+            names.append(name)
+    return names
+
+
 # Shader methods
 read_shader = make_string_opener(shaders, 'glsl')
 get_shader_path = make_path_finder(shaders, 'glsl')
@@ -64,10 +95,17 @@ def load_program(
     ) -> Program:
     """
     Load a glsl shader program by providing the names for the required shaders.
+    If a program with the same shaders was compiled ahead of time and registered it is
+    shared instead, as long as nothing else (defines, common files, etc) was asked for.
 
     Returns:
         an Arcade gl Program for use with gl Geometry.
     """
+    if not (sub_directories or common or defines or varyings or tess_control_shader or tess_evaluation_shader):
+        program = _programs.get((vertex_shader, fragment_shader, geometry_shader))
+        if program is not None and program.ctx is ctx:
+            return program
+
     vertex = get_shader_path(vertex_shader, sub_directories)
     fragment = None if fragment_shader is None else get_shader_path(fragment_shader, sub_directories)
     geometry = None if geometry_shader is None else get_shader_path(geometry_shader, sub_directories)
@@ -87,19 +125,38 @@ def load_program(
     )
 
 
+_programs: dict[tuple[str, str | None, str | None], Program] = {}
+def register_program(program: Program, vertex_shader: str, fragment_shader: str | None = None, geometry_shader: str | None = None) -> None:
+    _programs[vertex_shader, fragment_shader, geometry_shader] = program
+
+
 # Texture methods
 get_png_path = make_path_finder(images, 'png')
 def load_png(name: str, sub_directories: tuple[str, ...] = (), *, hit_box_algorithm: HitBoxAlgorithm | None = None, hash: str | None = None) -> Texture:
+    # Sprites cut out of the preloaded atlas are already in memory
+    if not sub_directories and hit_box_algorithm is None and hash is None and name in _preloaded:
+        return _preloaded[name]
     return _load_texture(get_png_path(name, sub_directories), hit_box_algorithm=hit_box_algorithm, hash=hash)
 
+_preloaded: dict[str, Texture] = {}
+def register_png(name: str, texture: Texture) -> None: _preloaded[name] = texture
+
 def load_png_sheet(name: str, sub_durectories: tuple[str, ...] = ()) -> SpriteSheet: return _load_spritesheet(get_png_path(name, sub_durectories))
 
 
 # Sound Methods
 get_wav_path = make_path_finder(audio, 'wav')
 get_ogg_path = make_path_finder(audio, 'ogg')
+def list_ogg() -> list[str]: return _list_names(audio, 'ogg')
 def load_wav(name: str, streaming: bool = False, sub_directories: tuple[str, ...] = ()) -> Sound: return _load_sound(get_wav_path(name, sub_directories), streaming)
-def load_ogg(name: str, streaming: bool = False, sub_directories: tuple[str, ...] = ()) -> Sound: return _load_sound(get_ogg_path(name, sub_directories), streaming)
+def load_ogg(name: str, streaming: bool = False, sub_directories: tuple[str, ...] = ()) -> Sound:
+    # Sounds decoded ahead of time are shared, streamed sounds can't be
+    if not (streaming or sub_directories) and name in _sounds:
+        return _sounds[name]
+    return _load_sound(get_ogg_path(name, sub_directories), streaming)
+
+_sounds: dict[str, Sound] = {}
+def register_ogg(name: str, sound: Sound) -> None: _sounds[name] = sound
 
 # Font Methods
 get_font_path = make_path_finder(fonts, 'ttf')
@@ -115,4 +172,69 @@ def dump_json(name: str, data: dict, sub_directoreis: tuple[str, ...] = ()) -> N
 
 # Level Methods
 get_level_path = make_path_finder(levels, 'ldtk')
-def load_level(name: str, sub_directoies: tuple[str, ...] = ()) -> LDtkRoot: return parse_LDtk_file(get_level_path(name, sub_directoies))
\ No newline at end of file
+def load_level(name: str, sub_directoies: tuple[str, ...] = (), lazy: bool = False) -> LDtkRoot: return parse_LDtk_file(get_level_path(name, sub_directoies), lazy)
+
+# Compiled Level Methods
+get_level_cache_path = make_path_finder(levels, 'cldtk')
+def hash_level(name: str, sub_directories: tuple[str, ...] = ()) -> bytes: return hash_level_source(get_level_path(name, sub_directories))
+def load_level_cache(name: str, sub_directories: tuple[str, ...] = ()) -> CompiledLevel | None: return read_level_cache(get_level_cache_path(name, sub_directories), hash_level(name, sub_directories))
+def dump_level_cache(name: str, level: CompiledLevel, sub_directories: tuple[str, ...] = ()) -> None: write_level_cache(get_level_cache_path(name, sub_directories), level)
+
+
+# Atlas Methods
+ATLAS_NAME = 'sprites'
+ATLAS_DIRECTORY = ('packed',)
+get_atlas_index_path = make_path_finder(images, 'catl')
+
+def list_atlas_sources() -> dict[str, Path]:
+    # Every png in the images directory except the sprite sheets, which arcade cuts up itself
+    sources = {}
+    for entry in sorted(pkg.files(images).iterdir(), key=lambda entry: entry.name):
+        name, _, extension = entry.name.rpartition('.')
+        if extension == 'png' and not name.endswith('_sheet'):
+            with pkg.as_file(entry) as path:
+                sources[name] = path
+    return sources
+
+def hash_atlas() -> bytes: return hash_atlas_sources(list_atlas_sources().values())
+
+def dump_atlas(name: str = ATLAS_NAME, sub_directories: tuple[str, ...] = ATLAS_DIRECTORY, max_width: int = 1024) -> PackedAtlas:
+    """
+    Pack every source png into one atlas image and write it out with its index.
+    """
+    sources = list_atlas_sources()
+    loaded = {}
+    for source, path in sources.items():
+        with Image.open(path) as image:
+            loaded[source] = image.convert('RGBA')
+    hit_boxes = {source: algo_default.calculate(image) for source, image in loaded.items()}
+
+    image, atlas = pack_images(loaded, hash_atlas_sources(sources.values()), max_width, hit_boxes)
+    path = get_png_path(name, sub_directories)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    image.save(path)
+    write_atlas_index(get_atlas_index_path(name, sub_directories), atlas)
+    return atlas
+
+def load_atlas(name: str = ATLAS_NAME, sub_directories: tuple[str, ...] = ATLAS_DIRECTORY) -> dict[str, Texture] | None:
+    """
+    Cut every sprite out of a packed atlas.
+
+    Returns:
+        The texture for every source png by name, or None if the atlas is missing or stale.
+    """
+    atlas = read_atlas_index(get_atlas_index_path(name, sub_directories), hash_atlas())
+    if atlas is None:
+        return None
+
+    try:
+        with Image.open(get_png_path(name, sub_directories)) as image:
+            image.load()
+    except FileNotFoundError:
+        return None
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    if atlas.regions and image.size != (atlas.width, atlas.height):
+        return None
+
+    return {region.name: Texture(image.crop(region.box), hit_box_points=region.hit_box or None) for region in atlas.regions}
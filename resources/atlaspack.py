@@ -0,0 +1,185 @@
+"""
+Packing every sprite into one atlas image ahead of time.
+
+Each png is otherwise opened, decoded, and hit boxed the first time it is touched, which
+is usually in the middle of loading the first room. Packing them offline means startup
+decodes one image and cuts every sprite out of it in memory instead. The hit boxes are
+worked out offline too, since finding them is slower than decoding the image.
+
+The atlas is written as a png next to a compact index of where every sprite is.
+
+Index layout (little endian):
+    header: magic, version, sha256 of the source pngs, atlas width, atlas height, region count
+    regions: u16 name length, u16 x, u16 y, u16 width, u16 height, u16 hit box point count
+        + utf-8 name + f32 x, y for every hit box point, for each sprite
+"""
+from dataclasses import dataclass
+from collections.abc import Iterable, Sequence
+from array import array
+from pathlib import Path
+from hashlib import sha256
+import struct
+
+from PIL import Image
+
+__all__ = (
+    'AtlasRegion',
+    'PackedAtlas',
+    'hash_atlas_sources',
+    'pack_regions',
+    'pack_images',
+    'write_atlas_index',
+    'read_atlas_index',
+    'ATLAS_VERSION'
+)
+
+ATLAS_VERSION = 1
+_MAGIC = b'CATL'
+_HEADER = struct.Struct('<4sH32sHHH')
+_REGION = struct.Struct('<HHHHHH')
+_MAX_SIZE = 0xFFFF
+
+
+@dataclass
+class AtlasRegion:
+    name: str
+    x: int
+    y: int
+    width: int
+    height: int
+    # The points relative to the center of the sprite, or empty to let arcade work them out
+    hit_box: tuple[tuple[float, float], ...] = ()
+
+    @property
+    def box(self) -> tuple[int, int, int, int]:
+        # left, upper, right, lower as PIL crops
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+
+@dataclass
+class PackedAtlas:
+    source_hash: bytes
+    width: int
+    height: int
+    regions: tuple[AtlasRegion, ...]
+
+
+def hash_atlas_sources(paths: Iterable[Path]) -> bytes:
+    """
+    One hash of every source png's name and contents, so the atlas is stale if any
+    image is added, removed, renamed, or edited.
+    """
+    digest = sha256()
+    for path in sorted(paths, key=lambda path: path.name):
+        digest.update(path.name.encode('utf-8'))
+        with open(path, 'rb') as fp:
+            digest.update(sha256(fp.read()).digest())
+    return digest.digest()
+
+
+def pack_regions(sizes: dict[str, tuple[int, int]], max_width: int = 1024) -> tuple[int, int, list[AtlasRegion]]:
+    """
+    Shelf pack rectangles. The tallest go first and fill rows left to right, starting a new
+    row once the current one is full. The sprites are mostly the same size so this wastes
+    little space, and it is stable so the same images always pack the same way.
+
+    Returns:
+        The width and height of the atlas and where every rectangle went, in name order.
+    """
+    width = max((w for w, _ in sizes.values()), default=0)
+    if width > max_width:
+        raise ValueError(f'An image {width} pixels wide cannot fit in an atlas {max_width} pixels wide')
+
+    regions = []
+    x = y = shelf = 0
+    used = 0
+    for name in sorted(sizes, key=lambda name: (-sizes[name][1], -sizes[name][0], name)):
+        w, h = sizes[name]
+        if x + w > max_width:
+            x, y, shelf = 0, y + shelf, 0
+        regions.append(AtlasRegion(name, x, y, w, h))
+        x += w
+        shelf = max(shelf, h)
+        used = max(used, x)
+
+    height = y + shelf
+    if used > _MAX_SIZE or height > _MAX_SIZE:
+        raise ValueError(f'The atlas is too large to index ({used}x{height})')
+
+    regions.sort(key=lambda region: region.name)
+    return used, height, regions
+
+
+def pack_images(
+        images: dict[str, Image.Image],
+        source_hash: bytes,
+        max_width: int = 1024,
+        hit_boxes: dict[str, Sequence[tuple[float, float]]] | None = None
+    ) -> tuple[Image.Image, PackedAtlas]:
+    """
+    Pack images into one RGBA image.
+
+    Args:
+        images: The images to pack by name.
+        source_hash: The hash of the files the images were loaded from.
+        max_width: The widest the atlas can be.
+        hit_boxes: The hit box points of the images to store with them, if any.
+
+    Returns:
+        The atlas image and the index to cut it back up with.
+    """
+    width, height, regions = pack_regions({name: image.size for name, image in images.items()}, max_width)
+    atlas = Image.new('RGBA', (max(width, 1), max(height, 1)))
+    hit_boxes = hit_boxes or {}
+    for region in regions:
+        region.hit_box = tuple(tuple(point) for point in hit_boxes.get(region.name, ()))
+        image = images[region.name]
+        atlas.paste(image if image.mode == 'RGBA' else image.convert('RGBA'), (region.x, region.y))
+    return atlas, PackedAtlas(source_hash, width, height, tuple(regions))
+
+
+def write_atlas_index(path: Path, atlas: PackedAtlas) -> None:
+    with open(path, 'wb') as fp:
+        fp.write(_HEADER.pack(_MAGIC, ATLAS_VERSION, atlas.source_hash, atlas.width, atlas.height, len(atlas.regions)))
+        for region in atlas.regions:
+            name = region.name.encode('utf-8')
+            fp.write(_REGION.pack(len(name), region.x, region.y, region.width, region.height, len(region.hit_box)))
+            fp.write(name)
+            fp.write(array('f', [value for point in region.hit_box for value in point]).tobytes())
+
+
+def read_atlas_index(path: Path, source_hash: bytes) -> PackedAtlas | None:
+    """
+    Read an atlas index.
+
+    Args:
+        path: The path to the index file.
+        source_hash: The hash of the pngs the atlas should have been packed from.
+
+    Returns:
+        The index, or None if it is missing, from another version, or stale.
+    """
+    try:
+        with open(path, 'rb') as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        return None
+
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, file_hash, width, height, count = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or version != ATLAS_VERSION or file_hash != source_hash:
+        return None
+
+    offset = _HEADER.size
+    regions = []
+    for _ in range(count):
+        length, x, y, w, h, points = _REGION.unpack_from(data, offset)
+        offset += _REGION.size
+        name = str(data[offset:offset + length], 'utf-8')
+        offset += length
+        values = array('f', data[offset:offset + 8 * points])
+        offset += 8 * points
+        regions.append(AtlasRegion(name, x, y, w, h, tuple(zip(values[0::2], values[1::2]))))
+
+    return PackedAtlas(file_hash, width, height, tuple(regions))
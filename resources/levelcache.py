@@ -0,0 +1,160 @@
+"""
+A compact binary cache of a compiled LDtk world.
+
+Expanding an LDtk level into its final tiles (columns, water falls, etc) is the same
+work every launch, so it can be done once offline and written out as packed arrays.
+The cache is memory mapped when read so startup only pays for the rooms it touches.
+
+Layout (little endian, every data block is 4 byte aligned):
+    header: magic, version, sha256 of the source .ldtk, texture count, room count
+    texture names: u16 length + utf-8 bytes for each texture
+    room table: u16 name length, u32 tile count, u32 data offset + utf-8 name for each room
+    room data: x f32[n], y f32[n], z f32[n], texture u16[n], transparent u8[n]
+"""
+from dataclasses import dataclass
+from collections.abc import Sequence
+from array import array
+from pathlib import Path
+from hashlib import sha256
+import struct
+import mmap
+import sys
+
+__all__ = (
+    'CompiledRoom',
+    'CompiledLevel',
+    'hash_level_source',
+    'write_level_cache',
+    'read_level_cache',
+    'CACHE_VERSION'
+)
+
+CACHE_VERSION = 1
+_MAGIC = b'CLDC'
+_HEADER = struct.Struct('<4sH32sHH')
+_STRING = struct.Struct('<H')
+_ROOM = struct.Struct('<HII')
+
+
+@dataclass
+class CompiledRoom:
+    name: str
+    x: Sequence[float]
+    y: Sequence[float]
+    z: Sequence[float]
+    texture: Sequence[int]
+    transparent: Sequence[int]
+
+    @property
+    def size(self) -> int:
+        return len(self.texture)
+
+
+@dataclass
+class CompiledLevel:
+    source_hash: bytes
+    textures: tuple[str, ...]
+    rooms: tuple[CompiledRoom, ...]
+
+
+def hash_level_source(path: Path) -> bytes:
+    with open(path, 'rb') as fp:
+        return sha256(fp.read()).digest()
+
+
+def _align(offset: int) -> int:
+    return (offset + 3) & ~3
+
+
+def _room_data_size(size: int) -> int:
+    return _align(size * 15)
+
+
+def write_level_cache(path: Path, level: CompiledLevel) -> None:
+    if sys.byteorder != 'little':
+        raise ValueError('The level cache can only be written on little endian machines')
+
+    names = [name.encode('utf-8') for name in level.textures]
+    rooms = [room.name.encode('utf-8') for room in level.rooms]
+
+    table_size = _HEADER.size + sum(_STRING.size + len(name) for name in names) + sum(_ROOM.size + len(room) for room in rooms)
+    offset = _align(table_size)
+
+    with open(path, 'wb') as fp:
+        fp.write(_HEADER.pack(_MAGIC, CACHE_VERSION, level.source_hash, len(names), len(rooms)))
+        for name in names:
+            fp.write(_STRING.pack(len(name)))
+            fp.write(name)
+
+        for name, room in zip(rooms, level.rooms):
+            fp.write(_ROOM.pack(len(name), room.size, offset))
+            fp.write(name)
+            offset += _room_data_size(room.size)
+
+        fp.write(bytes(_align(table_size) - table_size))
+        for room in level.rooms:
+            fp.write(array('f', room.x).tobytes())
+            fp.write(array('f', room.y).tobytes())
+            fp.write(array('f', room.z).tobytes())
+            fp.write(array('H', room.texture).tobytes())
+            fp.write(array('B', room.transparent).tobytes())
+            fp.write(bytes(_room_data_size(room.size) - room.size * 15))
+
+
+def read_level_cache(path: Path, source_hash: bytes) -> CompiledLevel | None:
+    """
+    Memory map a compiled level cache.
+
+    Args:
+        path: The path to the cache file.
+        source_hash: The hash of the .ldtk file the cache should have been compiled from.
+
+    Returns:
+        The compiled level, or None if the cache is missing, from another version, or stale.
+        The room arrays are views into the mapped file rather than copies.
+    """
+    if sys.byteorder != 'little':
+        return None
+
+    try:
+        with open(path, 'rb') as fp:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        # mmap raises a ValueError for empty files
+        return None
+
+    if len(data) < _HEADER.size:
+        data.close()
+        return None
+    magic, version, file_hash, texture_count, room_count = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or version != CACHE_VERSION or file_hash != source_hash:
+        data.close()
+        return None
+
+    view = memoryview(data)
+    offset = _HEADER.size
+
+    textures = []
+    for _ in range(texture_count):
+        length, = _STRING.unpack_from(data, offset)
+        offset += _STRING.size
+        textures.append(str(view[offset:offset + length], 'utf-8'))
+        offset += length
+
+    rooms = []
+    for _ in range(room_count):
+        length, size, start = _ROOM.unpack_from(data, offset)
+        offset += _ROOM.size
+        name = str(view[offset:offset + length], 'utf-8')
+        offset += length
+
+        rooms.append(CompiledRoom(
+            name,
+            view[start:start + 4 * size].cast('f'),
+            view[start + 4 * size:start + 8 * size].cast('f'),
+            view[start + 8 * size:start + 12 * size].cast('f'),
+            view[start + 12 * size:start + 14 * size].cast('H'),
+            view[start + 14 * size:start + 15 * size]
+        ))
+
+    return CompiledLevel(file_hash, tuple(textures), tuple(rooms))
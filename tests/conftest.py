@@ -0,0 +1,4 @@
+import os
+
+# Nothing here opens a window, but importing arcade needs either a display or headless mode
+os.environ.setdefault('ARCADE_HEADLESS', '1')
@@ -0,0 +1,38 @@
+import random
+from collections.abc import Callable
+
+import pytest
+
+from resources import load_level
+from resources.LDtk import Level
+from resources.levelcache import CompiledRoom
+from critter.core.world import read_tile_types, expand_level
+from critter.core.testing import SYNTHETIC_TYPES, synthetic_level, expand_level_per_tile
+
+
+def rows(room: CompiledRoom, textures: dict[str, int]) -> list[tuple[str, bool, float, float, float]]:
+    names = list(textures)
+    return [(names[t], bool(o), x, y, z) for x, y, z, t, o in zip(room.x, room.y, room.z, room.texture, room.transparent)]
+
+
+def expanded_rows(expand: Callable[..., CompiledRoom], data: Level, tile_types: dict[int, tuple[str, bool]]) -> list[tuple[str, bool, float, float, float]]:
+    textures = {}
+    return rows(expand(data, tile_types, textures), textures)
+
+
+def test_dungeon_matches_per_tile_expansion():
+    root = load_level('dungeon')
+    tile_types = {}
+    for tileset in root.defs.tilesets:
+        tile_types.update(read_tile_types(tileset))
+
+    expanded = [expanded_rows(expand_level, level, tile_types) for level in root.levels]
+    assert [len(room) for room in expanded] == [836, 1146, 1146]
+    assert expanded == [expanded_rows(expand_level_per_tile, level, tile_types) for level in root.levels]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_synthetic_matches_per_tile_expansion(seed):
+    rnd = random.Random(seed)
+    level = synthetic_level(rnd.randint(1, 40), rnd.randint(1, 40), seed)
+    assert expanded_rows(expand_level, level, SYNTHETIC_TYPES) == expanded_rows(expand_level_per_tile, level, SYNTHETIC_TYPES)
@@ -0,0 +1,177 @@
+import threading
+
+import pytest
+
+from critter.lib.loading import Task, ThreadedTask, TaskGraph
+
+
+class CountdownTask(Task):
+    """
+    Completes after a number of updates and counts how often it is finished.
+    """
+
+    def __init__(self, updates: int, log: list[str] | None = None, name: str = ''):
+        Task.__init__(self)
+        self.updates = updates
+        self.finished = 0
+        self.log = log
+        self.name = name
+
+    def begin(self):
+        if self.log is not None:
+            self.log.append(f'{self.name} begin')
+        if not self.updates:
+            self._compelete = True
+
+    def update(self):
+        self.updates -= 1
+        if self.updates <= 0:
+            self._compelete = True
+
+    def finish(self):
+        self.finished += 1
+        if self.log is not None:
+            self.log.append(f'{self.name} finish')
+
+
+class CancellingTask(CountdownTask):
+    """
+    Cancels a graph from the main thread on its first update, like a back button would.
+    """
+
+    def __init__(self, graph: TaskGraph):
+        CountdownTask.__init__(self, 2)
+        self.graph = graph
+
+    def update(self):
+        self.graph.cancel()
+
+
+def threaded(log: list[str], name: str, jobs: int = 1) -> ThreadedTask:
+    task = ThreadedTask(lambda: log.append(f'{name} finish'))
+    for n in range(jobs):
+        task.add(lambda n=n: log.append(f'{name} job {n}'), lambda _, n=n: log.append(f'{name} upload {n}'))
+    return task
+
+
+def test_tasks_run_after_their_dependencies():
+    log = []
+    graph = TaskGraph()
+    a = graph.add(threaded(log, 'a', 3))
+    b = graph.add(CountdownTask(2, log, 'b'))
+    c = graph.add(threaded(log, 'c'), after=(a, b))
+    graph.add(CountdownTask(0, log, 'd'), after=(c,))
+    assert graph.wait(timeout=5.0)
+
+    # a and b have nothing to wait on so they begin together
+    assert log.index('b begin') < log.index('a finish')
+    assert log.index('a finish') < log.index('c job 0')
+    assert log.index('b finish') < log.index('c job 0')
+    assert log.index('c finish') < log.index('d begin') < log.index('d finish')
+
+
+def test_finish_runs_once_per_task_and_once_for_the_graph():
+    finished = []
+    graph = TaskGraph(lambda: finished.append('graph'))
+    tasks = [graph.add(CountdownTask(n)) for n in range(4)]
+    tasks.append(graph.add(CountdownTask(1), after=tasks))
+    assert graph.wait(timeout=5.0)
+    # Updating a complete graph doesn't finish its tasks again
+    graph.update()
+    graph.update()
+    assert [task.finished for task in tasks] == [1] * 5
+
+    # Whatever waited on the graph finishes it, and that only happens once
+    assert finished == []
+    graph.finish()
+    graph.finish()
+    assert finished == ['graph']
+
+
+def test_fraction_rises_to_one_by_weight():
+    graph = TaskGraph()
+    heavy = graph.add(threaded([], 'heavy', 4), weight=3.0)
+    graph.add(CountdownTask(3), after=(heavy,), weight=1.0)
+
+    graph.begin()
+    fractions = [graph.fraction]
+    while not graph.complete:
+        graph.update()
+        fractions.append(graph.fraction)
+        # The countdown has no fraction, so it counts as nothing until it completes
+        if heavy.complete and not graph.complete:
+            assert graph.fraction == pytest.approx(0.75)
+
+    assert fractions[0] == 0.0
+    assert fractions[-1] == 1.0
+    assert fractions == sorted(fractions)
+
+
+def test_cancel_stops_wait_and_cancels_unfinished_tasks():
+    release = threading.Event()
+    graph = TaskGraph()
+
+    stuck = ThreadedTask()
+    stuck.add(lambda: release.wait(5.0))
+    canceller = CancellingTask(graph)
+    done = CountdownTask(0)
+    later = CountdownTask(1)
+
+    graph.add(stuck)
+    graph.add(done)
+    graph.add(canceller)
+    graph.add(later, after=(stuck,))
+    try:
+        assert not graph.wait(timeout=5.0)
+    finally:
+        release.set()
+
+    assert graph.cancelled and not graph.complete
+    assert stuck.cancelled and canceller.cancelled and later.cancelled
+    assert not done.cancelled and done.finished == 1
+
+
+def test_cancel_from_a_task_stops_the_update():
+    graph = TaskGraph()
+    graph.add(CancellingTask(graph))
+    quick = graph.add(CountdownTask(1))
+
+    # quick completes in the same update the graph is cancelled in, but is never finished
+    assert not graph.wait(timeout=1.0)
+    assert quick.cancelled and quick.finished == 0
+
+
+def test_job_errors_are_raised_from_update_on_the_main_thread():
+    threads = []
+    task = ThreadedTask()
+    task.add(lambda: threads.append(threading.current_thread()))
+    task.add(lambda: 1 / 0)
+
+    graph = TaskGraph()
+    graph.add(task)
+    with pytest.raises(ZeroDivisionError):
+        graph.wait(timeout=5.0)
+    assert threads and threads[0] is not threading.main_thread()
+    assert not graph.complete
+
+
+def test_empty_graph_completes():
+    finished = []
+    graph = TaskGraph(lambda: finished.append(True))
+    assert graph.wait(timeout=1.0)
+    assert graph.complete and graph.fraction == 1.0
+    graph.finish()
+    assert finished == [True]
+
+
+def test_add_rejects_unknown_dependencies_and_late_tasks():
+    graph = TaskGraph()
+    first = graph.add(CountdownTask(1))
+    with pytest.raises(ValueError):
+        graph.add(CountdownTask(1), after=(CountdownTask(1),))
+    with pytest.raises(ValueError):
+        graph.add(first)
+
+    graph.begin()
+    with pytest.raises(RuntimeError):
+        graph.add(CountdownTask(1), after=(first,))
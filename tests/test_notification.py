@@ -0,0 +1,251 @@
+import pytest
+
+from critter.lib.notification import Notification, NotificationBus, Notifier, NotificationCoalesce
+
+
+class Moved(Notification):
+    __slots__ = ('x',)
+
+    def __init__(self, x: int):
+        self.x = x
+
+
+class Killed(Notification):
+    __slots__ = ()
+
+
+def test_bus_removing_a_listener_mid_dispatch_skips_nothing():
+    bus = NotificationBus()
+    heard = []
+
+    def once(moved):
+        heard.append(('once', moved.x))
+        bus.remove_listener(Moved, once)
+
+    bus.add_listener(Moved, once)
+    bus.add_listener(Moved, lambda moved: heard.append(('always', moved.x)))
+    bus.push(Moved(1), immediate=True)
+    bus.push(Moved(2), immediate=True)
+    assert heard == [('once', 1), ('always', 1), ('always', 2)]
+
+
+def test_bus_clearing_the_cache_mid_dispatch_stops_it():
+    bus = NotificationBus()
+    heard = []
+
+    def clear(moved):
+        heard.append(moved.x)
+        if moved.x == 1:
+            bus.clear_cache()
+
+    bus.add_listener(Moved, clear)
+    for x in range(4):
+        bus.push(Moved(x))
+    bus.push_cache()
+    assert heard == [0, 1]
+    assert bus.pending == 0
+
+
+def test_bus_pushes_from_listeners_wait_for_the_next_drain():
+    bus = NotificationBus(capacity=2)
+    heard = []
+
+    def echo(moved):
+        heard.append(moved.x)
+        if moved.x < 10:
+            # Enough to grow the ring while it is being drained
+            bus.push(Moved(moved.x + 10))
+            bus.push(Moved(moved.x + 20))
+
+    bus.add_listener(Moved, echo)
+    bus.push(Moved(0))
+    bus.push(Moved(1))
+    bus.push_cache()
+    assert heard == [0, 1]
+    assert bus.pending == 4
+    bus.push_cache()
+    assert heard == [0, 1, 10, 20, 11, 21]
+
+
+def test_bus_listeners_only_hear_their_type():
+    bus = NotificationBus()
+    heard = []
+    assert bus.add_listener(Moved, heard.append) == Moved.slot
+    bus.push(Killed())
+    bus.push(Moved(3))
+    bus.push_cache()
+    assert [type(notification) for notification in heard] == [Moved]
+    assert not bus.has_listeners(Killed)
+
+    bus.remove_listener(Moved, heard.append)
+    with pytest.raises(ValueError):
+        bus.remove_listener(Moved, heard.append)
+
+
+def test_notifications_need_slots():
+    with pytest.raises(TypeError):
+        class Loose(Notification):
+            pass
+
+
+@pytest.fixture
+def notifier():
+    return Notifier()
+
+
+def test_higher_priorities_dispatch_first(notifier):
+    heard = []
+    notifier.create_notification('ui', priority_=-1)
+    notifier.create_notification('input', priority_=5)
+    notifier.add_listener('ui', lambda v: heard.append(('ui', v)))
+    notifier.add_listener('input', lambda v: heard.append(('input', v)))
+    notifier.add_listener('plain', lambda v: heard.append(('plain', v)))
+
+    notifier.push_notification('ui', v=1)
+    notifier.push_notification('plain', v=1)
+    notifier.push_notification('input', v=1)
+    notifier.push_notification('plain', v=2)
+    notifier.push_notification('input', v=2)
+    notifier.push_cache()
+    assert heard == [('input', 1), ('input', 2), ('plain', 1), ('plain', 2), ('ui', 1)]
+
+
+def test_coalesced_pushes_dispatch_where_the_first_was_queued(notifier):
+    heard = []
+    notifier.create_notification('pos', NotificationCoalesce.KEEP_LAST, x=0, y=0)
+    notifier.create_notification('style', NotificationCoalesce.MERGE, a=0, b=0)
+    notifier.create_notification('hit', NotificationCoalesce.COUNT, damage=0)
+    notifier.add_listener('pos', lambda x, y: heard.append(('pos', x, y)))
+    notifier.add_listener('style', lambda a, b: heard.append(('style', a, b)))
+    notifier.add_listener('hit', lambda damage, count: heard.append(('hit', damage, count)))
+    notifier.add_listener('plain', lambda v: heard.append(('plain', v)))
+
+    notifier.push_notification('pos', x=1, y=1)
+    notifier.push_notification('plain', v=1)
+    notifier.push_notification('hit', damage=1)
+    notifier.push_notification('style', a=1)
+    notifier.push_notification('pos', x=2)
+    notifier.push_notification('style', b=2)
+    notifier.push_notification('hit', damage=3)
+    notifier.push_notification('plain', v=2)
+    notifier.push_notification('hit', damage=4)
+    notifier.push_cache()
+    assert heard == [('pos', 2, 0), ('plain', 1), ('hit', 4, 3), ('style', 1, 2), ('plain', 2)]
+
+    # Once dispatched a coalesced notification starts over
+    heard.clear()
+    notifier.push_notification('hit', damage=5)
+    notifier.push_cache()
+    assert heard == [('hit', 5, 1)]
+
+
+def test_pushes_from_listeners_wait_for_the_next_push_cache(notifier):
+    heard = []
+    notifier.create_notification('pos', NotificationCoalesce.KEEP_LAST, x=0)
+
+    def again(x):
+        heard.append(x)
+        if x < 2:
+            notifier.push_notification('pos', x=x + 1)
+            notifier.push_notification('pos', x=x + 10)
+
+    notifier.add_listener('pos', again)
+    notifier.push_notification('pos', x=0)
+    notifier.push_cache()
+    assert heard == [0]
+    notifier.push_cache()
+    assert heard == [0, 10]
+
+
+def test_budget_defers_the_rest_in_order(notifier):
+    heard = []
+    notifier.add_listener('slow', lambda i: heard.append(('slow', i)))
+    notifier.add_listener('plain', lambda v: heard.append(('plain', v)))
+    for i in range(3):
+        notifier.push_notification('slow', i=i)
+
+    # A budget always dispatches at least one push
+    notifier.push_cache(0.0)
+    assert heard == [('slow', 0)]
+    notifier.push_notification('slow', i=3)
+    notifier.push_cache(0.0)
+    notifier.push_cache()
+    assert heard == [('slow', 0), ('slow', 1), ('slow', 2), ('slow', 3)]
+
+
+def test_deleting_a_waiting_notification_drops_its_pushes(notifier):
+    heard = []
+    notifier.create_notification('pos', NotificationCoalesce.KEEP_LAST, x=0)
+    notifier.add_listener('pos', lambda x: heard.append(('pos', x)))
+    notifier.add_listener('plain', lambda v: heard.append(('plain', v)))
+
+    notifier.push_notification('pos', x=1)
+    notifier.push_notification('plain', v=1)
+    notifier.push_notification('pos', x=2)
+    notifier.delete_notification('pos')
+    notifier.push_cache()
+    assert heard == [('plain', 1)]
+
+
+def test_deleting_a_notification_from_a_listener(notifier):
+    heard = []
+    notifier.add_listener('pos', lambda x: heard.append(('pos', x)))
+
+    def delete(v):
+        heard.append(('plain', v))
+        notifier.delete_notification('pos')
+
+    notifier.add_listener('plain', delete)
+    notifier.push_notification('plain', v=1)
+    notifier.push_notification('pos', x=1)
+    notifier.push_cache()
+    assert heard == [('plain', 1)]
+
+
+class View:
+    # Listens for as long as it is alive, like a view or sprite would
+
+    def __init__(self, notifier: Notifier):
+        self.moves = 0
+        notifier.add_listener('moved', self.on_moved)
+
+    def on_moved(self, x):
+        self.moves += 1
+
+
+class SlottedView:
+    __slots__ = ('moves',)
+
+    def __init__(self):
+        self.moves = 0
+
+    def on_moved(self, x):
+        self.moves += 1
+
+
+def test_collected_views_stop_listening(notifier):
+    notifier.create_notification('moved', x=0)
+    for _ in range(5000):
+        view = View(notifier)
+        notifier.push_notification('moved', immediate_=True, x=1)
+        assert view.moves == 1
+        assert notifier.listener_count('moved') == 1
+        del view
+    assert notifier.listener_count('moved') == 0
+
+    views = [View(notifier) for _ in range(5000)]
+    assert notifier.listener_count('moved') == 5000
+    views.clear()
+    assert notifier.listener_count('moved') == 0
+    notifier.push_notification('moved', x=2)
+    notifier.push_cache()
+
+
+def test_methods_of_slotted_objects_are_held_strongly(notifier):
+    view = SlottedView()
+    notifier.add_listener('moved', view.on_moved)
+    notifier.push_notification('moved', immediate_=True, x=1)
+    assert view.moves == 1
+
+    notifier.remove_listener('moved', view.on_moved)
+    assert notifier.listener_count('moved') == 0
@@ -0,0 +1,102 @@
+import pytest
+
+from critter.lib.object import Attribute, ObjectList, Sprite
+from critter.core.testing import FakeBuffer
+
+TARGETS = (('position', 3), ('texture', 1, 'H'))
+
+
+def make(capacity: int = 4) -> tuple[ObjectList, dict[str, FakeBuffer]]:
+    objects = ObjectList(TARGETS, capacity)
+    # The arrays are lazy, so stand-in buffers can be given to them before the first sync
+    buffers = {}
+    for name, *_ in TARGETS:
+        synced = objects.get_array(name)
+        buffers[name] = synced._buffer = FakeBuffer(len(synced.data) * synced.data.itemsize)  # noqa: SLF001
+    return objects, buffers
+
+
+def test_rem_frees_slots_for_new():
+    objects, _ = make()
+    a, b, c = objects.new(), objects.new(), objects.new()
+    assert (a, b, c) == (0, 1, 2)
+    objects.set(b, 'position', (1.0, 2.0, 3.0))
+
+    objects.rem(b)
+    assert not objects.is_alive(b)
+    assert objects.get(b, 'position') == (0.0, 0.0, 0.0)
+    assert objects.count == 2
+
+    # Freed slots are reused oldest first before any new slot is used
+    objects.rem(a)
+    assert objects.new() == b
+    assert objects.new() == a
+    assert objects.new() == 3
+    assert objects.slots == 4 and objects.count == 4
+
+
+def test_rem_dead_slot_raises():
+    objects, _ = make()
+    slot = objects.new()
+    objects.rem(slot)
+    with pytest.raises(ValueError):
+        objects.rem(slot)
+    with pytest.raises(ValueError):
+        objects.rem(10)
+    assert not objects.is_alive(10)
+
+
+def test_new_many_recycles_then_takes_a_range():
+    objects, _ = make(8)
+    assert objects.new_many(5) == range(0, 5)
+    objects.rem(3)
+    objects.rem(1)
+
+    slots = objects.new_many(4)
+    assert slots == [3, 1, 5, 6]
+    assert all(objects.is_alive(slot) for slot in range(7))
+    assert objects.count == objects.slots == 7
+
+
+def test_growth_doubles_and_extends_every_array():
+    objects, buffers = make(4)
+    for slot in range(4):
+        objects.new()
+        objects.set(slot, 'position', (slot, slot, slot))
+        objects.set(slot, 'texture', slot + 10)
+    assert objects.capacity == 4
+
+    objects.new()
+    assert objects.capacity == 8
+    assert objects.new_many(12) == range(5, 17)
+    assert objects.capacity == 32
+    for name, *_ in TARGETS:
+        assert objects.get_array(name).size == 32
+
+    # The old objects survive growing, and the grown arrays are written whole
+    assert [objects.get(slot, 'position') for slot in range(4)] == [(float(slot),) * 3 for slot in range(4)]
+    assert list(objects.get_many('texture', 0, 4)) == [10, 11, 12, 13]
+    objects.sync()
+    for name, buffer in buffers.items():
+        synced = objects.get_array(name)
+        assert buffer.writes == [(0, len(synced.data) * synced.data.itemsize)]
+        assert bytes(buffer.data) == synced.data.tobytes()
+
+
+def test_attribute_reads_and_writes_the_array():
+    objects, buffers = make()
+    objects.new()
+    sprite = Sprite(objects.new(), objects)
+    assert isinstance(Sprite.position, Attribute)
+
+    sprite.position = (4.0, 5.0, 6.0)
+    assert sprite.position == (4.0, 5.0, 6.0)
+    assert objects.get(sprite.idx, 'position') == (4.0, 5.0, 6.0)
+    assert objects.get_array('position').dirty == (1,)
+
+    objects.sync()
+    buffers['position'].writes.clear()
+    sprite.position = (1.0, 1.0, 1.0)
+    objects.sync()
+    # The attribute marks its slot dirty like any other write, so only that slot goes up
+    assert buffers['position'].writes == [(12, 12)]
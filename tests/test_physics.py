@@ -0,0 +1,293 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from resources import load_level
+from resources.LDtk import Level
+from critter.core.physics import HeightField, PhysicsEngine, Step, SIDE_RIGHT, SIDE_LEFT, SIDE_UP, SIDE_DOWN
+from critter.core.world import Room, read_tile_types, expand_level, order_room
+from critter.core.testing import SYNTHETIC_TYPES, synthetic_level
+
+
+def test_empty_field_has_no_sides():
+    field = HeightField.from_tiles([], [], [])
+    assert (field.width, field.height) == (0, 0)
+    assert len(field.ledges(1.0)) == 0
+    assert len(field.walls(1.0)) == 0
+    assert field.height_at(0.0, 0.0) is None
+
+
+def boxes_overlap(engine: PhysicsEngine, i: int, j: int) -> bool:
+    x, y, hw, hh = engine.x, engine.y, engine.half_width, engine.half_height
+    return abs(x[i] - x[j]) < hw[i] + hw[j] and abs(y[i] - y[j]) < hh[i] + hh[j]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_broadphase_finds_every_overlapping_pair(seed):
+    rnd = random.Random(seed)
+    engine = PhysicsEngine(cell_size=1.0)
+    for _ in range(400):
+        # Mostly boxes which fit a cell, with some larger than one
+        half = rnd.choice((0.1, 0.3, 0.45, 0.5, 1.5))
+        engine.add_collider(rnd.uniform(-10, 10), rnd.uniform(-10, 10), half, rnd.choice((0.2, 0.5, half)))
+
+    first, second = engine._candidate_pairs()  # noqa: SLF001
+    candidates = [frozenset(pair) for pair in zip(first, second)]
+    assert len(candidates) == len(set(candidates))
+    assert all(len(pair) == 2 for pair in candidates)
+
+    overlapping = {frozenset((i, j)) for i, j in combinations(range(len(engine)), 2) if boxes_overlap(engine, i, j)}
+    assert overlapping
+    assert overlapping <= set(candidates)
+
+
+def test_overlapping_movers_are_pushed_apart_evenly():
+    engine = PhysicsEngine(timestep=0.1)
+    a = engine.add_collider(0.0, 0.0, 0.4, 0.4, owner='a')
+    b = engine.add_collider(0.7, 0.0, 0.4, 0.4, owner='b')
+    engine.step()
+
+    assert [(p.owner, q.owner) for p, q in engine.contacts] == [('a', 'b')]
+    assert a.position == pytest.approx((-0.05, 0.0))
+    assert b.position == pytest.approx((0.75, 0.0))
+    engine.step()
+    assert engine.contacts == []
+
+
+def test_static_collider_stops_a_mover():
+    engine = PhysicsEngine(timestep=0.1)
+    wall = engine.add_collider(2.0, 0.0, 0.5, 0.5, static=True)
+    mover = engine.add_collider(0.0, 0.0, 0.4, 0.4)
+    mover.velocity = (2.0, 0.0)
+    with pytest.raises(ValueError):
+        wall.velocity = (1.0, 0.0)
+
+    for _ in range(20):
+        engine.step()
+    # The mover takes the whole push, and stops rather than pushing into the wall every step
+    assert mover.position == pytest.approx((1.1, 0.0))
+    assert mover.velocity == (0.0, 0.0)
+    assert wall.position == (2.0, 0.0)
+
+
+def test_colliders_apart_in_z_do_not_touch():
+    engine = PhysicsEngine()
+    low = engine.add_collider(0.0, 0.0, 0.5, 0.5, z=0.0, depth=1.0)
+    high = engine.add_collider(0.2, 0.0, 0.5, 0.5, z=1.5)
+    # Resting exactly on top of another collider is not overlapping it either
+    touching = engine.add_collider(0.0, 0.2, 0.5, 0.5, z=1.0)
+    engine.step()
+
+    assert [(p.index, q.index) for p, q in engine.contacts] == [(high.index, touching.index)]
+    assert low.position == (0.0, 0.0)
+
+
+def test_large_collider_touches_small_ones():
+    engine = PhysicsEngine(timestep=0.1, cell_size=1.0)
+    large = engine.add_collider(0.0, 0.0, 2.0, 2.0, static=True, owner='large')
+    small = engine.add_collider(2.3, 0.0, 0.4, 0.4, owner='small')
+    other = engine.add_collider(0.0, 3.0, 2.0, 1.5, owner='other')
+    engine.step()
+
+    assert {(p.owner, q.owner) for p, q in engine.contacts} == {('large', 'small'), ('large', 'other')}
+    assert small.position == pytest.approx((2.4, 0.0))
+    assert other.position == pytest.approx((0.0, 3.5))
+    assert large.position == (0.0, 0.0)
+
+
+def test_remove_collider_moves_the_last_row_into_the_gap():
+    engine = PhysicsEngine()
+    a = engine.add_collider(1.0, 1.0, 0.5, 0.5, owner='a')
+    b = engine.add_collider(2.0, 2.0, 0.5, 0.5, owner='b')
+    c = engine.add_collider(3.0, 3.0, 0.25, 0.75, z=2.0, static=True, owner='c')
+
+    engine.remove_collider(a)
+    assert not a.alive and a.index == -1
+    assert len(engine) == 2
+    assert engine.colliders == (c, b)
+    assert (c.index, b.index) == (0, 1)
+    # The moved handle still reads its own row
+    assert (c.position, c.z, c.half_size, c.static) == ((3.0, 3.0), 2.0, (0.25, 0.75), True)
+    assert b.position == (2.0, 2.0)
+
+    with pytest.raises(ValueError):
+        engine.remove_collider(a)
+    engine.remove_collider(b)
+    assert engine.colliders == (c,) and c.index == 0
+
+
+def test_mover_slides_along_a_wall():
+    # A wall two levels high runs down the fourth column
+    field = HeightField(0.0, 0.0, 6, 3, bytes([1, 1, 1, 3, 1, 1] * 3))
+    engine = PhysicsEngine(timestep=0.1)
+    engine.add_heightfield(field)
+    mover = engine.add_collider(0.5, 1.0, 0.25, 0.25)
+    mover.velocity = (3.0, 0.3)
+
+    for _ in range(10):
+        engine.step()
+    # Stopped against the wall along x, still moving along y
+    assert mover.position == pytest.approx((2.75, 1.3))
+    assert mover.velocity == (0.0, 0.3)
+    assert mover.z == 0.0
+
+
+def test_mover_steps_up_but_not_over_walls():
+    # Levels 0.4 apart: up one level is a step, up two more is a wall
+    field = HeightField(0.0, 0.0, 6, 3, bytes([1, 1, 2, 2, 4, 4] * 3), level_height=0.4)
+    engine = PhysicsEngine(timestep=0.1, step_height=0.5)
+    engine.add_heightfield(field)
+    mover = engine.add_collider(0.5, 1.5, 0.25, 0.25)
+    mover.velocity = (2.0, 0.0)
+
+    for _ in range(30):
+        engine.step()
+    assert mover.position == pytest.approx((3.75, 1.5))
+    assert mover.z == pytest.approx(0.4)
+    assert mover.velocity == (0.0, 0.0)
+
+
+def test_update_runs_fixed_steps_up_to_max_steps():
+    engine = PhysicsEngine(timestep=0.1, max_steps=5)
+    mover = engine.add_collider(0.0, 0.0, 0.5, 0.5)
+    mover.velocity = (1.0, 0.0)
+
+    assert engine.update(0.05) == 0
+    assert engine.update(0.3) == 3
+    assert mover.position == pytest.approx((0.3, 0.0))
+    # A long frame is capped and the time it couldn't catch up on is dropped
+    assert engine.update(5.0) == 5
+    assert engine.update(0.05) == 0
+    assert mover.position == pytest.approx((0.8, 0.0))
+
+
+def random_field(seed: int) -> HeightField:
+    rnd = random.Random(seed)
+    width, height = rnd.randint(1, 12), rnd.randint(1, 12)
+    levels = bytes(rnd.choice((0, 1, 1, 2, 3, 5)) for _ in range(width * height))
+    return HeightField(rnd.uniform(-5, 5), rnd.uniform(-5, 5), width, height, levels, rnd.choice((0.5, 1.0, 2.0)), rnd.uniform(-2, 2))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_max_heights_matches_max_height(seed):
+    field = random_field(seed)
+    bounds = field.bounds
+    rnd = random.Random(seed)
+    left, right, bottom, top = [], [], [], []
+    for _ in range(2000):
+        # Points from well outside the field to well inside it, so boxes fall inside, across its edges, and outside
+        x = rnd.uniform(bounds.left - 3, bounds.right + 3)
+        y = rnd.uniform(bounds.bottom - 3, bounds.top + 3)
+        half_width = rnd.choice((0.1, 0.25, field.cell_size / 2, field.cell_size, 2.5))
+        half_height = rnd.choice((0.1, 0.25, field.cell_size / 2, field.cell_size, 2.5))
+        if rnd.random() < 0.2:
+            # On a cell edge, where a box only touches the cells beside it
+            x = field.cell_edge(x, 0, False)
+        left.append(x - half_width)
+        right.append(x + half_width)
+        bottom.append(y - half_height)
+        top.append(y + half_height)
+
+    assert field.max_heights(left, right, bottom, top) == list(map(field.max_height, left, right, bottom, top))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_heights_at_matches_height_at(seed):
+    field = random_field(seed)
+    bounds = field.bounds
+    rnd = random.Random(seed)
+    xs = [rnd.uniform(bounds.left - 2, bounds.right + 2) for _ in range(2000)]
+    ys = [rnd.uniform(bounds.bottom - 2, bounds.top + 2) for _ in range(2000)]
+    assert field.heights_at(xs, ys) == list(map(field.height_at, xs, ys))
+
+
+def walk_by_sampling(field: HeightField, x0: float, y0: float, x1: float, y1: float, step: float, drop: float) -> bool | None:
+    # Walk the line in tiny steps. None if it passes so close to a corner that a step skips a cell
+    samples = 4000
+    last = None
+    for n in range(samples + 1):
+        x, y = x0 + (x1 - x0) * n / samples, y0 + (y1 - y0) * n / samples
+        cell = field.cell(x, y)
+        if cell == -1 or not field.levels[cell]:
+            return False
+        if last is not None and cell != last:
+            if cell // field.width != last // field.width and cell % field.width != last % field.width:
+                return None
+            rise = (field.levels[cell] - field.levels[last]) * field.level_height
+            if rise > step or -rise > drop:
+                return False
+        last = cell
+    return True
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_can_walk_matches_dense_sampling(seed):
+    field = random_field(seed + 100)
+    field.level_height = 1.0
+    bounds = field.bounds
+    rnd = random.Random(seed)
+    checked = walkable = 0
+    for _ in range(200):
+        x0, x1 = rnd.uniform(bounds.left - 1, bounds.right + 1), rnd.uniform(bounds.left - 1, bounds.right + 1)
+        y0, y1 = rnd.uniform(bounds.bottom - 1, bounds.top + 1), rnd.uniform(bounds.bottom - 1, bounds.top + 1)
+        expected = walk_by_sampling(field, x0, y0, x1, y1, 1.0, 2.0)
+        if expected is None:
+            continue
+        assert field.can_walk(x0, y0, x1, y1, 1.0, 2.0) == expected
+        checked += 1
+        walkable += expected
+    assert checked > 150
+    assert 0 < walkable < checked
+
+
+def test_sides_of_a_small_grid():
+    # Row 0 is the bottom row:
+    #   3 1 1
+    #   1 2 0
+    field = HeightField(0.0, 0.0, 3, 2, bytes([1, 2, 0, 3, 1, 1]))
+    assert list(field.walls(0.5)) == [SIDE_RIGHT | SIDE_UP, 0, 0, 0, SIDE_LEFT | SIDE_DOWN, 0]
+    assert list(field.ledges(0.5)) == [
+        SIDE_LEFT | SIDE_DOWN, SIDE_RIGHT | SIDE_LEFT | SIDE_UP | SIDE_DOWN, 0,
+        SIDE_RIGHT | SIDE_LEFT | SIDE_UP | SIDE_DOWN, SIDE_UP, SIDE_RIGHT | SIDE_UP | SIDE_DOWN
+    ]
+    # A drop of one level is fine with a big enough drop, but the edge of the grid never is
+    assert list(field.ledges(1.0)) == [
+        SIDE_LEFT | SIDE_DOWN, SIDE_RIGHT | SIDE_DOWN, 0,
+        SIDE_RIGHT | SIDE_LEFT | SIDE_UP | SIDE_DOWN, SIDE_UP, SIDE_RIGHT | SIDE_UP | SIDE_DOWN
+    ]
+
+    assert field.classify_step(0.5, 0.5, 1.5, 0.5, 0.5) == Step.WALL
+    assert field.classify_step(0.5, 0.5, 1.5, 0.5, 1.0) == Step.UP
+    assert field.classify_step(1.5, 0.5, 1.5, 1.5, 1.0) == Step.DOWN
+    assert field.classify_step(0.5, 1.5, 1.5, 1.5, 1.0, drop=1.0) == Step.LEDGE
+    assert field.classify_step(1.5, 1.5, 2.5, 1.5, 1.0) == Step.FLAT
+    assert field.classify_step(1.5, 0.5, 2.5, 0.5, 1.0) == Step.VOID
+
+
+def dungeon_and_synthetic_levels() -> list[tuple[Level, dict[int, tuple[str, bool]]]]:
+    root = load_level('dungeon')
+    tile_types = {}
+    for tileset in root.defs.tilesets:
+        tile_types.update(read_tile_types(tileset))
+    return [(level, tile_types) for level in root.levels] + [(synthetic_level(17, 9, seed), SYNTHETIC_TYPES) for seed in range(5)]
+
+
+def test_room_ground_is_the_height_offset_grid():
+    for level, tile_types in dungeon_and_synthetic_levels():
+        compiled = order_room(expand_level(level, tile_types, {}))
+        room = Room(compiled.name, compiled.x, compiled.y, compiled.z, compiled.texture, compiled.transparent)
+
+        layers = {layer.identifier: layer for layer in level.layer_instances}
+        heights, width = layers['HeightOffset'].int_grid_csv, layers['Terrain'].c_width
+        wx, wy, wz = level.world_x / 4, level.world_y / 4, level.world_depth * 5
+        # The ground of every cell with terrain is the top of its column, and there is none anywhere else
+        expected = {}
+        for tile in layers['Terrain'].grid_tiles:
+            tx, ty = int(tile.pos_x / 4), int(tile.pos_y / 4)
+            expected[wx + tx, wy + ty] = wz + heights[ty * width + tx]
+
+        ground = room.ground
+        centers = [(ground.left + (n % ground.width + 0.5) * ground.cell_size, ground.bottom + (n // ground.width + 0.5) * ground.cell_size) for n in range(len(ground.levels))]
+        assert ground.heights_at(*zip(*centers)) == [expected.get(center) for center in centers]
+        assert len(expected) == sum(map(bool, ground.levels))
@@ -0,0 +1,115 @@
+import random
+from array import array
+
+import pytest
+from arcade import BasicSprite, make_soft_square_texture
+
+from critter.lib.pool import SpritePool, SortedSpritePool
+
+
+class FakeBuffer:
+    """
+    Stands in for the index buffer, keeping its bytes and every write made to it.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = bytearray(data)
+        self.writes: list[tuple[int, int]] = []
+
+    def write(self, data, offset: int = 0):
+        data = bytes(data)
+        self.data[offset:offset + len(data)] = data
+        self.writes.append((offset, len(data)))
+
+
+@pytest.fixture
+def pool():
+    texture = make_soft_square_texture(4, (255, 255, 255))
+    # A new pool's index data is every slot in order
+    return SpritePool([BasicSprite(texture) for _ in range(8)], FakeBuffer(array('i', range(8)).tobytes()))
+
+
+def test_give_writes_only_the_swapped_runs(pool):
+    buffer = pool.buffer
+    slots = pool.get_many(8)
+
+    pool.give(slots[2])
+    assert pool.swaps == 1
+    assert pool.dirty == (2, 7)
+    pool.sync()
+    # Each swapped position is its own run of one 4 byte index
+    assert buffer.writes == [(8, 4), (28, 4)]
+
+    buffer.writes.clear()
+    pool.give_many((slots[0], slots[1]))
+    assert pool.swaps == 3
+    assert pool.dirty == (0, 1, 5, 6)
+    pool.sync()
+    # Neighbouring positions are joined into one write
+    assert buffer.writes == [(0, 8), (20, 8)]
+
+    assert (pool.uploads, pool.uploaded_bytes) == (4, 24)
+    assert bytes(buffer.data) == bytes(memoryview(pool.source))
+
+
+def test_giving_the_last_slot_does_not_swap(pool):
+    slots = pool.get_many(8)
+    pool.give(slots[-1])
+    assert pool.swaps == 0
+    assert pool.dirty == ()
+    pool.sync()
+    assert pool.buffer.writes == []
+
+
+def test_sync_without_changes_writes_nothing(pool):
+    pool.get_many(4)
+    pool.sync()
+    assert pool.buffer.writes == []
+    assert pool.uploads == 0
+
+
+def test_returning_a_free_slot_raises(pool):
+    slot = pool.get()
+    pool.give(slot)
+    with pytest.raises(ValueError):
+        pool.give(slot)
+
+
+def test_buffer_follows_random_use():
+    texture = make_soft_square_texture(4, (255, 255, 255))
+    buffer = FakeBuffer(array('i', range(200)).tobytes())
+    pool = SpritePool([BasicSprite(texture) for _ in range(200)], buffer)
+
+    rnd = random.Random(3)
+    given = []
+    for _ in range(1000):
+        if rnd.random() < 0.5 and pool.remaining:
+            given += pool.get_many(rnd.randint(1, min(20, pool.remaining)))
+        elif given:
+            rnd.shuffle(given)
+            count = rnd.randint(1, len(given))
+            pool.give_many(given[:count])
+            given = given[count:]
+
+        if rnd.random() < 0.3:
+            pool.sync()
+            assert bytes(buffer.data) == bytes(memoryview(pool.source))
+        assert sorted(pool.source[:pool.used]) == sorted(given)
+        assert [pool.sprites[slot] for slot in pool.source[:pool.size]] == pool.sprite_list.sprite_list
+
+    pool.sync()
+    assert bytes(buffer.data) == bytes(memoryview(pool.source))
+    assert pool.uploaded_bytes == sum(size for _, size in buffer.writes)
+
+
+def test_sorted_pool_only_gives_slots_with_keys():
+    texture = make_soft_square_texture(4, (255, 255, 255))
+    pool = SortedSpritePool([BasicSprite(texture) for _ in range(8)], FakeBuffer(array('i', range(8)).tobytes()))
+    with pytest.raises(TypeError, match='get_sorted'):
+        pool.get()
+    with pytest.raises(TypeError, match='get_sorted'):
+        pool.get_many(2)
+
+    first = pool.get_sorted((3.0, 1.0))
+    second = pool.get_sorted((2.0, 0.0))
+    assert list(pool.source[:pool.used]) == [second[1], first[1], second[0], first[0]]
@@ -0,0 +1,144 @@
+from types import SimpleNamespace
+
+from arcade.types import LRBTNF
+
+from critter.core.streaming import RoomStreamer
+
+
+class StubWorld:
+    """
+    The parts of World the streamer uses. Rooms are 100 tiles side by side along x, and each
+    room can have a room under it. Loads stay part way done until `finish_loading`.
+    """
+
+    def __init__(self, names: tuple[str, ...], below: dict[str, str] | None = None, capacity: int = 10000):
+        self.capacity = capacity
+        self.rooms = {}
+        self.room_depths = {}
+        for n, name in enumerate(names):
+            self.rooms[name] = SimpleNamespace(bounds=LRBTNF(n * 10, n * 10 + 8, 0, 8, 0, 5), size=100)
+            self.room_depths[name] = 0
+        for above, name in (below or {}).items():
+            bounds = self.rooms[above].bounds
+            self.rooms[name] = SimpleNamespace(bounds=LRBTNF(bounds.left, bounds.right, bounds.bottom, bounds.top, -5, 0), size=100)
+            self.room_depths[name] = -1
+        self.neighbours = {name: [other for other in names[max(n - 1, 0):n + 2] if other != name] for n, name in enumerate(names)}
+
+        self.loaded_rooms: set[str] = set()
+        self.loading: list[SimpleNamespace] = []
+        self.calls: list[tuple[str, str]] = []
+
+    def rooms_in(self, box: LRBTNF) -> list[str]:
+        return [
+            name for name, room in self.rooms.items()
+            if room.bounds.left < box.right and box.left < room.bounds.right and room.bounds.bottom < box.top and box.bottom < room.bounds.top
+        ]
+
+    def can_fit(self, name: str) -> bool:
+        used = sum(self.rooms[room].size for room in self.loaded_rooms.union(load.name for load in self.loading))
+        return used + self.rooms[name].size <= self.capacity
+
+    def load_room_over_time(self, name: str):
+        self.calls.append(('load', name))
+        self.loading.append(SimpleNamespace(name=name))
+
+    def unload_room(self, name: str):
+        self.calls.append(('unload', name))
+        self.loaded_rooms.discard(name)
+        self.loading = [load for load in self.loading if load.name != name]
+
+    def finish_loading(self):
+        self.loaded_rooms.update(load.name for load in self.loading)
+        self.loading.clear()
+
+
+def loads(world: StubWorld) -> list[str]:
+    return [name for call, name in world.calls if call == 'load']
+
+
+def test_resident_set_includes_neighbours_and_rooms_below():
+    world = StubWorld(('A', 'B', 'C', 'D'), below={'B': 'Cellar', 'D': 'Crypt'})
+    streamer = RoomStreamer(world)
+
+    streamer.focus('A')
+    assert streamer.wanted == ('A', 'B', 'Cellar')
+    assert streamer.rooms_below('B') == ['Cellar']
+    assert streamer.rooms_below('Cellar') == []
+
+
+def test_prefetch_adds_the_room_and_the_rooms_below_it():
+    world = StubWorld(('A', 'B', 'C', 'D'), below={'D': 'Crypt'})
+    streamer = RoomStreamer(world, radius=0)
+    streamer.focus('A')
+
+    streamer.prefetch('D')
+    assert streamer.wanted == ('A', 'D', 'Crypt')
+    assert streamer.pending == ('A', 'D', 'Crypt')
+
+    # Dropping the prefetch takes its rooms off the queue before they load
+    streamer.prefetch(None)
+    assert streamer.pending == ('A',)
+    streamer.flush()
+    assert loads(world) == ['A']
+
+
+def test_update_stops_once_over_budget():
+    world = StubWorld(('A', 'B', 'C', 'D', 'E'))
+    streamer = RoomStreamer(world, radius=2, budget=150)
+    streamer.focus('C')
+
+    # The room that takes it over the budget is still queued, but nothing after it
+    assert streamer.update() == 200
+    assert loads(world) == ['C', 'B']
+    assert streamer.update() == 200
+    assert streamer.update() == 100
+    assert loads(world) == ['C', 'B', 'D', 'A', 'E']
+    assert streamer.idle
+
+
+def test_update_always_queues_one_room():
+    world = StubWorld(('A', 'B', 'C'))
+    streamer = RoomStreamer(world, budget=10)
+    streamer.focus('B')
+    for count in (1, 2, 3):
+        assert streamer.update() == 100
+        assert len(loads(world)) == count
+
+
+def test_evicts_the_least_recently_wanted_room():
+    world = StubWorld(('A', 'B', 'C', 'D', 'E'), capacity=200)
+    streamer = RoomStreamer(world, radius=0)
+    for name in ('A', 'C', 'A'):
+        streamer.focus(name)
+        streamer.flush()
+    assert world.loaded_rooms == {'A', 'C'}
+
+    # A was wanted after C, so C goes even though A was loaded first
+    streamer.focus('E')
+    streamer.flush()
+    assert [call for call in world.calls if call[0] == 'unload'] == [('unload', 'C')]
+    assert world.loaded_rooms == {'A', 'E'}
+
+
+def test_wanted_rooms_are_never_evicted():
+    world = StubWorld(('A', 'B', 'C'), capacity=200)
+    streamer = RoomStreamer(world)
+    streamer.focus('B')
+    streamer.flush()
+
+    # All three are wanted but only two fit, so the last waits rather than evicting a wanted room
+    assert world.loaded_rooms == {'B', 'A'}
+    assert not [call for call in world.calls if call[0] == 'unload']
+    assert streamer.idle
+
+
+def test_flush_finishes_everything_queued():
+    world = StubWorld(('A', 'B', 'C', 'D', 'E'), below={'C': 'Cellar'})
+    streamer = RoomStreamer(world, radius=2, budget=1)
+    streamer.focus('C')
+
+    streamer.flush()
+    assert streamer.idle
+    assert not world.loading
+    assert world.loaded_rooms == {'A', 'B', 'C', 'D', 'E', 'Cellar'}
+    assert sorted(loads(world)) == sorted(world.loaded_rooms)
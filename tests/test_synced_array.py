@@ -0,0 +1,77 @@
+import random
+from array import array
+
+import pytest
+
+from critter.lib.object import SyncedArray
+from critter.core.testing import FakeBuffer
+
+
+def make(dtype: str = 'f', step: int = 3, size: int = 64) -> tuple[SyncedArray, FakeBuffer]:
+    buffer = FakeBuffer(size * step * array(dtype).itemsize)
+    synced = SyncedArray(dtype, step, size, buffer=buffer)
+    # A new buffer is written whole on the first sync
+    synced.sync()
+    buffer.writes.clear()
+    return synced, buffer
+
+
+def test_writes_cover_exactly_the_dirty_slots():
+    synced, buffer = make()
+    for slot in (3, 4, 5, 9, 20, 21):
+        synced[slot] = (1.0, 2.0, 3.0)
+    assert synced.dirty == (3, 4, 5, 9, 20, 21)
+
+    synced.sync()
+    # Slots are 12 bytes: runs [3, 6), [9, 10) and [20, 22)
+    assert buffer.writes == [(36, 36), (108, 12), (240, 24)]
+    assert synced.frame_bytes == 72
+    assert synced.dirty == ()
+    assert bytes(buffer.data) == synced.data.tobytes()
+
+
+def test_set_many_is_one_run():
+    synced, buffer = make('i', 1)
+    synced.set_many(10, range(8))
+    synced[18] = 5
+    synced.sync()
+    assert buffer.writes == [(40, 36)]
+
+
+def test_clean_sync_writes_nothing():
+    synced, buffer = make()
+    synced.sync()
+    assert buffer.writes == []
+    assert synced.frame_bytes == 0
+
+
+def test_extend_writes_everything():
+    synced, buffer = make('H', 2, 16)
+    synced[2] = (1, 2)
+    synced.extend(32)
+    synced.sync()
+    assert buffer.writes == [(0, 32 * 2 * 2)]
+    assert bytes(buffer.data) == synced.data.tobytes()
+
+
+@pytest.mark.parametrize(('dtype', 'step'), [('f', 3), ('i', 1), ('H', 2)])
+def test_random_writes_match_the_dirty_runs(dtype, step):
+    rnd = random.Random(1)
+    synced, buffer = make(dtype, step, 500)
+    for _ in range(200):
+        for _ in range(rnd.randint(0, 20)):
+            value = rnd.randint(0, 100)
+            synced[rnd.randrange(synced.size)] = value if step == 1 else (value,) * step
+        if rnd.random() < 0.1:
+            synced.set_many(rnd.randrange(synced.size - 10), [7] * step * 10)
+
+        dirty = synced.dirty
+        buffer.writes.clear()
+        synced.sync()
+
+        slot_bytes = step * synced.data.itemsize
+        written = [slot for offset, size in buffer.writes for slot in range(offset // slot_bytes, (offset + size) // slot_bytes)]
+        runs = sum(1 for i, slot in enumerate(dirty) if not i or dirty[i - 1] != slot - 1)
+        assert written == list(dirty)
+        assert len(buffer.writes) == runs
+        assert bytes(buffer.data) == synced.data.tobytes()